@@ -3,11 +3,35 @@ pragma solidity 0.8.7;
 
 import "./NFTToNFTExchangeDataEventsAndModifiers.sol";
 import "@openzeppelin/contracts/token/ERC721/IERC721.sol";
-import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts-upgradeable/access/OwnableUpgradeable.sol";
+import "@openzeppelin/contracts-upgradeable/proxy/utils/Initializable.sol";
+import "@openzeppelin/contracts-upgradeable/utils/cryptography/draft-EIP712Upgradeable.sol";
+import "@openzeppelin/contracts/utils/cryptography/ECDSA.sol";
 
-contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
+// The owner and the EIP-712 domain are set by an initializer so that
+// EIP-1167 clones made by NFTToNFTExchangeFactory, which run no
+// constructor, set them too. The domain separator is built from the
+// address of the running contract, so an order signed for one clone is
+// invalid on every other clone and on the implementation.
+contract NFTToNFTExchange is Initializable, OwnableUpgradeable, EIP712Upgradeable, NFTToNFTExchangeDataEventsModifiers {
 
-    constructor(uint _minDuration) public Ownable() {
+    // Also initializes the deployed contract itself, so the implementation
+    // of the clones cannot be initialized by anyone else.
+    constructor(uint _minDuration) public {
+        initialize(_minDuration, msg.sender);
+    }
+
+    function initialize(
+        uint _minDuration,
+        address _owner
+    )
+    public
+    initializer {
+        __Ownable_init();
+        __EIP712_init("NFTToNFTExchange", "1");
+        if (_owner != msg.sender) {
+            transferOwnership(_owner);
+        }
         minDuration = _minDuration;
     }
 
@@ -15,10 +39,10 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
         uint _tradeId,
         Trade memory _trade
     ) internal {
-        if (_trade.creator == _trade.bidder) {
+        if ((_trade.flags & CREATED_BY_BIDDER) != 0) {
                 emit BidCreated(
                 _tradeId,
-                _trade.creator,
+                _trade.bidder,
                 _trade.bidder,
                 _trade.bidderNFTAddress,
                 _trade.askerNFTAddress,
@@ -27,10 +51,10 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
                 _trade.price,
                 _trade.expirestAt
             );
-        } else if (_trade.creator == _trade.asker) {
+        } else {
                 emit AskCreated(
                 _tradeId,
-                _trade.creator,
+                _trade.asker,
                 _trade.asker,
                 _trade.bidderNFTAddress,
                 _trade.askerNFTAddress,
@@ -40,115 +64,281 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
                 _trade.expirestAt
             );
         }
+        emit TradeNftListed(_tradeId, _trade.bidderNFTAddress, _trade.bidderNFTId, true);
+        emit TradeNftListed(_tradeId, _trade.askerNFTAddress, _trade.askerNFTId, false);
+    }
+
+    function nftKey(
+        IERC721 _nftAddress,
+        uint _nftId
+    ) internal pure returns (bytes32) {
+        return keccak256(abi.encodePacked(_nftAddress, _nftId));
     }
 
-    function determineIfATradeIsPaid(
+    function addToIndex(
+        uint[] storage _tradeIds,
+        mapping(uint => uint) storage _positions,
         uint _tradeId
     ) internal {
-        Trade memory trade = idToTrade[_tradeId];
-        if (addressToTradeIdToWei[trade.bidder][_tradeId] == trade.price &&
-            nftOwnerToTradeIdToNftId[trade.bidder][_tradeId] == trade.bidderNFTId &&
-            nftOwnerToTradeIdToNftId[trade.asker][_tradeId] == trade.askerNFTId) {
-                idToTrade[_tradeId].paid = true;
-            }
-        else {
-            idToTrade[_tradeId].paid = false;
+        if (_positions[_tradeId] == 0) {
+            _tradeIds.push(_tradeId);
+            _positions[_tradeId] = _tradeIds.length;
         }
     }
 
-    function createBid(
-        uint _bidderNFTId,
-        uint _askerNFTId,
-        IERC721 _bidderNFTAddress,
-        IERC721 _askerNFTAddress,
-        uint _duration,
-        uint _price
-    ) 
-        external 
-        payable
-        nftNotEqual(
-            _bidderNFTId,
-            _bidderNFTAddress,
-            _askerNFTAddress,
-            _askerNFTId
-        )
-        expirationTimeIsLongerThatMinDuration(
-            _duration
-            )
-        returns(uint) 
-    {
-        lastTradeId++;
+    // Swap-and-pop removal.
+    function removeFromIndex(
+        uint[] storage _tradeIds,
+        mapping(uint => uint) storage _positions,
+        uint _tradeId
+    ) internal {
+        uint position = _positions[_tradeId];
+        if (position != 0) {
+            uint movedTradeId = _tradeIds[_tradeIds.length - 1];
+            _tradeIds[position - 1] = movedTradeId;
+            _positions[movedTradeId] = position;
+            _tradeIds.pop();
+            delete _positions[_tradeId];
+        }
+    }
 
-        uint expirestAt = block.timestamp + _duration;
-        Trade memory trade = Trade({
-            bidder: msg.sender,
-            asker: address(0),
-            creator: msg.sender,
-            bidderNFTAddress: _bidderNFTAddress,
-            askerNFTAddress: _askerNFTAddress,
-            askerNFTId: _askerNFTId,
-            bidderNFTId:_bidderNFTId,
-            expirestAt: expirestAt,
-            price: _price,
-            paid: false,
-            bidderReceiveNft: false,
-            askerReceiveNft: false,
-            askerReceiveWei: false
-        });
-        idToTrade[lastTradeId] = trade;
+    function addTradeToAccountIndex(
+        address _account,
+        uint _tradeId
+    ) internal {
+        addToIndex(
+            accountToTradeIds[_account],
+            accountToTradeIdToPosition[_account],
+            _tradeId
+        );
+    }
 
-        emitCrateTradeEvent(lastTradeId, trade);
-        return lastTradeId;
+    function removeTradeFromAccountIndex(
+        address _account,
+        uint _tradeId
+    ) internal {
+        removeFromIndex(
+            accountToTradeIds[_account],
+            accountToTradeIdToPosition[_account],
+            _tradeId
+        );
     }
 
-    function createAsk(
-        uint _bidderNFTId,
-        uint _askerNFTId,
-        IERC721 _bidderNFTAddress,
-        IERC721 _askerNFTAddress,
-        uint _duration,
+    // Only the NFT the creator asks for is indexed: trades on the
+    // creator's own NFT are found by its account, and `TradeNftListed`
+    // has both NFTs for filtering off-chain. An index entry costs two
+    // fresh slots, about as much as a third of the Trade itself.
+    function counterpartyNftKey(
+        Trade memory _trade
+    ) internal pure returns (bytes32) {
+        return (_trade.flags & CREATED_BY_BIDDER) != 0
+            ? nftKey(_trade.askerNFTAddress, _trade.askerNFTId)
+            : nftKey(_trade.bidderNFTAddress, _trade.bidderNFTId);
+    }
+
+    function addTradeToIndexes(
+        uint _tradeId,
+        Trade memory _trade
+    ) internal {
+        bytes32 key = counterpartyNftKey(_trade);
+        addTradeToAccountIndex(
+            (_trade.flags & CREATED_BY_BIDDER) != 0 ? _trade.bidder : _trade.asker,
+            _tradeId
+        );
+        addToIndex(
+            nftToTradeIds[key],
+            nftToTradeIdToPosition[key],
+            _tradeId
+        );
+    }
+
+    function removeTradeFromIndexes(
+        uint _tradeId,
+        Trade memory _trade
+    ) internal {
+        bytes32 key = counterpartyNftKey(_trade);
+        removeTradeFromAccountIndex(_trade.bidder, _tradeId);
+        removeTradeFromAccountIndex(_trade.asker, _tradeId);
+        removeFromIndex(
+            nftToTradeIds[key],
+            nftToTradeIdToPosition[key],
+            _tradeId
+        );
+    }
+
+    // A new staker replaces the previous party of the same side, which
+    // leaves the account index unless it is the other party as well.
+    function replaceTradeParty(
+        uint _tradeId,
+        address _previous,
+        address _next,
+        address _otherParty
+    ) internal {
+        if (_previous != address(0) && _previous != _otherParty) {
+            removeTradeFromAccountIndex(_previous, _tradeId);
+        }
+        addTradeToAccountIndex(_next, _tradeId);
+    }
+
+    function sliceOfIndex(
+        uint[] storage _tradeIds,
+        uint _offset,
+        uint _limit
+    ) internal view returns (uint[] memory) {
+        uint count = _offset < _tradeIds.length ? _tradeIds.length - _offset : 0;
+        if (count > _limit) {
+            count = _limit;
+        }
+        uint[] memory page = new uint[](count);
+        for (uint i = 0; i < count; i++) {
+            page[i] = _tradeIds[_offset + i];
+        }
+        return page;
+    }
+
+    function fundingStatus(
+        uint8 _flags
+    ) internal pure returns (TradeStatus) {
+        uint8 funded = _flags & FUNDED;
+        if (funded == FUNDED) {
+            return TradeStatus.Funded;
+        } else if (funded == 0) {
+            return TradeStatus.Open;
+        }
+        return TradeStatus.PartiallyFunded;
+    }
+
+    function initialFlags(
+        bool _createdByBidder,
         uint _price
+    ) internal pure returns (uint8 flags) {
+        if (_createdByBidder) {
+            flags = CREATED_BY_BIDDER;
+        }
+        // There is nothing to pay for a free trade.
+        if (_price == 0) {
+            flags |= WEI_PAID;
+        }
+    }
+
+    // Stores the staking flags together with the status they imply.
+    function setFundingFlags(
+        Trade storage _trade,
+        uint8 _flags
+    ) internal {
+        _trade.flags = _flags;
+        _trade.status = fundingStatus(_flags);
+    }
+
+    function closeTrade(
+        uint _tradeId,
+        TradeStatus _status
+    ) internal returns (Trade memory trade) {
+        trade = idToTrade[_tradeId];
+        delete idToTrade[_tradeId];
+        removeTradeFromIndexes(_tradeId, trade);
+        emit TradeClosed(_tradeId, _status);
+    }
+
+    // Records a withdrawal, the last one settles the trade.
+    function setReceivedFlags(
+        uint _tradeId,
+        uint8 _flags
+    ) internal {
+        if ((_flags & RECEIVED) == RECEIVED) {
+            closeTrade(_tradeId, TradeStatus.Settled);
+        } else {
+            idToTrade[_tradeId].flags = _flags;
+        }
+    }
+
+    function _createTrade(
+        TradeParams memory _params,
+        bool _createdByBidder
     )
-    external
+    internal
     nftNotEqual(
-            _bidderNFTId,
-            _bidderNFTAddress,
-            _askerNFTAddress,
-            _askerNFTId
+            _params.bidderNFTId,
+            _params.bidderNFTAddress,
+            _params.askerNFTAddress,
+            _params.askerNFTId
         )
     expirationTimeIsLongerThatMinDuration(
-        _duration
+        _params.duration
         )
+    valuesFitIntoTrade(
+        _params.duration,
+        _params.price
+    )
     returns(uint) {
         lastTradeId++;
 
-        uint expirestAt = block.timestamp + _duration;
-
         Trade memory trade = Trade({
-            bidder: address(0),
-            asker: msg.sender,
-            creator: msg.sender,
-            bidderNFTAddress: _bidderNFTAddress,
-            askerNFTAddress: _askerNFTAddress,
-            askerNFTId: _askerNFTId,
-            bidderNFTId:_bidderNFTId,
-            expirestAt: expirestAt,
-            price: _price,
-            paid: false,
-            bidderReceiveNft: false,
-            askerReceiveNft: false,
-            askerReceiveWei: false
+            bidder: _createdByBidder ? msg.sender : address(0),
+            asker: _createdByBidder ? address(0) : msg.sender,
+            bidderNFTAddress: _params.bidderNFTAddress,
+            askerNFTAddress: _params.askerNFTAddress,
+            askerNFTId: _params.askerNFTId,
+            bidderNFTId: _params.bidderNFTId,
+            expirestAt: uint40(block.timestamp + _params.duration),
+            price: uint96(_params.price),
+            status: TradeStatus.Open,
+            flags: initialFlags(_createdByBidder, _params.price)
         });
         idToTrade[lastTradeId] = trade;
 
+        addTradeToIndexes(lastTradeId, trade);
         emitCrateTradeEvent(lastTradeId, trade);
         return lastTradeId;
     }
 
-    function stakeNft(
+    function _registerStakedNft(
+        uint _tradeId,
+        address _staker,
+        bool _isBidderNft
+    ) internal {
+        Trade storage trade = idToTrade[_tradeId];
+        uint8 flags = trade.flags;
+
+        if (_isBidderNft) {
+            require((flags & BIDDER_NFT_STAKED) == 0,
+            "NFT is already staked!");
+            if ((flags & CREATED_BY_BIDDER) != 0) {
+                require(_staker == trade.bidder,
+                "Only a bidder can place a bidder's NFT.");
+            }
+            if (trade.bidder != _staker) {
+                // The Wei of the previous bidder stays with the trade.
+                require((flags & WEI_PAID) == 0 || trade.price == 0,
+                "Trade has already been paid!");
+                replaceTradeParty(_tradeId, trade.bidder, _staker, trade.asker);
+                trade.bidder = _staker;
+            }
+            // Chaning internal storage.
+            setFundingFlags(trade, flags | BIDDER_NFT_STAKED);
+            emit NftStaked(_tradeId, _staker, trade.bidderNFTAddress, trade.bidderNFTId);
+        } else {
+            require((flags & ASKER_NFT_STAKED) == 0,
+            "NFT is already staked!");
+            if ((flags & CREATED_BY_BIDDER) == 0) {
+                require(_staker == trade.asker,
+                "Only a asker can place a asker's NFT.");
+            }
+            if (trade.asker != _staker) {
+                replaceTradeParty(_tradeId, trade.asker, _staker, trade.bidder);
+                trade.asker = _staker;
+            }
+            // Chaning internal storage.
+            setFundingFlags(trade, flags | ASKER_NFT_STAKED);
+            emit NftStaked(_tradeId, _staker, trade.askerNFTAddress, trade.askerNFTId);
+        }
+    }
+
+    function _stakeNft(
         uint _tradeId,
         uint _nftId
     )
+    internal
     isTradeExist(
         _tradeId
     )
@@ -158,41 +348,53 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
     nftIdIsInTrade(
         _tradeId,
         _nftId
-    )
-    external {
+    ) {
         Trade storage trade = idToTrade[_tradeId];
 
         if (_nftId == trade.bidderNFTId) {
-            if (trade.bidder == trade.creator) {
-                require(msg.sender == trade.bidder,
-                "Only a bidder can place a bidder's NFT.");
-            }
-            trade.bidder = msg.sender;
+            _registerStakedNft(_tradeId, msg.sender, true);
             // Transfer NFT.
             trade.bidderNFTAddress.safeTransferFrom(
-                trade.bidder, address(this), _nftId);
-            // Chaning internal storage.
-            nftOwnerToTradeIdToNftId[trade.bidder][_tradeId] = _nftId;
+                msg.sender, address(this), _nftId);
         } else if (_nftId == trade.askerNFTId) {
-            if (trade.asker == trade.creator) {
-                require(msg.sender == trade.asker,
-                "Only a asker can place a asker's NFT.");
-            }
-            trade.asker = msg.sender;
+            _registerStakedNft(_tradeId, msg.sender, false);
             // Transfer NFT.
             trade.askerNFTAddress.safeTransferFrom(
-                trade.asker, address(this), _nftId);
-            // Chaning internal storage.
-            nftOwnerToTradeIdToNftId[trade.asker][_tradeId] = _nftId;
+                msg.sender, address(this), _nftId);
         }
-        determineIfATradeIsPaid(_tradeId);
     }
 
-    function pay(
-        uint _tradeId
-    ) 
-    external
-    payable
+    function _stakeReceivedNft(
+        uint _tradeId,
+        address _staker,
+        uint _nftId
+    )
+    internal
+    isTradeExist(
+        _tradeId
+    )
+    isTradeAvailable(
+        _tradeId
+    ) {
+        Trade storage trade = idToTrade[_tradeId];
+
+        // The NFT has already been transferred, msg.sender is its contract.
+        if (_nftId == trade.bidderNFTId &&
+            msg.sender == address(trade.bidderNFTAddress)) {
+            _registerStakedNft(_tradeId, _staker, true);
+        } else if (_nftId == trade.askerNFTId &&
+            msg.sender == address(trade.askerNFTAddress)) {
+            _registerStakedNft(_tradeId, _staker, false);
+        } else {
+            revert("The NFT is not the seller's NFT or the buyer's NFT!");
+        }
+    }
+
+    function _pay(
+        uint _tradeId,
+        uint _amount
+    )
+    internal
     isTradeExist(
         _tradeId
     )
@@ -206,16 +408,136 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
         _tradeId
     )
     {
-        require(msg.value == idToTrade[_tradeId].price,
+        Trade storage trade = idToTrade[_tradeId];
+        require(_amount == trade.price,
         "Amount of Wei must be equal to the price!");
-        addressToTradeIdToWei[msg.sender][_tradeId] += msg.value;
-        determineIfATradeIsPaid(_tradeId);
+        setFundingFlags(trade, trade.flags | WEI_PAID);
         emit AmountPaid(
             _tradeId,
             msg.sender,
-            msg.value
+            _amount
+        );
+    }
+
+    function createBid(
+        uint _bidderNFTId,
+        uint _askerNFTId,
+        IERC721 _bidderNFTAddress,
+        IERC721 _askerNFTAddress,
+        uint _duration,
+        uint _price
+    ) 
+        external 
+        payable
+        returns(uint) 
+    {
+        return _createTrade(
+            TradeParams(
+                _bidderNFTId,
+                _askerNFTId,
+                _bidderNFTAddress,
+                _askerNFTAddress,
+                _duration,
+                _price
+            ),
+            true
         );
     }
+
+    // Not payable: prices are paid with payMany once the trades exist.
+    function createBids(
+        TradeParams[] calldata _trades
+    )
+    external
+    returns(uint[] memory) {
+        uint[] memory tradeIds = new uint[](_trades.length);
+        for (uint i = 0; i < _trades.length; i++) {
+            tradeIds[i] = _createTrade(_trades[i], true);
+        }
+        return tradeIds;
+    }
+
+    function createAsk(
+        uint _bidderNFTId,
+        uint _askerNFTId,
+        IERC721 _bidderNFTAddress,
+        IERC721 _askerNFTAddress,
+        uint _duration,
+        uint _price
+    )
+    external
+    returns(uint) {
+        return _createTrade(
+            TradeParams(
+                _bidderNFTId,
+                _askerNFTId,
+                _bidderNFTAddress,
+                _askerNFTAddress,
+                _duration,
+                _price
+            ),
+            false
+        );
+    }
+
+    function createAsks(
+        TradeParams[] calldata _trades
+    )
+    external
+    returns(uint[] memory) {
+        uint[] memory tradeIds = new uint[](_trades.length);
+        for (uint i = 0; i < _trades.length; i++) {
+            tradeIds[i] = _createTrade(_trades[i], false);
+        }
+        return tradeIds;
+    }
+
+    function stakeNft(
+        uint _tradeId,
+        uint _nftId
+    )
+    external {
+        _stakeNft(_tradeId, _nftId);
+    }
+
+    function stakeNfts(
+        uint[] calldata _tradeIds,
+        uint[] calldata _nftIds
+    )
+    external
+    arraysLengthsAreEqual(
+        _tradeIds.length,
+        _nftIds.length
+    ) {
+        for (uint i = 0; i < _tradeIds.length; i++) {
+            _stakeNft(_tradeIds[i], _nftIds[i]);
+        }
+    }
+
+    function pay(
+        uint _tradeId
+    ) 
+    external
+    payable
+    {
+        _pay(_tradeId, msg.value);
+    }
+
+    function payMany(
+        uint[] calldata _tradeIds
+    )
+    external
+    payable
+    {
+        uint total;
+        for (uint i = 0; i < _tradeIds.length; i++) {
+            uint price = idToTrade[_tradeIds[i]].price;
+            _pay(_tradeIds[i], price);
+            total += price;
+        }
+        require(msg.value == total,
+        "Amount of Wei must be equal to the sum of the prices!");
+    }
     
     function withdrawNft(
         uint _tradeId
@@ -226,29 +548,29 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
     )
     {
         Trade storage trade = idToTrade[_tradeId];
+        uint8 flags = trade.flags;
+        IERC721 nftAddress;
+        uint nftId;
         if (msg.sender == trade.bidder) {
-            require(nftOwnerToTradeIdToNftId[trade.asker][_tradeId] != 0,
+            require((flags & BIDDER_RECEIVED_NFT) == 0,
             "NFT is already withdrawed!");
-            // Transfer NFT.
-            trade.askerNFTAddress.safeTransferFrom(
-                address(this), msg.sender, trade.askerNFTId);
-            // Chaning internal storage.
-            nftOwnerToTradeIdToNftId[trade.asker][_tradeId] = 0;
-            trade.bidderReceiveNft = true;
-            emit NftWithdrawed(
-                _tradeId, msg.sender, trade.askerNFTId);
+            nftAddress = trade.askerNFTAddress;
+            nftId = trade.askerNFTId;
+            flags |= BIDDER_RECEIVED_NFT;
         } else if (msg.sender == trade.asker) {
-            require(nftOwnerToTradeIdToNftId[trade.bidder][_tradeId] != 0,
+            require((flags & ASKER_RECEIVED_NFT) == 0,
             "NFT is already withdrawed!");
-            // Transfer NFT.
-            trade.bidderNFTAddress.safeTransferFrom(
-                address(this), msg.sender, trade.bidderNFTId);
-            // Chaning internal storage.
-            nftOwnerToTradeIdToNftId[trade.bidder][_tradeId] = 0;
-            trade.askerReceiveNft = true;
-            emit NftWithdrawed(
-                _tradeId, msg.sender, trade.bidderNFTId);
-        } 
+            nftAddress = trade.bidderNFTAddress;
+            nftId = trade.bidderNFTId;
+            flags |= ASKER_RECEIVED_NFT;
+        } else {
+            return;
+        }
+        // Chaning internal storage.
+        setReceivedFlags(_tradeId, flags);
+        // Transfer NFT.
+        nftAddress.safeTransferFrom(address(this), msg.sender, nftId);
+        emit NftWithdrawed(_tradeId, msg.sender, nftId);
     }
 
     function withdrawWei(
@@ -263,35 +585,280 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
     )
     {   
         Trade storage trade = idToTrade[_tradeId];
-        require(addressToTradeIdToWei[trade.bidder][_tradeId] != 0,
+        uint8 flags = trade.flags;
+        uint price = trade.price;
+        require((flags & ASKER_RECEIVED_WEI) == 0,
         "Wei is already withdrawed.");
-        payable(msg.sender).transfer(trade.price);
-        addressToTradeIdToWei[trade.bidder][_tradeId] = 0;
-        trade.askerReceiveWei = true;
-        emit WeiWithdrawed(_tradeId, msg.sender, trade.price);
+        setReceivedFlags(_tradeId, flags | ASKER_RECEIVED_WEI);
+        // Credited, the asker takes it out with withdrawAll.
+        changeBalance(msg.sender, addressToBalance[msg.sender] + price);
+        emit WeiWithdrawed(_tradeId, msg.sender, price);
+    }
+
+    // Merges a bid and an ask on the same NFTs into the bid, which becomes
+    // Funded. The bid must be staked and paid by its bidder, the ask staked
+    // by its asker, and the bid price must cover the ask price. The trade
+    // clears at the ask price, the rest of the payment is credited to the
+    // bidder. Anyone can match, the ask is closed.
+    function matchTrades(
+        uint _bidTradeId,
+        uint _askTradeId
+    )
+    external
+    isTradeExist(
+        _bidTradeId
+    )
+    isTradeAvailable(
+        _bidTradeId
+    )
+    isTradeExist(
+        _askTradeId
+    )
+    isTradeAvailable(
+        _askTradeId
+    ) {
+        Trade storage bid = idToTrade[_bidTradeId];
+        Trade memory ask = idToTrade[_askTradeId];
+        require(bid.bidderNFTAddress == ask.bidderNFTAddress &&
+            bid.bidderNFTId == ask.bidderNFTId &&
+            bid.askerNFTAddress == ask.askerNFTAddress &&
+            bid.askerNFTId == ask.askerNFTId,
+        "The trades are not for the same NFTs!");
+        require((bid.flags & (CREATED_BY_BIDDER | FUNDED)) == (CREATED_BY_BIDDER | BIDDER_NFT_STAKED | WEI_PAID),
+        "The bid must be staked and paid by the bidder only!");
+        require((ask.flags & (CREATED_BY_BIDDER | BIDDER_NFT_STAKED | ASKER_NFT_STAKED)) == ASKER_NFT_STAKED &&
+            ((ask.flags & WEI_PAID) == 0 || ask.price == 0),
+        "The ask must be staked by the asker only!");
+        require(bid.price >= ask.price,
+        "The bid price is lower than the ask price!");
+
+        // The asker's NFT stays in the exchange and moves to the bid.
+        closeTrade(_askTradeId, TradeStatus.Settled);
+        replaceTradeParty(_bidTradeId, bid.asker, ask.asker, bid.bidder);
+        uint surplus = bid.price - ask.price;
+        bid.asker = ask.asker;
+        bid.price = ask.price;
+        setFundingFlags(bid, bid.flags | ASKER_NFT_STAKED);
+        if (surplus != 0) {
+            changeBalance(bid.bidder, addressToBalance[bid.bidder] + surplus);
+        }
+        emit TradesMatched(_bidTradeId, _askTradeId, ask.asker, ask.price);
+    }
+
+    function hashOrder(
+        Order calldata _order
+    ) internal view returns (bytes32) {
+        return _hashTypedDataV4(keccak256(abi.encode(
+            ORDER_TYPEHASH,
+            _order.maker,
+            _order.isBid,
+            _order.bidderNFTAddress,
+            _order.askerNFTAddress,
+            _order.bidderNFTId,
+            _order.askerNFTId,
+            _order.price,
+            _order.expirestAt,
+            _order.nonce
+        )));
+    }
+
+    function changeBalance(
+        address _account,
+        uint _balance
+    ) internal {
+        addressToBalance[_account] = _balance;
+        emit BalanceChanged(_account, _balance);
+    }
+
+    // Swaps the NFTs of a signed order with the sender in one step. The
+    // price of an ask order is paid with msg.value, the price of a bid
+    // order is taken from the maker's deposited balance. The price is
+    // credited to the asker's balance.
+    function fillOrder(
+        Order calldata _order,
+        bytes calldata _signature
+    )
+    external
+    payable
+    isOrderAvailable(
+        _order.maker,
+        _order.nonce,
+        _order.expirestAt
+    ) {
+        bytes32 orderHash = hashOrder(_order);
+        require(ECDSA.recover(orderHash, _signature) == _order.maker,
+        "Invalid order signature!");
+        makerToNonceToUsed[_order.maker][_order.nonce] = true;
+
+        address bidder;
+        address asker;
+        if (_order.isBid) {
+            bidder = _order.maker;
+            asker = msg.sender;
+            require(msg.value == 0,
+            "The price of a bid order is paid from the bidder's balance!");
+            require(addressToBalance[bidder] >= _order.price,
+            "The bidder's balance is not enough to pay the price!");
+            changeBalance(bidder, addressToBalance[bidder] - _order.price);
+        } else {
+            bidder = msg.sender;
+            asker = _order.maker;
+            require(msg.value == _order.price,
+            "Amount of Wei must be equal to the price!");
+        }
+        changeBalance(asker, addressToBalance[asker] + _order.price);
+        // Transfer NFTs.
+        _order.bidderNFTAddress.safeTransferFrom(
+            bidder, asker, _order.bidderNFTId);
+        _order.askerNFTAddress.safeTransferFrom(
+            asker, bidder, _order.askerNFTId);
+        emit OrderFilled(orderHash, _order.maker, msg.sender);
+    }
+
+    function cancelOrder(
+        uint _nonce
+    )
+    external {
+        require(!makerToNonceToUsed[msg.sender][_nonce],
+        "Order is already filled or cancelled!");
+        makerToNonceToUsed[msg.sender][_nonce] = true;
+        emit OrderCancelled(msg.sender, _nonce);
+    }
+
+    function deposit()
+    external
+    payable {
+        changeBalance(msg.sender, addressToBalance[msg.sender] + msg.value);
+    }
+
+    // Sends with all the remaining gas, unlike `transfer`, so that
+    // contract wallets with a costly `receive` can be paid.
+    function sendWei(
+        address _to,
+        uint _amount
+    ) internal {
+        (bool success, ) = payable(_to).call{value: _amount}("");
+        require(success, "Wei transfer failed!");
+    }
+
+    // Pays out everything credited to the sender: proceeds of settled
+    // trades, withdrawn trades and filled orders, refunds of swept trades
+    // and deposits.
+    function withdrawAll()
+    external {
+        uint balance = addressToBalance[msg.sender];
+        require(balance != 0, "Balance is empty!");
+        changeBalance(msg.sender, 0);
+        sendWei(msg.sender, balance);
+    }
+
+    function withdrawBalance(
+        uint _amount
+    )
+    external {
+        require(addressToBalance[msg.sender] >= _amount,
+        "Amount of Wei must not exceed the balance!");
+        changeBalance(msg.sender, addressToBalance[msg.sender] - _amount);
+        sendWei(msg.sender, _amount);
+    }
+
+    function settle(
+        uint _tradeId
+    )
+    external
+    isTradePaid(
+        _tradeId
+    )
+    {
+        // Clearing internal storage before the transfers.
+        Trade memory trade = closeTrade(_tradeId, TradeStatus.Settled);
+        // Transfer whatever has not been withdrawn yet.
+        if ((trade.flags & BIDDER_RECEIVED_NFT) == 0) {
+            trade.askerNFTAddress.safeTransferFrom(
+                address(this), trade.bidder, trade.askerNFTId);
+            emit NftWithdrawed(
+                _tradeId, trade.bidder, trade.askerNFTId);
+        }
+        if ((trade.flags & ASKER_RECEIVED_NFT) == 0) {
+            trade.bidderNFTAddress.safeTransferFrom(
+                address(this), trade.asker, trade.bidderNFTId);
+            emit NftWithdrawed(
+                _tradeId, trade.asker, trade.bidderNFTId);
+        }
+        if ((trade.flags & ASKER_RECEIVED_WEI) == 0) {
+            // Credited, the asker takes it out with withdrawAll.
+            changeBalance(trade.asker, addressToBalance[trade.asker] + trade.price);
+            emit WeiWithdrawed(_tradeId, trade.asker, trade.price);
+        }
+    }
+
+    // Cancels expired trades that are not Funded, returns what was
+    // staked to its owners and deletes the trades. Other ids are skipped,
+    // so a batch does not fail because one trade was closed meanwhile.
+    function sweepExpired(
+        uint[] calldata _tradeIds
+    )
+    external
+    returns (uint swept) {
+        for (uint i = 0; i < _tradeIds.length; i++) {
+            Trade storage trade = idToTrade[_tradeIds[i]];
+            if (trade.expirestAt == 0 ||
+                trade.expirestAt > block.timestamp ||
+                trade.status == TradeStatus.Funded) {
+                continue;
+            }
+            refundCancelledTrade(
+                _tradeIds[i],
+                closeTrade(_tradeIds[i], TradeStatus.Cancelled)
+            );
+            swept++;
+        }
+    }
+
+    function refundCancelledTrade(
+        uint _tradeId,
+        Trade memory _trade
+    ) internal {
+        if ((_trade.flags & BIDDER_NFT_STAKED) != 0) {
+            _trade.bidderNFTAddress.safeTransferFrom(
+                address(this), _trade.bidder, _trade.bidderNFTId);
+            emit NftWithdrawed(
+                _tradeId, _trade.bidder, _trade.bidderNFTId);
+        }
+        if ((_trade.flags & ASKER_NFT_STAKED) != 0) {
+            _trade.askerNFTAddress.safeTransferFrom(
+                address(this), _trade.asker, _trade.askerNFTId);
+            emit NftWithdrawed(
+                _tradeId, _trade.asker, _trade.askerNFTId);
+        }
+        if ((_trade.flags & WEI_PAID) != 0 && _trade.price != 0) {
+            // Credited, the bidder takes it out with withdrawAll.
+            changeBalance(_trade.bidder, addressToBalance[_trade.bidder] + _trade.price);
+            emit WeiWithdrawed(_tradeId, _trade.bidder, _trade.price);
+        }
     }
 
     function unstakeNft(
         uint _tradeId
     )
     external {
-        Trade memory trade = idToTrade[_tradeId];
-        require(
-            !(trade.bidderReceiveNft ||
-            trade.askerReceiveNft ||
-            trade.askerReceiveWei),
+        Trade storage trade = idToTrade[_tradeId];
+        uint8 flags = trade.flags;
+        require((flags & RECEIVED) == 0,
             "It is impossible to return NFT after part of the reward has been received!"
         );
         if (trade.bidder == msg.sender &&
-        nftOwnerToTradeIdToNftId[msg.sender][_tradeId] == trade.bidderNFTId) {
+        (flags & BIDDER_NFT_STAKED) != 0) {
+            setFundingFlags(trade, flags & ~BIDDER_NFT_STAKED);
             trade.bidderNFTAddress.safeTransferFrom(
                 address(this), msg.sender, trade.bidderNFTId);
-            nftOwnerToTradeIdToNftId[msg.sender][_tradeId] = 0;
+            emit NftUnstaked(_tradeId, msg.sender, trade.bidderNFTId);
         } else if (trade.asker == msg.sender &&
-        nftOwnerToTradeIdToNftId[msg.sender][_tradeId] == trade.askerNFTId) {
+        (flags & ASKER_NFT_STAKED) != 0) {
+            setFundingFlags(trade, flags & ~ASKER_NFT_STAKED);
             trade.askerNFTAddress.safeTransferFrom(
                 address(this), msg.sender, trade.askerNFTId);
-            nftOwnerToTradeIdToNftId[msg.sender][_tradeId] = 0;
+            emit NftUnstaked(_tradeId, msg.sender, trade.askerNFTId);
         }
     
     }
@@ -303,20 +870,414 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
     isSenderBidder(
         _tradeId
     ) {
-        Trade memory trade = idToTrade[_tradeId];
-        require(
-            !(trade.bidderReceiveNft ||
-            trade.askerReceiveNft ||
-            trade.askerReceiveWei),
+        Trade storage trade = idToTrade[_tradeId];
+        uint8 flags = trade.flags;
+        require((flags & RECEIVED) == 0,
             "It is impossible to return Wei after part of the reward has been received!"
         );
-        if (addressToTradeIdToWei[trade.bidder][_tradeId] == trade.price) {
-            payable(trade.asker).transfer(trade.price);
-            addressToTradeIdToWei[trade.asker][_tradeId] = 0;
+        if ((flags & WEI_PAID) != 0 && trade.price != 0) {
+            setFundingFlags(trade, flags & ~WEI_PAID);
+            sendWei(msg.sender, trade.price);
+            emit WeiUnstaked(_tradeId, msg.sender, trade.price);
         }
     
     }
    
+    function hashNfts(
+        NftItem[] calldata _nfts
+    ) internal pure returns (bytes32) {
+        return keccak256(abi.encode(_nfts));
+    }
+
+    function transferNfts(
+        NftItem[] calldata _nfts,
+        address _from,
+        address _to
+    ) internal {
+        for (uint i = 0; i < _nfts.length; i++) {
+            _nfts[i].nftAddress.safeTransferFrom(_from, _to, _nfts[i].nftId);
+        }
+    }
+
+    function emitBundleNfts(
+        uint _tradeId,
+        NftItem[] calldata _nfts,
+        bool _isBidderNft
+    ) internal {
+        for (uint i = 0; i < _nfts.length; i++) {
+            emit BundleNftListed(_tradeId, _nfts[i].nftAddress, _nfts[i].nftId, _isBidderNft);
+        }
+    }
+
+    // Reverts when an NFT is listed twice, on one side or on both.
+    function requireDistinctNfts(
+        NftItem[] calldata _bidderNfts,
+        NftItem[] calldata _askerNfts
+    ) internal pure {
+        uint count = _bidderNfts.length + _askerNfts.length;
+        for (uint i = 0; i < count; i++) {
+            NftItem calldata nft = i < _bidderNfts.length
+                ? _bidderNfts[i] : _askerNfts[i - _bidderNfts.length];
+            for (uint j = i + 1; j < count; j++) {
+                NftItem calldata other = j < _bidderNfts.length
+                    ? _bidderNfts[j] : _askerNfts[j - _bidderNfts.length];
+                if (nft.nftAddress == other.nftAddress && nft.nftId == other.nftId) {
+                    revert(i < _bidderNfts.length && j >= _bidderNfts.length
+                        ? "NFT cannot be the same!"
+                        : "NFT cannot be listed twice!");
+                }
+            }
+        }
+    }
+
+    function addBundleToAccountIndex(
+        address _account,
+        uint _tradeId
+    ) internal {
+        addToIndex(
+            accountToBundleIds[_account],
+            accountToBundleIdToPosition[_account],
+            _tradeId
+        );
+    }
+
+    function removeBundleFromAccountIndex(
+        address _account,
+        uint _tradeId
+    ) internal {
+        removeFromIndex(
+            accountToBundleIds[_account],
+            accountToBundleIdToPosition[_account],
+            _tradeId
+        );
+    }
+
+    // As replaceTradeParty, for bundle trades.
+    function replaceBundleParty(
+        uint _tradeId,
+        address _previous,
+        address _next,
+        address _otherParty
+    ) internal {
+        if (_previous != address(0) && _previous != _otherParty) {
+            removeBundleFromAccountIndex(_previous, _tradeId);
+        }
+        addBundleToAccountIndex(_next, _tradeId);
+    }
+
+    function indexBundleNfts(
+        uint _tradeId,
+        NftItem[] calldata _nfts,
+        bool _add
+    ) internal {
+        for (uint i = 0; i < _nfts.length; i++) {
+            bytes32 key = nftKey(_nfts[i].nftAddress, _nfts[i].nftId);
+            if (_add) {
+                addToIndex(nftToBundleIds[key], nftToBundleIdToPosition[key], _tradeId);
+            } else {
+                removeFromIndex(nftToBundleIds[key], nftToBundleIdToPosition[key], _tradeId);
+            }
+        }
+    }
+
+    // The lists must be the ones of the trade.
+    function closeBundleTrade(
+        uint _tradeId,
+        NftItem[] calldata _bidderNfts,
+        NftItem[] calldata _askerNfts,
+        TradeStatus _status
+    ) internal returns (BundleTrade memory trade) {
+        trade = idToBundleTrade[_tradeId];
+        delete idToBundleTrade[_tradeId];
+        removeBundleFromAccountIndex(trade.bidder, _tradeId);
+        removeBundleFromAccountIndex(trade.asker, _tradeId);
+        indexBundleNfts(
+            _tradeId,
+            (trade.flags & CREATED_BY_BIDDER) != 0 ? _askerNfts : _bidderNfts,
+            false
+        );
+        emit BundleClosed(_tradeId, _status);
+    }
+
+    function setBundleFundingFlags(
+        BundleTrade storage _trade,
+        uint8 _flags
+    ) internal {
+        _trade.flags = _flags;
+        _trade.status = fundingStatus(_flags);
+    }
+
+    function _createBundleTrade(
+        BundleParams calldata _params,
+        bool _createdByBidder
+    )
+    internal
+    expirationTimeIsLongerThatMinDuration(
+        _params.duration
+        )
+    valuesFitIntoTrade(
+        _params.duration,
+        _params.price
+    )
+    returns(uint) {
+        require(_params.bidderNfts.length != 0 && _params.askerNfts.length != 0,
+        "Bundle cannot be empty!");
+        requireDistinctNfts(_params.bidderNfts, _params.askerNfts);
+        uint tradeId = ++lastBundleTradeId;
+
+        idToBundleTrade[tradeId] = BundleTrade({
+            bidder: _createdByBidder ? msg.sender : address(0),
+            asker: _createdByBidder ? address(0) : msg.sender,
+            expirestAt: uint40(block.timestamp + _params.duration),
+            price: uint96(_params.price),
+            status: TradeStatus.Open,
+            flags: initialFlags(_createdByBidder, _params.price),
+            bidderNftsHash: hashNfts(_params.bidderNfts),
+            askerNftsHash: hashNfts(_params.askerNfts)
+        });
+        addBundleToAccountIndex(msg.sender, tradeId);
+        // As for trades, only the NFTs the creator asks for.
+        indexBundleNfts(
+            tradeId,
+            _createdByBidder ? _params.askerNfts : _params.bidderNfts,
+            true
+        );
+
+        emit BundleCreated(
+            tradeId,
+            msg.sender,
+            _createdByBidder,
+            _params.bidderNfts,
+            _params.askerNfts,
+            _params.price,
+            block.timestamp + _params.duration
+        );
+        emitBundleNfts(tradeId, _params.bidderNfts, true);
+        emitBundleNfts(tradeId, _params.askerNfts, false);
+        return tradeId;
+    }
+
+    function createBundleBid(
+        BundleParams calldata _params
+    )
+    external
+    returns(uint) {
+        return _createBundleTrade(_params, true);
+    }
+
+    function createBundleAsk(
+        BundleParams calldata _params
+    )
+    external
+    returns(uint) {
+        return _createBundleTrade(_params, false);
+    }
+
+    // Stakes a whole side of the bundle, the side is recognized by the
+    // hash of `_nfts`. The exchange must be approved for every NFT.
+    function stakeBundle(
+        uint _tradeId,
+        NftItem[] calldata _nfts
+    )
+    external
+    isBundleTradeExist(
+        _tradeId
+    )
+    isBundleTradeAvailable(
+        _tradeId
+    ) {
+        BundleTrade storage trade = idToBundleTrade[_tradeId];
+        bytes32 nftsHash = hashNfts(_nfts);
+        uint8 flags = trade.flags;
+
+        if (nftsHash == trade.bidderNftsHash) {
+            require((flags & BIDDER_NFT_STAKED) == 0,
+            "NFT is already staked!");
+            if ((flags & CREATED_BY_BIDDER) != 0) {
+                require(msg.sender == trade.bidder,
+                "Only a bidder can place a bidder's NFT.");
+            } else if (trade.bidder != msg.sender) {
+                require((flags & WEI_PAID) == 0 || trade.price == 0,
+                "Trade has already been paid!");
+                replaceBundleParty(_tradeId, trade.bidder, msg.sender, trade.asker);
+                trade.bidder = msg.sender;
+            }
+            setBundleFundingFlags(trade, flags | BIDDER_NFT_STAKED);
+        } else if (nftsHash == trade.askerNftsHash) {
+            require((flags & ASKER_NFT_STAKED) == 0,
+            "NFT is already staked!");
+            if ((flags & CREATED_BY_BIDDER) == 0) {
+                require(msg.sender == trade.asker,
+                "Only a asker can place a asker's NFT.");
+            } else if (trade.asker != msg.sender) {
+                replaceBundleParty(_tradeId, trade.asker, msg.sender, trade.bidder);
+                trade.asker = msg.sender;
+            }
+            setBundleFundingFlags(trade, flags | ASKER_NFT_STAKED);
+        } else {
+            revert("The NFTs are not the seller's NFTs or the buyer's NFTs!");
+        }
+        // Transfer NFTs.
+        transferNfts(_nfts, msg.sender, address(this));
+        emit BundleStaked(_tradeId, msg.sender, nftsHash);
+    }
+
+    function payBundle(
+        uint _tradeId
+    )
+    external
+    payable
+    isBundleTradeExist(
+        _tradeId
+    )
+    isBundleTradeAvailable(
+        _tradeId
+    ) {
+        BundleTrade storage trade = idToBundleTrade[_tradeId];
+        uint8 flags = trade.flags;
+        require(trade.bidder == msg.sender,
+        "The sender's address must match the bidder's address!");
+        require((flags & WEI_PAID) == 0,
+        "Trade has already been paid!");
+        require(msg.value == trade.price,
+        "Amount of Wei must be equal to the price!");
+        setBundleFundingFlags(trade, flags | WEI_PAID);
+        emit BundlePaid(
+            _tradeId,
+            msg.sender,
+            msg.value
+        );
+    }
+
+    // Swaps both bundles of a funded bundle trade, the price is credited
+    // to the asker.
+    function settleBundle(
+        uint _tradeId,
+        NftItem[] calldata _bidderNfts,
+        NftItem[] calldata _askerNfts
+    )
+    external {
+        BundleTrade storage stored = idToBundleTrade[_tradeId];
+        require(stored.status == TradeStatus.Funded,
+        "Trade must be paid!!");
+        require(hashNfts(_bidderNfts) == stored.bidderNftsHash &&
+            hashNfts(_askerNfts) == stored.askerNftsHash,
+        "The NFTs are not the seller's NFTs or the buyer's NFTs!");
+        // Clearing internal storage before the transfers.
+        BundleTrade memory trade = closeBundleTrade(
+            _tradeId, _bidderNfts, _askerNfts, TradeStatus.Settled);
+        changeBalance(trade.asker, addressToBalance[trade.asker] + trade.price);
+        // Transfer NFTs.
+        transferNfts(_bidderNfts, address(this), trade.asker);
+        transferNfts(_askerNfts, address(this), trade.bidder);
+    }
+
+    // Returns the sender's staked side of a bundle trade that has not
+    // been settled.
+    function unstakeBundle(
+        uint _tradeId,
+        NftItem[] calldata _nfts
+    )
+    external {
+        BundleTrade storage trade = idToBundleTrade[_tradeId];
+        bytes32 nftsHash = hashNfts(_nfts);
+        uint8 flags = trade.flags;
+
+        if (trade.bidder == msg.sender &&
+        nftsHash == trade.bidderNftsHash &&
+        (flags & BIDDER_NFT_STAKED) != 0) {
+            setBundleFundingFlags(trade, flags & ~BIDDER_NFT_STAKED);
+        } else if (trade.asker == msg.sender &&
+        nftsHash == trade.askerNftsHash &&
+        (flags & ASKER_NFT_STAKED) != 0) {
+            setBundleFundingFlags(trade, flags & ~ASKER_NFT_STAKED);
+        } else {
+            revert("The NFTs are not staked by the sender!");
+        }
+        transferNfts(_nfts, address(this), msg.sender);
+    }
+
+    function unstakeBundleWei(
+        uint _tradeId
+    )
+    external {
+        BundleTrade storage trade = idToBundleTrade[_tradeId];
+        uint8 flags = trade.flags;
+        require(trade.bidder == msg.sender,
+        "The sender's address must match the bidder's address!");
+        if ((flags & WEI_PAID) != 0 && trade.price != 0) {
+            setBundleFundingFlags(trade, flags & ~WEI_PAID);
+            sendWei(msg.sender, trade.price);
+        }
+    }
+
+    // Cancels expired bundle trades that are not Funded, as sweepExpired
+    // does for trades. The NFT lists of every trade are passed as in
+    // settleBundle, trades whose lists do not match are skipped.
+    function sweepExpiredBundles(
+        uint[] calldata _tradeIds,
+        NftItem[][] calldata _bidderNfts,
+        NftItem[][] calldata _askerNfts
+    )
+    external
+    returns (uint swept) {
+        require(_bidderNfts.length == _tradeIds.length &&
+            _askerNfts.length == _tradeIds.length,
+        "Every trade must have its NFT lists!");
+        for (uint i = 0; i < _tradeIds.length; i++) {
+            if (sweepExpiredBundle(_tradeIds[i], _bidderNfts[i], _askerNfts[i])) {
+                swept++;
+            }
+        }
+    }
+
+    function sweepExpiredBundle(
+        uint _tradeId,
+        NftItem[] calldata _bidderNfts,
+        NftItem[] calldata _askerNfts
+    ) internal returns (bool) {
+        BundleTrade storage stored = idToBundleTrade[_tradeId];
+        if (stored.expirestAt == 0 ||
+            stored.expirestAt > block.timestamp ||
+            stored.status == TradeStatus.Funded ||
+            hashNfts(_bidderNfts) != stored.bidderNftsHash ||
+            hashNfts(_askerNfts) != stored.askerNftsHash) {
+            return false;
+        }
+        BundleTrade memory trade = closeBundleTrade(
+            _tradeId, _bidderNfts, _askerNfts, TradeStatus.Cancelled);
+        if ((trade.flags & BIDDER_NFT_STAKED) != 0) {
+            transferNfts(_bidderNfts, address(this), trade.bidder);
+        }
+        if ((trade.flags & ASKER_NFT_STAKED) != 0) {
+            transferNfts(_askerNfts, address(this), trade.asker);
+        }
+        if ((trade.flags & WEI_PAID) != 0 && trade.price != 0) {
+            // Credited, the bidder takes it out with withdrawAll.
+            changeBalance(trade.bidder, addressToBalance[trade.bidder] + trade.price);
+        }
+        return true;
+    }
+
+    // Staking without approval: the owner calls
+    // `safeTransferFrom(owner, exchange, nftId, abi.encode(tradeId))`
+    // on the NFT contract. Transfers pulled by `stakeNft` and transfers
+    // without data are accepted as before.
+    function onERC721Received(
+        address _operator,
+        address _from,
+        uint256 _nftId,
+        bytes memory _data
+    )
+    public
+    override
+    returns (bytes4) {
+        if (_operator != address(this) && _data.length != 0) {
+            _stakeReceivedNft(abi.decode(_data, (uint)), _from, _nftId);
+        }
+        return this.onERC721Received.selector;
+    }
+
     function getTradeById(
         uint _tradeId
     )
@@ -334,11 +1295,157 @@ contract NFTToNFTExchange is Ownable, NFTToNFTExchangeDataEventsModifiers {
             trade.askerNFTAddress,
             trade.bidder,
             trade.asker,
-            trade.creator,
-            trade.paid,
+            (trade.flags & CREATED_BY_BIDDER) != 0 ? trade.bidder : trade.asker,
+            trade.status == TradeStatus.Funded,
             trade.bidderNFTId,
             trade.askerNFTId,
             trade.price
         );
     }
+
+    function tradeCount()
+    external
+    view
+    returns (uint) {
+        return lastTradeId;
+    }
+
+    // Trades that do not exist or were settled are returned zeroed,
+    // they can be recognized by `expirestAt == 0`.
+    function getTradesByIds(
+        uint[] calldata _tradeIds
+    )
+    external
+    view
+    returns (Trade[] memory) {
+        Trade[] memory trades = new Trade[](_tradeIds.length);
+        for (uint i = 0; i < _tradeIds.length; i++) {
+            trades[i] = idToTrade[_tradeIds[i]];
+        }
+        return trades;
+    }
+
+    // Returns up to `_limit` trades starting from id `_offset + 1`.
+    function getTrades(
+        uint _offset,
+        uint _limit
+    )
+    external
+    view
+    returns (Trade[] memory) {
+        uint count = _offset < lastTradeId ? lastTradeId - _offset : 0;
+        if (count > _limit) {
+            count = _limit;
+        }
+        Trade[] memory trades = new Trade[](count);
+        for (uint i = 0; i < count; i++) {
+            trades[i] = idToTrade[_offset + i + 1];
+        }
+        return trades;
+    }
+
+    // Open trades in which the account is the bidder, the asker or
+    // the creator.
+    function tradesOfAccount(
+        address _account,
+        uint _offset,
+        uint _limit
+    )
+    external
+    view
+    returns (uint[] memory) {
+        return sliceOfIndex(accountToTradeIds[_account], _offset, _limit);
+    }
+
+    // Open trades whose creator asks for the NFT.
+    function tradesOfNft(
+        IERC721 _nftAddress,
+        uint _nftId,
+        uint _offset,
+        uint _limit
+    )
+    external
+    view
+    returns (uint[] memory) {
+        return sliceOfIndex(
+            nftToTradeIds[nftKey(_nftAddress, _nftId)],
+            _offset,
+            _limit
+        );
+    }
+
+    function domainSeparator()
+    external
+    view
+    returns (bytes32) {
+        return _domainSeparatorV4();
+    }
+
+    function isOrderNonceUsed(
+        address _maker,
+        uint _nonce
+    )
+    external
+    view
+    returns (bool) {
+        return makerToNonceToUsed[_maker][_nonce];
+    }
+
+    function getBalance(
+        address _account
+    )
+    external
+    view
+    returns (uint) {
+        return addressToBalance[_account];
+    }
+
+    function bundleTradeCount()
+    external
+    view
+    returns (uint) {
+        return lastBundleTradeId;
+    }
+
+    // Open bundle trades in which the account is the bidder, the asker
+    // or the creator.
+    function bundlesOfAccount(
+        address _account,
+        uint _offset,
+        uint _limit
+    )
+    external
+    view
+    returns (uint[] memory) {
+        return sliceOfIndex(accountToBundleIds[_account], _offset, _limit);
+    }
+
+    // Open bundle trades whose creator asks for the NFT.
+    function bundlesOfNft(
+        IERC721 _nftAddress,
+        uint _nftId,
+        uint _offset,
+        uint _limit
+    )
+    external
+    view
+    returns (uint[] memory) {
+        return sliceOfIndex(
+            nftToBundleIds[nftKey(_nftAddress, _nftId)],
+            _offset,
+            _limit
+        );
+    }
+
+    function getBundleTradeById(
+        uint _tradeId
+    )
+    external
+    view
+    isBundleTradeExist(
+        _tradeId
+    )
+    returns (BundleTrade memory) {
+        return idToBundleTrade[_tradeId];
+    }
 }
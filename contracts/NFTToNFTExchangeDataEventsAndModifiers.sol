@@ -8,27 +8,138 @@ contract NFTToNFTExchangeDataEventsModifiers is IERC721Receiver{
     address internal zero;
     uint internal minDuration;
     uint internal lastTradeId;
-    mapping (address => mapping(uint => uint)) 
-    internal nftOwnerToTradeIdToNftId;
+    uint internal lastBundleTradeId;
     mapping (uint => Trade) internal idToTrade;
-    mapping (address => mapping(uint => uint)) 
-    internal addressToTradeIdToWei;
-    mapping (IERC721 => uint) internal NFTThatAlreadyStaked;
+    mapping (uint => BundleTrade) internal idToBundleTrade;
+    // Open trades of an account and of an NFT. Positions are 1-based,
+    // zero means that the trade is not in the list.
+    mapping (address => uint[]) internal accountToTradeIds;
+    mapping (address => mapping(uint => uint))
+    internal accountToTradeIdToPosition;
+    mapping (bytes32 => uint[]) internal nftToTradeIds;
+    mapping (bytes32 => mapping(uint => uint))
+    internal nftToTradeIdToPosition;
+    // Open bundle trades of an account and of an NFT, kept the same way.
+    mapping (address => uint[]) internal accountToBundleIds;
+    mapping (address => mapping(uint => uint))
+    internal accountToBundleIdToPosition;
+    mapping (bytes32 => uint[]) internal nftToBundleIds;
+    mapping (bytes32 => mapping(uint => uint))
+    internal nftToBundleIdToPosition;
 
+    // Filled and cancelled signed orders.
+    mapping (address => mapping(uint => bool)) internal makerToNonceToUsed;
+    // Wei deposited for signed bids, received from filled orders and
+    // settled trades and refunded from swept trades.
+    mapping (address => uint) internal addressToBalance;
+
+    bytes32 internal constant ORDER_TYPEHASH = keccak256(
+        "Order(address maker,bool isBid,address bidderNFTAddress,address askerNFTAddress,uint256 bidderNFTId,uint256 askerNFTId,uint256 price,uint256 expirestAt,uint256 nonce)"
+    );
+
+    // Signed off-chain order, never written to storage. A bid order
+    // (`isBid`) is signed by the bidder and filled by an asker, an ask
+    // order the other way round.
+    struct Order {
+        address maker;
+        bool isBid;
+        IERC721 bidderNFTAddress;
+        IERC721 askerNFTAddress;
+        uint bidderNFTId;
+        uint askerNFTId;
+        uint price;
+        uint expirestAt;
+        uint nonce;
+    }
+
+    // Open -> PartiallyFunded -> Funded -> Settled. An expired trade
+    // that is not Funded can be Cancelled. The status follows the
+    // *_STAKED/WEI_PAID flags until the trade is closed. Closed trades
+    // are deleted from storage, Settled and Cancelled are reported by
+    // `TradeClosed`.
+    enum TradeStatus {
+        Open,
+        PartiallyFunded,
+        Funded,
+        Settled,
+        Cancelled
+    }
+
+    // Bits of `Trade.flags`.
+    uint8 internal constant CREATED_BY_BIDDER = 1;
+    uint8 internal constant BIDDER_NFT_STAKED = 2;
+    uint8 internal constant ASKER_NFT_STAKED = 4;
+    uint8 internal constant WEI_PAID = 8;
+    uint8 internal constant BIDDER_RECEIVED_NFT = 16;
+    uint8 internal constant ASKER_RECEIVED_NFT = 32;
+    uint8 internal constant ASKER_RECEIVED_WEI = 64;
+    uint8 internal constant FUNDED = BIDDER_NFT_STAKED | ASKER_NFT_STAKED | WEI_PAID;
+    uint8 internal constant RECEIVED = BIDDER_RECEIVED_NFT | ASKER_RECEIVED_NFT | ASKER_RECEIVED_WEI;
+
+    // Fields are ordered so that the struct takes 6 storage slots and
+    // everything the modifiers check is in slot 0. The creator is not
+    // stored: it is the bidder when CREATED_BY_BIDDER is set and the
+    // asker otherwise.
     struct Trade {
+        // Slot 0.
         address bidder;
+        uint40 expirestAt;
+        TradeStatus status;
+        uint8 flags;
+        // Slot 1.
         address asker;
-        address creator;
+        uint96 price;
+        // Slot 2.
         IERC721 bidderNFTAddress;
+        // Slot 3.
         IERC721 askerNFTAddress;
+        // Slot 4.
         uint askerNFTId;
+        // Slot 5.
         uint bidderNFTId;
-        uint expirestAt;
+    }
+
+    struct NftItem {
+        IERC721 nftAddress;
+        uint nftId;
+    }
+
+    // A trade of many NFTs against many NFTs. Only hashes of the two
+    // NFT lists are stored, the lists are emitted in `BundleCreated`
+    // and passed as calldata to stake, unstake, settle and sweep. Status
+    // and flags work as in `Trade`. Ids are counted apart from trades and
+    // only appear in the Bundle* events, never in the events of trades.
+    struct BundleTrade {
+        // Slot 0.
+        address bidder;
+        uint40 expirestAt;
+        TradeStatus status;
+        uint8 flags;
+        // Slot 1.
+        address asker;
+        uint96 price;
+        // Slot 2.
+        bytes32 bidderNftsHash;
+        // Slot 3.
+        bytes32 askerNftsHash;
+    }
+
+    // Arguments of createBundleBid/createBundleAsk.
+    struct BundleParams {
+        NftItem[] bidderNfts;
+        NftItem[] askerNfts;
+        uint duration;
+        uint price;
+    }
+
+    // Arguments of createBid/createAsk, used by the batch variants.
+    struct TradeParams {
+        uint bidderNFTId;
+        uint askerNFTId;
+        IERC721 bidderNFTAddress;
+        IERC721 askerNFTAddress;
+        uint duration;
         uint price;
-        bool paid;
-        bool bidderReceiveNft;
-        bool askerReceiveNft;
-        bool askerReceiveWei;
     }
 
     modifier nftNotEqual(
@@ -51,6 +162,17 @@ contract NFTToNFTExchangeDataEventsModifiers is IERC721Receiver{
         _;
     }
 
+    modifier valuesFitIntoTrade(
+        uint _duration,
+        uint _price
+    ) {
+        require(_duration <= type(uint40).max - block.timestamp,
+        "The duration value is too large!");
+        require(_price <= type(uint96).max,
+        "The price value is too large!");
+        _;
+    }
+
     modifier nftIdIsInTrade(
         uint _tradeId,
         uint _nftId
@@ -61,6 +183,27 @@ contract NFTToNFTExchangeDataEventsModifiers is IERC721Receiver{
         _;
     }
 
+    modifier arraysLengthsAreEqual(
+        uint _firstLength,
+        uint _secondLength
+    ) {
+        require(_firstLength == _secondLength,
+        "Arrays must have the same length!");
+        _;
+    }
+
+    modifier isOrderAvailable(
+        address _maker,
+        uint _nonce,
+        uint _expirestAt
+    ) {
+        require(_expirestAt > block.timestamp,
+        "Order is expired!");
+        require(!makerToNonceToUsed[_maker][_nonce],
+        "Order is already filled or cancelled!");
+        _;
+    }
+
     modifier isTradeExist(
         uint _tradeId
     ) {
@@ -69,11 +212,27 @@ contract NFTToNFTExchangeDataEventsModifiers is IERC721Receiver{
         _;
     }
 
+    modifier isBundleTradeExist(
+        uint _tradeId
+    ) {
+        require(idToBundleTrade[_tradeId].expirestAt != 0,
+        "Trade does not exist!");
+        _;
+    }
+
+    modifier isBundleTradeAvailable(
+        uint _tradeId
+    ) {
+        require(idToBundleTrade[_tradeId].expirestAt > block.timestamp,
+        "The timestamp of the trade must be less than the block timestamp value!");
+        _;
+    }
+
     modifier isTradePaid(
         uint _tradeId
     ) {
-        Trade memory trade = idToTrade[_tradeId];
-        require(trade.paid, "Trade must be paid!!");
+        require(idToTrade[_tradeId].status == TradeStatus.Funded,
+        "Trade must be paid!!");
         _;
     }
 
@@ -104,41 +263,97 @@ contract NFTToNFTExchangeDataEventsModifiers is IERC721Receiver{
     modifier weiNotPaidBeforeForThisTrade(
         uint _tradeId
     ) {
-        require(addressToTradeIdToWei[msg.sender][_tradeId] == 0,
+        require((idToTrade[_tradeId].flags & WEI_PAID) == 0,
         "Trade has already been paid!");
         _;
     }
 
     event BidCreated(
         uint indexed TradeId,
-        address creator,
+        address indexed creator,
         address bidderAddress,
         IERC721 bidderNFTAddress,
         IERC721 askerNFTAddress,
-        uint indexed bidderNFTId,
-        uint indexed askerNFTId,
+        uint bidderNFTId,
+        uint askerNFTId,
         uint price,
         uint expirestAt
     );
 
     event AskCreated(
         uint indexed TradeId,
-        address creator,
+        address indexed creator,
         address askerAddress,
         IERC721 bidderNFTAddress,
         IERC721 askerNFTAddress,
-        uint indexed bidderNFTId,
-        uint indexed askerNFTId,
+        uint bidderNFTId,
+        uint askerNFTId,
+        uint price,
+        uint expirestAt
+    );
+
+    // One event per NFT of a trade, emitted on creation, so trades can be
+    // filtered on the node by collection or by NFT.
+    event TradeNftListed(
+        uint indexed tradeId,
+        IERC721 indexed nftAddress,
+        uint indexed nftId,
+        bool isBidderNft
+    );
+
+    event BundleCreated(
+        uint indexed tradeId,
+        address indexed creator,
+        bool isBid,
+        NftItem[] bidderNfts,
+        NftItem[] askerNfts,
         uint price,
         uint expirestAt
     );
 
+    event BundleStaked(
+        uint indexed tradeId,
+        address indexed staker,
+        bytes32 indexed nftsHash
+    );
+
+    event BundleNftListed(
+        uint indexed tradeId,
+        IERC721 indexed nftAddress,
+        uint indexed nftId,
+        bool isBidderNft
+    );
+
+    event BundlePaid(
+        uint indexed tradeId,
+        address indexed bidder,
+        uint indexed amount
+    );
+
+    event BundleClosed(
+        uint indexed tradeId,
+        TradeStatus status
+    );
+
     event NftStaked(
         uint indexed tradeId,
+        address indexed staker,
         IERC721 indexed nftAddress,
+        uint nftId
+    );
+
+    event NftUnstaked(
+        uint indexed tradeId,
+        address indexed to,
         uint indexed nftId
     );
 
+    event WeiUnstaked(
+        uint indexed tradeId,
+        address indexed to,
+        uint indexed amount
+    );
+
     event AmountPaid(
         uint indexed tradeId,
         address indexed bidder,
@@ -157,6 +372,34 @@ contract NFTToNFTExchangeDataEventsModifiers is IERC721Receiver{
         uint indexed amount
     );
 
+    event TradeClosed(
+        uint indexed tradeId,
+        TradeStatus status
+    );
+
+    event TradesMatched(
+        uint indexed tradeId,
+        uint indexed askTradeId,
+        address indexed asker,
+        uint price
+    );
+
+    event OrderFilled(
+        bytes32 indexed orderHash,
+        address indexed maker,
+        address indexed taker
+    );
+
+    event OrderCancelled(
+        address indexed maker,
+        uint indexed nonce
+    );
+
+    event BalanceChanged(
+        address indexed account,
+        uint balance
+    );
+
     function onERC721Received(address, address, uint256, bytes memory) public virtual override returns (bytes4) {
         return this.onERC721Received.selector;
     }
@@ -0,0 +1,34 @@
+// SPDX-License-Identifier: MIT 
+pragma solidity 0.8.7;
+
+import "./NFTToNFTExchange.sol";
+import "@openzeppelin/contracts/proxy/Clones.sol";
+
+// Deploys an exchange per market as an EIP-1167 minimal proxy of one
+// NFTToNFTExchange implementation. A clone delegates every call to the
+// implementation and keeps its own storage, so a market costs the 45 bytes
+// of the proxy and its initialization instead of the full bytecode.
+contract NFTToNFTExchangeFactory {
+    address public immutable implementation;
+
+    event ExchangeCreated(
+        address indexed exchange,
+        address indexed owner,
+        uint minDuration
+    );
+
+    constructor(address _implementation) {
+        implementation = _implementation;
+    }
+
+    function createExchange(
+        uint _minDuration,
+        address _owner
+    )
+    external
+    returns (address exchange) {
+        exchange = Clones.clone(implementation);
+        NFTToNFTExchange(exchange).initialize(_minDuration, _owner);
+        emit ExchangeCreated(exchange, _owner, _minDuration);
+    }
+}
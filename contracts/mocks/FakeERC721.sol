@@ -8,4 +8,11 @@ contract FakeERC721 is ERC721("testToken", "tNFT") {
     function mint(uint _tokenId, address _beneficiary) public {
         _mint(_beneficiary, _tokenId);
     }
+
+    // Mints the ids `_fromTokenId` .. `_fromTokenId + _count - 1`.
+    function mintRange(uint _fromTokenId, uint _count, address _beneficiary) public {
+        for (uint tokenId = _fromTokenId; tokenId < _fromTokenId + _count; tokenId++) {
+            _mint(_beneficiary, tokenId);
+        }
+    }
 }
\ No newline at end of file
@@ -0,0 +1,188 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.7;
+
+import "@openzeppelin/contracts/token/ERC721/IERC721.sol";
+import "@openzeppelin/contracts/token/ERC721/IERC721Receiver.sol";
+import "@openzeppelin/contracts/utils/Address.sol";
+import "@openzeppelin/contracts/utils/introspection/ERC165.sol";
+
+// ERC721 mock with consecutive minting: a batch stores its owner once per
+// OWNER_CHECKPOINT tokens, and `ownerOf` walks back to the closest stored
+// owner. A batch emits one EIP-2309 ConsecutiveTransfer instead of a
+// Transfer per token, so minting thousands of tokens costs a few storage
+// writes. Token ids start at 0 and burning is not supported.
+contract FakeERC721A is ERC165, IERC721 {
+    using Address for address;
+
+    event ConsecutiveTransfer(
+        uint indexed fromTokenId,
+        uint toTokenId,
+        address indexed fromAddress,
+        address indexed toAddress
+    );
+
+    // Bounds the walk of `ownerOf` to keep transfers cheap.
+    uint constant OWNER_CHECKPOINT = 128;
+
+    uint public nextTokenId;
+
+    // Owner of a token if it was the first of its batch or was
+    // transferred, zero otherwise.
+    mapping(uint => address) private tokenIdToExplicitOwner;
+    mapping(address => uint) private addressToBalance;
+    mapping(uint => address) private tokenIdToApproved;
+    mapping(address => mapping(address => bool)) private ownerToOperatorToApproved;
+
+    function supportsInterface(
+        bytes4 _interfaceId
+    ) public view virtual override(ERC165, IERC165) returns (bool) {
+        return _interfaceId == type(IERC721).interfaceId ||
+            super.supportsInterface(_interfaceId);
+    }
+
+    // Mints `_count` consecutive tokens to `_beneficiary` and returns the
+    // first token id.
+    function mint(
+        uint _count,
+        address _beneficiary
+    ) public returns (uint firstTokenId) {
+        require(_beneficiary != address(0), "ERC721: mint to the zero address");
+        require(_count != 0, "Nothing to mint!");
+        firstTokenId = nextTokenId;
+        nextTokenId = firstTokenId + _count;
+        for (uint tokenId = firstTokenId; tokenId < nextTokenId; tokenId += OWNER_CHECKPOINT) {
+            tokenIdToExplicitOwner[tokenId] = _beneficiary;
+        }
+        addressToBalance[_beneficiary] += _count;
+        emit ConsecutiveTransfer(firstTokenId, nextTokenId - 1, address(0), _beneficiary);
+    }
+
+    function balanceOf(
+        address _owner
+    ) public view override returns (uint) {
+        require(_owner != address(0), "ERC721: balance query for the zero address");
+        return addressToBalance[_owner];
+    }
+
+    function ownerOf(
+        uint _tokenId
+    ) public view override returns (address) {
+        require(_tokenId < nextTokenId, "ERC721: owner query for nonexistent token");
+        // The first token of every batch and every OWNER_CHECKPOINT-th token
+        // after it have an explicit owner.
+        for (uint tokenId = _tokenId; ; tokenId--) {
+            address owner = tokenIdToExplicitOwner[tokenId];
+            if (owner != address(0)) {
+                return owner;
+            }
+        }
+    }
+
+    function approve(
+        address _to,
+        uint _tokenId
+    ) public override {
+        address owner = ownerOf(_tokenId);
+        require(_to != owner, "ERC721: approval to current owner");
+        require(msg.sender == owner || isApprovedForAll(owner, msg.sender),
+        "ERC721: approve caller is not owner nor approved for all");
+        tokenIdToApproved[_tokenId] = _to;
+        emit Approval(owner, _to, _tokenId);
+    }
+
+    function getApproved(
+        uint _tokenId
+    ) public view override returns (address) {
+        require(_tokenId < nextTokenId, "ERC721: approved query for nonexistent token");
+        return tokenIdToApproved[_tokenId];
+    }
+
+    function setApprovalForAll(
+        address _operator,
+        bool _approved
+    ) public override {
+        require(_operator != msg.sender, "ERC721: approve to caller");
+        ownerToOperatorToApproved[msg.sender][_operator] = _approved;
+        emit ApprovalForAll(msg.sender, _operator, _approved);
+    }
+
+    function isApprovedForAll(
+        address _owner,
+        address _operator
+    ) public view override returns (bool) {
+        return ownerToOperatorToApproved[_owner][_operator];
+    }
+
+    function transferFrom(
+        address _from,
+        address _to,
+        uint _tokenId
+    ) public override {
+        transfer(_from, _to, _tokenId);
+    }
+
+    function safeTransferFrom(
+        address _from,
+        address _to,
+        uint _tokenId
+    ) public override {
+        safeTransferFrom(_from, _to, _tokenId, "");
+    }
+
+    function safeTransferFrom(
+        address _from,
+        address _to,
+        uint _tokenId,
+        bytes memory _data
+    ) public override {
+        transfer(_from, _to, _tokenId);
+        require(checkOnERC721Received(_from, _to, _tokenId, _data),
+        "ERC721: transfer to non ERC721Receiver implementer");
+    }
+
+    function transfer(
+        address _from,
+        address _to,
+        uint _tokenId
+    ) internal {
+        address owner = ownerOf(_tokenId);
+        require(owner == _from, "ERC721: transfer of token that is not own");
+        require(_to != address(0), "ERC721: transfer to the zero address");
+        require(msg.sender == owner ||
+            tokenIdToApproved[_tokenId] == msg.sender ||
+            isApprovedForAll(owner, msg.sender),
+        "ERC721: transfer caller is not owner nor approved");
+
+        delete tokenIdToApproved[_tokenId];
+        addressToBalance[_from] -= 1;
+        addressToBalance[_to] += 1;
+        tokenIdToExplicitOwner[_tokenId] = _to;
+        // The next token of the batch keeps its owner.
+        uint nextId = _tokenId + 1;
+        if (nextId < nextTokenId && tokenIdToExplicitOwner[nextId] == address(0)) {
+            tokenIdToExplicitOwner[nextId] = _from;
+        }
+        emit Transfer(_from, _to, _tokenId);
+    }
+
+    function checkOnERC721Received(
+        address _from,
+        address _to,
+        uint _tokenId,
+        bytes memory _data
+    ) private returns (bool) {
+        if (!_to.isContract()) {
+            return true;
+        }
+        try IERC721Receiver(_to).onERC721Received(msg.sender, _from, _tokenId, _data) returns (bytes4 retval) {
+            return retval == IERC721Receiver.onERC721Received.selector;
+        } catch (bytes memory reason) {
+            if (reason.length == 0) {
+                revert("ERC721: transfer to non ERC721Receiver implementer");
+            }
+            assembly {
+                revert(add(32, reason), mload(reason))
+            }
+        }
+    }
+}
@@ -0,0 +1,27 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.7;
+
+import "@openzeppelin/contracts/token/ERC721/IERC721Receiver.sol";
+
+// Contract wallet whose `receive` writes to storage, so it needs more
+// than the 2300 gas stipend of `transfer`.
+contract FakeWallet is IERC721Receiver {
+    uint public received;
+
+    receive() external payable {
+        received += msg.value;
+    }
+
+    function execute(
+        address _target,
+        bytes calldata _data
+    ) external payable returns (bytes memory) {
+        (bool success, bytes memory result) = _target.call{value: msg.value}(_data);
+        require(success, "Call failed!");
+        return result;
+    }
+
+    function onERC721Received(address, address, uint256, bytes memory) public pure override returns (bytes4) {
+        return this.onERC721Received.selector;
+    }
+}
@@ -0,0 +1,104 @@
+"""
+    Log query benchmark of NFTToNFTExchange events.
+
+    brownie run scripts/bench/log_queries.py main [trade count]
+
+    Creates thousands of trades on the development network, spread over
+    several creators and collections, then answers "trades created by X"
+    and "trades on collection Y" in two ways: with a topic filter that the
+    node applies, and by downloading every creation log and filtering it
+    in Python. Prints the query time, the number of logs and the size of
+    the JSON-RPC response of both.
+"""
+import json
+import time
+from typing import Callable, List, Optional, Tuple
+
+from eth_utils import event_abi_to_log_topic
+from brownie import NFTToNFTExchange, FakeERC721, accounts, web3
+
+DEFAULT_TRADE_COUNT = 5000
+BATCH_SIZE = 20
+CREATORS = 5
+COLLECTIONS = 4
+
+def event_topic(exchange, name: str) -> str:
+    abi = next(abi for abi in exchange.abi if abi['type'] == 'event' and abi['name'] == name)
+    return web3.toHex(event_abi_to_log_topic(abi))
+
+def address_topic(address: str) -> str:
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+def log_filter(exchange, topics: list) -> dict:
+    return {
+        'address': exchange.address,
+        'fromBlock': 0,
+        'toBlock': "latest",
+        'topics': topics
+    }
+
+def response_size(exchange, topics: list) -> int:
+    """ Size in bytes of the raw eth_getLogs response. """
+    params = {**log_filter(exchange, topics), 'fromBlock': "0x0"}
+    return len(json.dumps(web3.provider.make_request('eth_getLogs', [params])))
+
+def measure(exchange, topics: list, matches: Optional[Callable[[dict], bool]]) -> Tuple[float, int]:
+    """ Time of the query and the number of matching logs. With `matches`
+    the logs are decoded and filtered in Python. """
+    contract = web3.eth.contract(address=exchange.address, abi=exchange.abi)
+    events = {
+        event_topic(exchange, name): getattr(contract.events, name)()
+        for name in ('BidCreated', 'AskCreated')
+    }
+    started = time.perf_counter()
+    logs = web3.eth.get_logs(log_filter(exchange, topics))
+    if matches is not None:
+        decoded = [events[web3.toHex(log['topics'][0])].processLog(log) for log in logs]
+        logs = [log for log in decoded if matches(log['args'])]
+    return time.perf_counter() - started, len(logs)
+
+def create_trades(exchange, collections: List, trade_count: int) -> None:
+    for offset in range(0, trade_count, BATCH_SIZE):
+        trades = [
+            (
+                trade_id,
+                trade_id,
+                collections[trade_id % COLLECTIONS],
+                collections[(trade_id + 1) % COLLECTIONS],
+                700,
+                3000
+            )
+            for trade_id in range(offset, min(offset + BATCH_SIZE, trade_count))
+        ]
+        creator = accounts[3 + (offset // BATCH_SIZE) % CREATORS]
+        if offset // BATCH_SIZE % 2:
+            exchange.createAsks(trades, {'from': creator})
+        else:
+            exchange.createBids(trades, {'from': creator})
+
+def main(trade_count: int = DEFAULT_TRADE_COUNT) -> None:
+    exchange = NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+    collections = [FakeERC721.deploy({'from': accounts[1]}).address for _ in range(COLLECTIONS)]
+    create_trades(exchange, collections, int(trade_count))
+
+    created_topics = [event_topic(exchange, 'BidCreated'), event_topic(exchange, 'AskCreated')]
+    creator, collection = accounts[3].address, collections[0]
+    queries = (
+        ("created by X, topic filter", [created_topics, address_topic(creator)], None),
+        ("created by X, full scan", [created_topics], lambda args: args['creator'] == creator),
+        (
+            "collection Y, topic filter",
+            [event_topic(exchange, 'TradeNftListed'), None, address_topic(collection)],
+            None
+        ),
+        (
+            "collection Y, full scan",
+            [created_topics],
+            lambda args: collection in (args['bidderNFTAddress'], args['askerNFTAddress'])
+        )
+    )
+    print(f"{'query':<30}{'seconds':>10}{'logs':>10}{'bytes':>14}")
+    for name, topics, matches in queries:
+        seconds, log_count = measure(exchange, topics, matches)
+        size = response_size(exchange, topics)
+        print(f"{name:<30}{seconds:>10.3f}{log_count:>10}{size:>14}")
@@ -0,0 +1,161 @@
+"""
+    Content-hash build cache for offline test and deploy startup.
+
+    python scripts/build_cache/build_cache.py key|restore|save|vendor|bench
+
+    Brownie recompiles every contract when `build/` is missing, which is the
+    case on every fresh CI checkout, and needs the network to install solc.
+    This script is run with plain Python before brownie, since `brownie run`
+    compiles the project before the script starts.
+
+    The cache key is a SHA-256 of the contract sources, the OpenZeppelin
+    sources they are compiled against (resolved through the remapping to
+    node_modules) and the `compiler` section of brownie-config.yaml, which
+    holds the solc version and optimizer settings.
+
+        key      prints the key;
+        restore  extracts the artifacts of the key into build/, exits with 1
+                 on a miss;
+        save     archives build/contracts and build/interfaces under the key;
+        vendor   archives node_modules/@openzeppelin and the solc binary,
+                 `restore` unpacks them when they are missing so that a
+                 machine without network can compile;
+        bench    times `brownie compile` from an empty build/ and after a
+                 restore.
+
+    The cache directory is ~/.cache/nft-exchange-build, or BUILD_CACHE_DIR.
+    On CI, cache that directory and run:
+
+        npm run build-cache:restore || (brownie compile && npm run build-cache:save)
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+from pathlib import Path
+from typing import Iterable, List
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIR = Path(os.environ.get('BUILD_CACHE_DIR', Path.home() / ".cache" / "nft-exchange-build"))
+BUILD_DIRS = ("contracts", "interfaces")
+OPENZEPPELIN = ROOT / "node_modules" / "@openzeppelin"
+VENDOR_ARCHIVE = "vendor.tar.gz"
+
+def compiler_settings() -> dict:
+    config = yaml.safe_load((ROOT / "brownie-config.yaml").read_text())
+    return config['compiler']
+
+def solc_binary() -> Path:
+    version = compiler_settings()['solc']['version']
+    solcx_dir = Path(os.environ.get('SOLCX_BINARY_PATH', Path.home() / ".solcx"))
+    return solcx_dir / f"solc-v{version}"
+
+def source_files() -> Iterable[Path]:
+    yield from sorted((ROOT / "contracts").rglob("*.sol"))
+    yield from sorted(OPENZEPPELIN.rglob("*.sol"))
+
+def cache_key() -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps(compiler_settings(), sort_keys=True).encode())
+    for path in source_files():
+        digest.update(str(path.relative_to(ROOT)).encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+def archive_path(key: str) -> Path:
+    return CACHE_DIR / f"build-{key}.tar.gz"
+
+def restore_vendor() -> None:
+    """ Unpacks the vendored sources and solc if they are missing. """
+    archive = CACHE_DIR / VENDOR_ARCHIVE
+    if not archive.is_file() or (OPENZEPPELIN.is_dir() and solc_binary().exists()):
+        return
+    with tarfile.open(archive) as tar:
+        for member in tar.getmembers():
+            if member.name.startswith("solc/"):
+                member.name = member.name[len("solc/"):]
+                tar.extract(member, solc_binary().parent)
+            else:
+                tar.extract(member, ROOT)
+
+def restore() -> bool:
+    restore_vendor()
+    archive = archive_path(cache_key())
+    if not archive.is_file():
+        return False
+    for name in BUILD_DIRS:
+        shutil.rmtree(ROOT / "build" / name, ignore_errors=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(ROOT)
+    return True
+
+def save() -> Path:
+    archive = archive_path(cache_key())
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    partial = archive.with_suffix(".partial")
+    with tarfile.open(partial, "w:gz") as tar:
+        for name in BUILD_DIRS:
+            if (ROOT / "build" / name).is_dir():
+                tar.add(ROOT / "build" / name, f"build/{name}")
+    # Concurrent jobs never read a half written archive.
+    partial.replace(archive)
+    return archive
+
+def vendor() -> Path:
+    if not OPENZEPPELIN.is_dir():
+        raise SystemExit("node_modules/@openzeppelin is missing, run npm install first.")
+    if not solc_binary().exists():
+        raise SystemExit(f"{solc_binary()} is missing, run brownie compile first.")
+    archive = CACHE_DIR / VENDOR_ARCHIVE
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(OPENZEPPELIN, str(OPENZEPPELIN.relative_to(ROOT)))
+        tar.add(solc_binary(), f"solc/{solc_binary().name}")
+    return archive
+
+def timed_compile() -> float:
+    started = time.perf_counter()
+    subprocess.run(["brownie", "compile"], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+def bench() -> None:
+    for name in BUILD_DIRS:
+        shutil.rmtree(ROOT / "build" / name, ignore_errors=True)
+    cold = timed_compile()
+    save()
+    for name in BUILD_DIRS:
+        shutil.rmtree(ROOT / "build" / name, ignore_errors=True)
+    started = time.perf_counter()
+    restore()
+    warm = time.perf_counter() - started + timed_compile()
+    print(f"Cold start (full compile): {cold:.2f} s")
+    print(f"Warm start (restore + compile): {warm:.2f} s")
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else "key"
+    if command == "key":
+        print(cache_key())
+    elif command == "restore":
+        if not restore():
+            print(f"No build cached for {cache_key()}")
+            return 1
+        print(f"Restored the build of {cache_key()}")
+    elif command == "save":
+        print(f"Saved {save()}")
+    elif command == "vendor":
+        print(f"Vendored into {vendor()}")
+    elif command == "bench":
+        bench()
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,56 @@
+"""
+    Read benchmark of the async exchange client.
+
+    brownie run scripts/client/bench_reads.py main [trade count] [sequential sample]
+
+    Creates the trades on the development network, then reads all of them
+    with `ExchangeClient` and a sample of them one by one, one
+    `getTradeById` call per trade through brownie, the way services read
+    trades today. The sequential time of all trades is extrapolated from
+    the sample.
+"""
+import asyncio
+import time
+
+from brownie import NFTToNFTExchange, FakeERC721, accounts, web3
+from scripts.client.exchange_client import ExchangeClient
+
+DEFAULT_TRADE_COUNT = 10000
+DEFAULT_SEQUENTIAL_SAMPLE = 1000
+BATCH_SIZE = 20
+
+def create_trades(exchange, trade_count: int) -> None:
+    bidder_token = FakeERC721.deploy({'from': accounts[1]})
+    asker_token = FakeERC721.deploy({'from': accounts[2]})
+    for offset in range(0, trade_count, BATCH_SIZE):
+        exchange.createBids(
+            [
+                (trade_id, trade_id, bidder_token.address, asker_token.address, 700, 3000)
+                for trade_id in range(offset, min(offset + BATCH_SIZE, trade_count))
+            ],
+            {'from': accounts[3 + offset // BATCH_SIZE % 10]}
+        )
+
+async def read_all(exchange, trade_count: int, multicall_size: int) -> float:
+    started = time.perf_counter()
+    async with ExchangeClient(web3.provider.endpoint_uri, exchange.address, multicall_size=multicall_size) as client:
+        trades = await client.get_trades(range(1, trade_count + 1))
+    assert len(trades) == trade_count and all(trade.exists for trade in trades)
+    return time.perf_counter() - started
+
+def main(trade_count: int = DEFAULT_TRADE_COUNT, sequential_sample: int = DEFAULT_SEQUENTIAL_SAMPLE) -> None:
+    trade_count, sequential_sample = int(trade_count), int(sequential_sample)
+    exchange = NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+    create_trades(exchange, trade_count)
+
+    started = time.perf_counter()
+    for trade_id in range(1, sequential_sample + 1):
+        exchange.getTradeById(trade_id)
+    sequential = (time.perf_counter() - started) * trade_count / sequential_sample
+    batched = asyncio.run(read_all(exchange, trade_count, 1))
+    multicall = asyncio.run(read_all(exchange, trade_count, 200))
+
+    print(f"Reading {trade_count} trades")
+    print(f"{'sequential (extrapolated)':<32}{sequential:>10.2f}s")
+    print(f"{'JSON-RPC batch, one id per call':<32}{batched:>10.2f}s  x{sequential / batched:.1f}")
+    print(f"{'JSON-RPC batch + getTradesByIds':<32}{multicall:>10.2f}s  x{sequential / multicall:.1f}")
@@ -0,0 +1,199 @@
+"""
+    Async read client of NFTToNFTExchange.
+
+    Reads go straight to the node's JSON-RPC endpoint over a pooled aiohttp
+    session. Many `eth_call`s are sent as one JSON-RPC batch, and trades are
+    read through the contract's own multicall view `getTradesByIds`, so
+    thousands of trades cost a handful of HTTP round-trips:
+
+        async with ExchangeClient(rpc_url, exchange_address) as client:
+            trades = await client.get_trades(range(1, 10001))
+"""
+import asyncio
+from dataclasses import dataclass
+from enum import IntEnum
+from itertools import count
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import aiohttp
+from eth_abi import decode_abi, encode_abi
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+TRADE_TYPE = "(address,uint40,uint8,uint8,address,uint96,address,address,uint256,uint256)"
+GET_TRADES_BY_IDS = function_signature_to_4byte_selector("getTradesByIds(uint256[])")
+TRADE_COUNT = function_signature_to_4byte_selector("tradeCount()")
+OWNER_OF = function_signature_to_4byte_selector("ownerOf(uint256)")
+
+# Flags of the contract.
+CREATED_BY_BIDDER = 1
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MULTICALL_SIZE = 200
+DEFAULT_MAX_CONNECTIONS = 8
+
+class TradeStatus(IntEnum):
+    OPEN = 0
+    PARTIALLY_FUNDED = 1
+    FUNDED = 2
+    SETTLED = 3
+    CANCELLED = 4
+
+@dataclass(frozen=True)
+class Trade:
+    trade_id: int
+    bidder: str
+    expires_at: int
+    status: TradeStatus
+    flags: int
+    asker: str
+    price: int
+    bidder_nft_address: str
+    asker_nft_address: str
+    asker_nft_id: int
+    bidder_nft_id: int
+
+    @property
+    def exists(self) -> bool:
+        """ Closed and unknown trades are returned zeroed by the contract. """
+        return self.expires_at != 0
+
+    @property
+    def creator(self) -> str:
+        return self.bidder if self.flags & CREATED_BY_BIDDER else self.asker
+
+    @classmethod
+    def decode(cls, trade_id: int, values: tuple) -> "Trade":
+        bidder, expires_at, status, flags, asker, price, bidder_nft, asker_nft, asker_nft_id, bidder_nft_id = values
+        return cls(
+            trade_id,
+            to_checksum_address(bidder),
+            expires_at,
+            TradeStatus(status),
+            flags,
+            to_checksum_address(asker),
+            price,
+            to_checksum_address(bidder_nft),
+            to_checksum_address(asker_nft),
+            asker_nft_id,
+            bidder_nft_id
+        )
+
+class ExchangeClientError(Exception):
+    pass
+
+def chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for offset in range(0, len(items), size):
+        yield items[offset:offset + size]
+
+class ExchangeClient:
+    """ Batched async reads of one exchange. Use it as an async context manager. """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        exchange_address: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        multicall_size: int = DEFAULT_MULTICALL_SIZE,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS
+    ) -> None:
+        self.rpc_url = rpc_url
+        self.exchange_address = to_checksum_address(exchange_address)
+        self.batch_size = batch_size
+        self.multicall_size = multicall_size
+        self.max_connections = max_connections
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.request_ids = count()
+
+    async def __aenter__(self) -> "ExchangeClient":
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+
+    async def post_batch(self, requests: List[dict]) -> List[dict]:
+        async with self.session.post(self.rpc_url, json=requests) as response:
+            response.raise_for_status()
+            results = await response.json()
+        # Batch responses may come back in any order.
+        results = {result['id']: result for result in results}
+        return [results[request['id']] for request in requests]
+
+    async def request(self, method: str, params: list):
+        """ One JSON-RPC request, for the calls that are not batched. """
+        response, = await self.post_batch([{
+            'jsonrpc': "2.0",
+            'id': next(self.request_ids),
+            'method': method,
+            'params': params
+        }])
+        if 'error' in response:
+            raise ExchangeClientError(response['error'].get('message', response['error']))
+        return response['result']
+
+    async def block_number(self) -> int:
+        return int(await self.request('eth_blockNumber', []), 16)
+
+    async def get_logs(self, from_block: int, to_block: int) -> List[dict]:
+        """ Raw logs of the exchange, hex encoded as the node returns them. """
+        return await self.request('eth_getLogs', [{
+            'address': self.exchange_address,
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block)
+        }])
+
+    async def call_many(self, calls: Sequence[Tuple[str, bytes]], block: str = "latest") -> List[bytes]:
+        """ Results of `eth_call`s given as (address, calldata), sent in
+        JSON-RPC batches of `batch_size` over concurrent connections. """
+        requests = [
+            {
+                'jsonrpc': "2.0",
+                'id': next(self.request_ids),
+                'method': "eth_call",
+                'params': [{'to': to, 'data': "0x" + data.hex()}, block]
+            }
+            for to, data in calls
+        ]
+        batches = await asyncio.gather(*(
+            self.post_batch(list(batch)) for batch in chunks(requests, self.batch_size)
+        ))
+        results = []
+        for response in (response for batch in batches for response in batch):
+            if 'error' in response:
+                raise ExchangeClientError(response['error'].get('message', response['error']))
+            results.append(bytes.fromhex(response['result'][2:]))
+
+        return results
+
+    async def trade_count(self) -> int:
+        result, = await self.call_many([(self.exchange_address, TRADE_COUNT)])
+        return decode_abi(['uint256'], result)[0]
+
+    async def get_trades(self, trade_ids: Iterable[int], block: str = "latest") -> List[Trade]:
+        """ Trades read with `getTradesByIds`, `multicall_size` ids per call. """
+        trade_ids = list(trade_ids)
+        id_chunks = list(chunks(trade_ids, self.multicall_size))
+        results = await self.call_many(
+            [
+                (self.exchange_address, GET_TRADES_BY_IDS + encode_abi(['uint256[]'], [list(chunk)]))
+                for chunk in id_chunks
+            ],
+            block
+        )
+        trades = []
+        for chunk, result in zip(id_chunks, results):
+            values = decode_abi([f"{TRADE_TYPE}[]"], result)[0]
+            trades.extend(Trade.decode(trade_id, value) for trade_id, value in zip(chunk, values))
+
+        return trades
+
+    async def owners_of(self, nft_address: str, nft_ids: Iterable[int], block: str = "latest") -> List[str]:
+        """ `ownerOf` of many NFTs of one collection in JSON-RPC batches. """
+        nft_address = to_checksum_address(nft_address)
+        results = await self.call_many(
+            [(nft_address, OWNER_OF + encode_abi(['uint256'], [nft_id])) for nft_id in nft_ids],
+            block
+        )
+        return [to_checksum_address(decode_abi(['address'], result)[0]) for result in results]
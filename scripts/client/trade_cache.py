@@ -0,0 +1,136 @@
+"""
+    Read-through LRU cache of exchange trades.
+
+    Trades are read with `ExchangeClient` at a known block and kept until a
+    log of the same trade id arrives from a later block, until they expire
+    (`expires_at`) or until the least recently used entries are evicted:
+
+        cache = TradeCache(client, max_size=50000)
+        await cache.refresh()          # once per block, applies new logs
+        trade = await cache.get(trade_id)
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+from eth_utils import event_signature_to_log_topic
+
+from scripts.client.exchange_client import ExchangeClient, Trade
+
+DEFAULT_MAX_SIZE = 10000
+# Events of the exchange whose first topic is not a trade id, bundle
+# trades have ids of their own. Every other event of the exchange
+# invalidates the trade in its first topic.
+NOT_TRADE_EVENTS = {
+    "0x" + event_signature_to_log_topic(signature).hex()
+    for signature in (
+        "OrderFilled(bytes32,address,address)",
+        "OrderCancelled(address,uint256)",
+        "BalanceChanged(address,uint256)",
+        "OwnershipTransferred(address,address)",
+        "BundleCreated(uint256,address,bool,(address,uint256)[],(address,uint256)[],uint256,uint256)",
+        "BundleStaked(uint256,address,bytes32)",
+        "BundleNftListed(uint256,address,uint256,bool)",
+        "BundlePaid(uint256,address,uint256)",
+        "BundleClosed(uint256,uint8)"
+    )
+}
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    expirations: int = 0
+
+@dataclass
+class CacheEntry:
+    trade: Trade
+    # The block the trade was read at.
+    block: int
+
+class TradeCache:
+    """ Bounded cache of `Trade`s keyed by trade id. """
+
+    def __init__(
+        self,
+        client: ExchangeClient,
+        max_size: int = DEFAULT_MAX_SIZE,
+        clock: Callable[[], float] = time.time
+    ) -> None:
+        self.client = client
+        self.max_size = max_size
+        self.clock = clock
+        self.entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self.stats = CacheStats()
+        # The last block whose logs have been applied.
+        self.last_block: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def get(self, trade_id: int) -> Trade:
+        return (await self.get_many([trade_id]))[0]
+
+    async def get_many(self, trade_ids: Iterable[int]) -> List[Trade]:
+        """ Cached trades, the misses are read in one batch. """
+        trade_ids = list(trade_ids)
+        now = self.clock()
+        trades = {}
+        for trade_id in trade_ids:
+            entry = self.entries.get(trade_id)
+            if entry is not None and entry.trade.expires_at <= now:
+                del self.entries[trade_id]
+                self.stats.expirations += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                continue
+            self.stats.hits += 1
+            self.entries.move_to_end(trade_id)
+            trades[trade_id] = entry.trade
+
+        misses = list(dict.fromkeys(i for i in trade_ids if i not in trades))
+        if misses:
+            block = await self.client.block_number()
+            for trade in await self.client.get_trades(misses, hex(block)):
+                trades[trade.trade_id] = trade
+                # Closed, unknown and expired trades are not kept.
+                if trade.expires_at > now:
+                    self.store(trade, block)
+
+        return [trades[trade_id] for trade_id in trade_ids]
+
+    def store(self, trade: Trade, block: int) -> None:
+        self.entries[trade.trade_id] = CacheEntry(trade, block)
+        self.entries.move_to_end(trade.trade_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, trade_id: int, block: Optional[int] = None) -> None:
+        """ Drops the trade, unless it was read after `block`. """
+        entry = self.entries.get(trade_id)
+        if entry is not None and (block is None or block > entry.block):
+            del self.entries[trade_id]
+            self.stats.invalidations += 1
+
+    def apply_logs(self, logs: Iterable[dict]) -> None:
+        for log in logs:
+            topics = log['topics']
+            if len(topics) < 2 or topics[0] in NOT_TRADE_EVENTS:
+                continue
+            self.invalidate(int(topics[1], 16), int(log['blockNumber'], 16))
+
+    async def refresh(self) -> None:
+        """ Applies the logs of the blocks mined since the last refresh. """
+        head = await self.client.block_number()
+        if self.last_block is not None and head > self.last_block:
+            self.apply_logs(await self.client.get_logs(self.last_block + 1, head))
+        elif self.last_block is not None and head < self.last_block:
+            # The chain went back, nothing read above `head` can be trusted.
+            for trade_id in [i for i, entry in self.entries.items() if entry.block > head]:
+                self.invalidate(trade_id)
+        self.last_block = head
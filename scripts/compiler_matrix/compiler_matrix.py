@@ -0,0 +1,126 @@
+"""
+    Compiler settings matrix of NFTToNFTExchange: deploy size against
+    runtime gas.
+
+    brownie run scripts/compiler_matrix/compiler_matrix.py main [runs] [via IR] [EVM versions] [output]
+
+    Compiles NFTToNFTExchange with solc (the version of brownie-config.yaml)
+    for every combination of the comma separated optimizer runs, viaIR
+    values (0, 1) and EVM versions ("default" leaves the compiler's), e.g.
+
+        brownie run scripts/compiler_matrix/compiler_matrix.py main 200,10000,99999 0,1 default,istanbul
+
+    Every build is deployed on the development network and runs the
+    lifecycle workload of the profiler (scripts/profiler). Writes a CSV
+    (build/compiler_matrix.csv by default) with the runtime bytecode size,
+    the deploy gas and the mean gas of every function, and prints it.
+    Combinations that do not compile or deploy are reported with the error.
+"""
+import csv
+import itertools
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import solcx
+import yaml
+from solcx.exceptions import SolcError
+from brownie import Contract, FakeERC721, accounts, chain, web3
+from scripts.profiler.profile_trades import run_lifecycle
+
+SOURCE = "contracts/NFTToNFTExchange.sol"
+CONTRACT = "NFTToNFTExchange"
+MIN_DURATION = 600
+DEFAULT_RUNS = "200,1000,10000,99999"
+DEFAULT_VIA_IR = "0,1"
+DEFAULT_EVM_VERSIONS = "default,istanbul,berlin,london"
+DEFAULT_OUTPUT = "build/compiler_matrix.csv"
+
+def solc_config() -> dict:
+    with open("brownie-config.yaml") as config:
+        return yaml.safe_load(config)['compiler']['solc']
+
+def compile_exchange(runs: int, via_ir: bool, evm_version: Optional[str]) -> dict:
+    """ ABI, creation and runtime bytecode of the exchange. """
+    config = solc_config()
+    settings = {
+        'remappings': [remapping.strip() for remapping in config.get('remappings', [])],
+        'optimizer': {'enabled': True, 'runs': runs},
+        'outputSelection': {SOURCE: {CONTRACT: ['abi', 'evm.bytecode.object', 'evm.deployedBytecode.object']}}
+    }
+    if via_ir:
+        settings['viaIR'] = True
+    if evm_version:
+        settings['evmVersion'] = evm_version
+    output = solcx.compile_standard(
+        {'language': "Solidity", 'sources': {SOURCE: {'urls': [SOURCE]}}, 'settings': settings},
+        allow_paths=".",
+        solc_version=config['version']
+    )
+    return output['contracts'][SOURCE][CONTRACT]
+
+def measure(build: dict) -> dict:
+    """ Deploy gas and mean gas by function of one build. """
+    bytecode = "0x" + build['evm']['bytecode']['object']
+    tx_hash = web3.eth.contract(abi=build['abi'], bytecode=bytecode).constructor(MIN_DURATION).transact(
+        {'from': accounts[0].address}
+    )
+    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    exchange = Contract.from_abi(CONTRACT, receipt['contractAddress'], build['abi'])
+    tokens = (FakeERC721.deploy({'from': accounts[1]}), FakeERC721.deploy({'from': accounts[2]}))
+
+    gas: Dict[str, List[int]] = defaultdict(list)
+    for tx in run_lifecycle(exchange, tokens):
+        gas[tx.fn_name].append(tx.gas_used)
+    return {
+        'size': len(build['evm']['deployedBytecode']['object']) // 2,
+        'deploy': receipt['gasUsed'],
+        'functions': {name: sum(values) // len(values) for name, values in gas.items()}
+    }
+
+def main(
+    runs: str = DEFAULT_RUNS,
+    via_ir: str = DEFAULT_VIA_IR,
+    evm_versions: str = DEFAULT_EVM_VERSIONS,
+    output: str = DEFAULT_OUTPUT
+) -> None:
+    solcx.install_solc(solc_config()['version'])
+    grid = itertools.product(
+        [int(value) for value in str(runs).split(",")],
+        [value.strip() == "1" for value in str(via_ir).split(",")],
+        [None if value.strip() == "default" else value.strip() for value in evm_versions.split(",")]
+    )
+    rows = []
+    for runs_value, via_ir_value, evm_version in grid:
+        row = {'runs': runs_value, 'viaIR': int(via_ir_value), 'evm': evm_version or "default"}
+        # Every combination starts from the same chain.
+        chain.snapshot()
+        try:
+            result = measure(compile_exchange(runs_value, via_ir_value, evm_version))
+        except (SolcError, ValueError) as error:
+            # Compiler errors, and deployments over the size or gas limit.
+            row['error'] = str(error).splitlines()[0]
+        else:
+            row.update(size=result['size'], deploy=result['deploy'], **result['functions'])
+        finally:
+            chain.revert()
+        rows.append(row)
+
+    functions = sorted({
+        key for row in rows for key in row
+        if key not in ('runs', 'viaIR', 'evm', 'size', 'deploy', 'error')
+    })
+    columns = ['runs', 'viaIR', 'evm', 'size', 'deploy'] + functions + ['error']
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", newline="") as file:
+        writer = csv.DictWriter(file, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print("".join(f"{column:>14}" for column in columns[:-1]))
+    for row in rows:
+        if 'error' in row:
+            print(f"{row['runs']:>14}{row['viaIR']:>14}{row['evm']:>14}  {row['error']}")
+        else:
+            print("".join(f"{row.get(column, ''):>14}" for column in columns[:-1]))
+    print(f"Written to {output}")
@@ -0,0 +1,64 @@
+"""
+    Deploy and call gas of NFTToNFTExchange clones against full deployments.
+
+    brownie run scripts/factory/bench_clones.py main
+
+    Deploys a market in full and as a clone made by NFTToNFTExchangeFactory,
+    then runs the same trade lifecycle on both and prints the gas of every
+    call. The difference is the cost of the clone's DELEGATECALL, both
+    build their EIP-712 domain separator from their own address.
+"""
+from typing import Dict, List
+
+from brownie import NFTToNFTExchange, NFTToNFTExchangeFactory, FakeERC721, accounts
+
+MIN_DURATION = 600
+DURATION = 700
+PRICE = 3000
+
+def run_lifecycle(exchange, nft_offset: int) -> Dict[str, int]:
+    """ Gas of every call of one bid, by function name. """
+    bidder, asker = accounts[3], accounts[4]
+    bidder_token = FakeERC721.deploy({'from': accounts[1]})
+    asker_token = FakeERC721.deploy({'from': accounts[2]})
+    # `stakeNft` tells the sides apart by id, they must differ.
+    bidder_nft_id, asker_nft_id = nft_offset, nft_offset + 1
+    bidder_token.mint(bidder_nft_id, bidder)
+    asker_token.mint(asker_nft_id, asker)
+    bidder_token.approve(exchange.address, bidder_nft_id, {'from': bidder})
+    asker_token.approve(exchange.address, asker_nft_id, {'from': asker})
+    txs: List = []
+    txs.append(exchange.createBid(
+        bidder_nft_id, asker_nft_id, bidder_token.address, asker_token.address, DURATION, PRICE, {'from': bidder}
+    ))
+    trade_id = txs[-1].return_value
+    txs.append(exchange.stakeNft(trade_id, bidder_nft_id, {'from': bidder}))
+    txs.append(exchange.stakeNft(trade_id, asker_nft_id, {'from': asker}))
+    txs.append(exchange.pay(trade_id, {'from': bidder, 'value': PRICE}))
+    txs.append(exchange.settle(trade_id, {'from': accounts[5]}))
+    txs.append(exchange.withdrawAll({'from': asker}))
+    txs.append(exchange.deposit({'from': bidder, 'value': PRICE}))
+
+    gas: Dict[str, int] = {}
+    for index, tx in enumerate(txs):
+        # The two stakes are told apart by their order.
+        name = tx.fn_name if tx.fn_name != 'stakeNft' else f"stakeNft ({'bidder' if index == 1 else 'asker'})"
+        gas[name] = tx.gas_used
+    return gas
+
+def main() -> None:
+    full_deploy = NFTToNFTExchange.deploy(MIN_DURATION, {'from': accounts[0]})
+    factory = NFTToNFTExchangeFactory.deploy(full_deploy.address, {'from': accounts[0]})
+    clone_tx = factory.createExchange(MIN_DURATION, accounts[0], {'from': accounts[0]})
+    clone = NFTToNFTExchange.at(clone_tx.events['ExchangeCreated']['exchange'])
+
+    full_deploy_gas = full_deploy.tx.gas_used
+    print(f"Full deploy: {full_deploy_gas} gas")
+    print(f"Factory deploy (once): {factory.tx.gas_used} gas")
+    print(f"Clone deploy: {clone_tx.gas_used} gas, {clone_tx.gas_used / full_deploy_gas:.1%} of a full deploy")
+
+    full_gas = run_lifecycle(full_deploy, 1)
+    clone_gas = run_lifecycle(clone, 2)
+    print(f"{'function':<22}{'full':>10}{'clone':>10}{'overhead':>10}")
+    for name, gas in full_gas.items():
+        print(f"{name:<22}{gas:>10}{clone_gas[name]:>10}{clone_gas[name] - gas:>10}")
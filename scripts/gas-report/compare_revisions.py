@@ -0,0 +1,100 @@
+"""
+    Before/after gas of the core trade lifecycle between two revisions.
+
+    python scripts/gas-report/compare_revisions.py <before>..<after> [markdown output]
+    python scripts/gas-report/compare_revisions.py <revision> [markdown output]
+
+    A single revision is compared with its parent. Revisions are anything
+    git resolves, so a change can be named by its commit message, which
+    survives rebases. `:/` picks the youngest commit whose message matches,
+    so anchor the pattern to the subject line, or a later message quoting
+    it is picked instead, e.g. the packing of the Trade struct:
+
+        npm run gas-compare -- ":/^\\[user-001\\] Pack Trade struct"
+
+    or the packed state machine that replaced the trade flags:
+
+        npm run gas-compare -- ":/^\\[user-008\\] Replace trade bools"
+
+    Checks out both git revisions into temporary worktrees, runs
+    `core_scenario.py` in each of them with brownie and prints a markdown
+    table of the mean gas of every function, before and after. With an
+    output path the table is also written to that file. Needs the same
+    environment as `brownie test` (solc, ganache and node_modules).
+"""
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]
+SCENARIO = Path(__file__).parent / "core_scenario.py"
+
+def resolve(revision: str) -> str:
+    """ Commit hash of a revision. """
+    def rev_parse(name: str) -> str:
+        return subprocess.run(
+            ["git", "rev-parse", "--verify", name], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+
+    # A `:/message` revision swallows any suffix, so peel the resolved hash.
+    return rev_parse(f"{rev_parse(revision)}^{{commit}}")
+
+def run_revision(commit: str, workdir: Path) -> Dict[str, List[int]]:
+    """ Gas of the core scenario on a checkout of `commit`. """
+    checkout = workdir / commit
+    subprocess.run(["git", "worktree", "add", "--detach", str(checkout), commit], cwd=ROOT, check=True)
+    try:
+        if (ROOT / "node_modules").is_dir():
+            (checkout / "node_modules").symlink_to(ROOT / "node_modules")
+        shutil.copy(SCENARIO, checkout / "scripts" / "core_scenario.py")
+        output = workdir / f"{checkout.name}.json"
+        subprocess.run(
+            ["brownie", "run", "scripts/core_scenario.py", "main", str(output)],
+            cwd=checkout,
+            check=True
+        )
+        return json.loads(output.read_text())
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", str(checkout)], cwd=ROOT, check=True)
+
+def mean(values: List[int]) -> int:
+    return sum(values) // len(values)
+
+def format_table(before: Dict[str, List[int]], after: Dict[str, List[int]], revisions: List[str]) -> str:
+    lines = [
+        f"| function | {revisions[0]} | {revisions[1]} | change |",
+        "|---|---:|---:|---:|"
+    ]
+    for name in sorted(set(before) | set(after)):
+        if name in before and name in after:
+            old, new = mean(before[name]), mean(after[name])
+            lines.append(f"| {name} | {old} | {new} | {new - old:+} ({new / old - 1:+.1%}) |")
+        else:
+            old = mean(before[name]) if name in before else "-"
+            new = mean(after[name]) if name in after else "-"
+            lines.append(f"| {name} | {old} | {new} | |")
+    return "\n".join(lines) + "\n"
+
+def main(argv: List[str]) -> int:
+    if len(argv) < 2:
+        print(__doc__)
+        return 2
+    if ".." in argv[1]:
+        before, after = (resolve(revision) for revision in argv[1].split("..", 1))
+    else:
+        after = resolve(argv[1])
+        before = resolve(f"{after}^")
+    with tempfile.TemporaryDirectory() as workdir:
+        before_gas, after_gas = (run_revision(commit, Path(workdir)) for commit in (before, after))
+    table = format_table(before_gas, after_gas, [before[:7], after[:7]])
+    print(table)
+    if len(argv) > 2:
+        Path(argv[2]).write_text(table)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,84 @@
+"""
+    Gas of the core trade lifecycle, comparable across revisions.
+
+    brownie run scripts/core_scenario.py main <output json>
+
+    Uses only the functions the exchange has had since its first version
+    (createBid, createAsk, stakeNft, pay, withdrawNft, withdrawWei,
+    unstakeNft, unstakeWei), so `compare_revisions.py` can copy it into a
+    checkout of any revision. Writes the gas of every call by function name.
+    A call that reverts on a revision is left out.
+"""
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+from brownie import NFTToNFTExchange, FakeERC721, accounts
+from brownie.exceptions import VirtualMachineError
+
+BIDDER_NFT_ID = 13424
+ASKER_NFT_ID = 25252
+DURATION = 700
+PRICE = 3000
+
+def main(output: str) -> None:
+    bidder, asker = accounts[3], accounts[4]
+    exchange = NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+    bidder_token = FakeERC721.deploy({'from': accounts[1]})
+    asker_token = FakeERC721.deploy({'from': accounts[2]})
+    gas: Dict[str, List[int]] = defaultdict(list)
+
+    def send(fn, *args):
+        try:
+            tx = fn(*args)
+        except VirtualMachineError:
+            return None
+        gas[fn.abi['name']].append(tx.gas_used)
+        return tx
+
+    def create_bid(nft_offset: int) -> int:
+        bidder_token.mint(BIDDER_NFT_ID + nft_offset, bidder)
+        asker_token.mint(ASKER_NFT_ID + nft_offset, asker)
+        bidder_token.approve(exchange.address, BIDDER_NFT_ID + nft_offset, {'from': bidder})
+        asker_token.approve(exchange.address, ASKER_NFT_ID + nft_offset, {'from': asker})
+        return send(
+            exchange.createBid,
+            BIDDER_NFT_ID + nft_offset,
+            ASKER_NFT_ID + nft_offset,
+            bidder_token.address,
+            asker_token.address,
+            DURATION,
+            PRICE,
+            {'from': bidder}
+        ).return_value
+
+    # Completed by withdrawals.
+    trade_id = create_bid(0)
+    send(exchange.stakeNft, trade_id, BIDDER_NFT_ID, {'from': bidder})
+    send(exchange.stakeNft, trade_id, ASKER_NFT_ID, {'from': asker})
+    send(exchange.pay, trade_id, {'from': bidder, 'value': PRICE})
+    send(exchange.withdrawNft, trade_id, {'from': asker})
+    send(exchange.withdrawNft, trade_id, {'from': bidder})
+    send(exchange.withdrawWei, trade_id, {'from': asker})
+    # Unstaked by both parties.
+    trade_id = create_bid(1)
+    send(exchange.stakeNft, trade_id, BIDDER_NFT_ID + 1, {'from': bidder})
+    send(exchange.stakeNft, trade_id, ASKER_NFT_ID + 1, {'from': asker})
+    send(exchange.pay, trade_id, {'from': bidder, 'value': PRICE})
+    send(exchange.unstakeWei, trade_id, {'from': bidder})
+    send(exchange.unstakeNft, trade_id, {'from': asker})
+    send(exchange.unstakeNft, trade_id, {'from': bidder})
+    # An ask.
+    send(
+        exchange.createAsk,
+        BIDDER_NFT_ID + 1,
+        ASKER_NFT_ID + 1,
+        bidder_token.address,
+        asker_token.address,
+        DURATION,
+        PRICE,
+        {'from': asker}
+    )
+
+    with open(output, "w") as output_file:
+        json.dump(gas, output_file, indent=2, sort_keys=True)
@@ -0,0 +1,261 @@
+"""
+    Gas report and gas regression benchmark for NFT to NFT Exchange.
+
+    Every external function of NFTToNFTExchange is called at least once, so
+    `brownie test ./scripts/gas-report/gas_report.py --gas` prints the gas
+    profile of the whole contract.
+
+    Each scenario records the gas used by every exchange call it makes.
+    `test_gas_against_baseline` runs every scenario on a fresh exchange,
+    then compares the recorded values with `gas_baseline.json`: a call that
+    uses more gas than its baseline value plus the threshold fails the run,
+    and so does a scenario or call that has no baseline value. The
+    threshold is read from the baseline file and can be overridden with
+    the GAS_THRESHOLD environment variable (0.02 means 2%).
+    `npm run gas-baseline` rewrites the baseline from the current contract.
+"""
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from brownie.network.contract import ProjectContract
+from brownie.network.transaction import TransactionReceipt
+from brownie import NFTToNFTExchange, FakeERC721, accounts, chain
+from scripts.orders import sign_order
+
+BIDDER_NFT_ID = 13424
+ASKER_NFT_ID = 25252
+DURATION = 700
+PRICE = 3000
+
+BASELINE_PATH = Path(__file__).parent / "gas_baseline.json"
+
+Gas = Callable[[TransactionReceipt], TransactionReceipt]
+
+def deploy_exchange() -> ProjectContract:
+    """ Creating instance of NFTToNFTExchange. """
+    return NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+
+def deploy_tokens(exchange) -> Tuple[ProjectContract, ProjectContract]:
+    """ Creating, minting and approving both NFTs. """
+    bidder_token = FakeERC721.deploy({'from': accounts[1]})
+    asker_token = FakeERC721.deploy({'from': accounts[2]})
+    bidder_token.mint(BIDDER_NFT_ID, accounts[3])
+    asker_token.mint(ASKER_NFT_ID, accounts[4])
+    bidder_token.approve(exchange.address, BIDDER_NFT_ID, {'from': accounts[3]})
+    asker_token.approve(exchange.address, ASKER_NFT_ID, {'from': accounts[4]})
+
+    return (bidder_token, asker_token)
+
+def create_bid(exchange, tokens, gas) -> int:
+    bidder_token, asker_token = tokens
+    return gas(exchange.createBid(
+        BIDDER_NFT_ID,
+        ASKER_NFT_ID,
+        bidder_token.address,
+        asker_token.address,
+        DURATION,
+        PRICE,
+        {'from': accounts[3]}
+    )).return_value
+
+def fund_trade(exchange, trade_id, gas) -> None:
+    gas(exchange.stakeNft(trade_id, BIDDER_NFT_ID, {'from': accounts[3]}))
+    gas(exchange.stakeNft(trade_id, ASKER_NFT_ID, {'from': accounts[4]}))
+    gas(exchange.pay(trade_id, {'from': accounts[3], 'value': PRICE}))
+
+def scenario_create_bid(exchange, tokens, gas: Gas) -> None:
+    create_bid(exchange, tokens, gas)
+
+def scenario_create_ask(exchange, tokens, gas: Gas) -> None:
+    bidder_token, asker_token = tokens
+    gas(exchange.createAsk(
+        BIDDER_NFT_ID,
+        ASKER_NFT_ID,
+        bidder_token.address,
+        asker_token.address,
+        DURATION,
+        PRICE,
+        {'from': accounts[4]}
+    ))
+
+def scenario_full_lifecycle(exchange, tokens, gas: Gas) -> None:
+    """ stakeNft, pay, withdrawNft and withdrawWei. """
+    trade_id = create_bid(exchange, tokens, gas)
+    fund_trade(exchange, trade_id, gas)
+    gas(exchange.withdrawNft(trade_id, {'from': accounts[4]}))
+    gas(exchange.withdrawNft(trade_id, {'from': accounts[3]}))
+    gas(exchange.withdrawWei(trade_id, {'from': accounts[4]}))
+
+def scenario_stake_with_safe_transfer(exchange, tokens, gas: Gas) -> None:
+    """ onERC721Received staking, no approval needed. """
+    bidder_token, asker_token = tokens
+    trade_id = create_bid(exchange, tokens, gas)
+    gas(asker_token.safeTransferFrom['address,address,uint256,bytes'](
+        accounts[4],
+        exchange.address,
+        ASKER_NFT_ID,
+        f"0x{trade_id:064x}",
+        {'from': accounts[4]}
+    ))
+
+def scenario_settle(exchange, tokens, gas: Gas) -> None:
+    trade_id = create_bid(exchange, tokens, gas)
+    fund_trade(exchange, trade_id, gas)
+    gas(exchange.settle(trade_id, {'from': accounts[5]}))
+    gas(exchange.withdrawAll({'from': accounts[4]}))
+
+def scenario_unstake(exchange, tokens, gas: Gas) -> None:
+    """ unstakeNft and unstakeWei. """
+    trade_id = create_bid(exchange, tokens, gas)
+    fund_trade(exchange, trade_id, gas)
+    gas(exchange.unstakeNft(trade_id, {'from': accounts[3]}))
+    gas(exchange.unstakeNft(trade_id, {'from': accounts[4]}))
+    gas(exchange.unstakeWei(trade_id, {'from': accounts[3]}))
+
+def scenario_batch_lifecycle(exchange, tokens, gas: Gas) -> None:
+    """ createBids, createAsks, stakeNfts and payMany. """
+    bidder_token, asker_token = tokens
+    trade = (
+        BIDDER_NFT_ID,
+        ASKER_NFT_ID,
+        bidder_token.address,
+        asker_token.address,
+        DURATION,
+        PRICE
+    )
+    gas(exchange.createAsks([trade] * 5, {'from': accounts[4]}))
+    trade_ids = gas(exchange.createBids([trade] * 5, {'from': accounts[3]})).return_value
+    gas(exchange.stakeNfts(trade_ids[:1], (BIDDER_NFT_ID,), {'from': accounts[3]}))
+    gas(exchange.payMany(trade_ids, {'from': accounts[3], 'value': PRICE * 5}))
+
+def scenario_fill_signed_order(exchange, tokens, gas: Gas) -> None:
+    """ deposit, fillOrder, withdrawBalance and cancelOrder. """
+    bidder_token, asker_token = tokens
+    maker = accounts.add()
+    accounts[0].transfer(maker, "1 ether")
+    bidder_token.transferFrom(accounts[3], maker, BIDDER_NFT_ID, {'from': accounts[3]})
+    bidder_token.approve(exchange.address, BIDDER_NFT_ID, {'from': maker})
+    gas(exchange.deposit({'from': maker, 'value': PRICE}))
+    order = (
+        maker.address,
+        True,
+        bidder_token.address,
+        asker_token.address,
+        BIDDER_NFT_ID,
+        ASKER_NFT_ID,
+        PRICE,
+        chain.time() + DURATION,
+        1
+    )
+    gas(exchange.fillOrder(order, sign_order(exchange, maker, order), {'from': accounts[4]}))
+    gas(exchange.withdrawBalance(PRICE, {'from': accounts[4]}))
+    gas(exchange.cancelOrder(2, {'from': maker}))
+
+def scenario_sweep_expired(exchange, tokens, gas: Gas) -> None:
+    """ sweepExpired of a partially funded and an empty trade. """
+    trade_id = create_bid(exchange, tokens, gas)
+    gas(exchange.stakeNft(trade_id, BIDDER_NFT_ID, {'from': accounts[3]}))
+    gas(exchange.pay(trade_id, {'from': accounts[3], 'value': PRICE}))
+    empty_trade_id = create_bid(exchange, tokens, gas)
+    chain.sleep(DURATION + 1)
+    gas(exchange.sweepExpired((trade_id, empty_trade_id), {'from': accounts[5]}))
+
+def scenario_bundle_lifecycle(exchange, tokens, gas: Gas) -> None:
+    """ createBundleBid, stakeBundle, payBundle and settleBundle. """
+    bidder_token, asker_token = tokens
+    bidder_token.mint(BIDDER_NFT_ID + 1, accounts[3])
+    bidder_token.approve(exchange.address, BIDDER_NFT_ID + 1, {'from': accounts[3]})
+    bidder_nfts = [
+        (bidder_token.address, BIDDER_NFT_ID),
+        (bidder_token.address, BIDDER_NFT_ID + 1)
+    ]
+    asker_nfts = [(asker_token.address, ASKER_NFT_ID)]
+    trade_id = gas(exchange.createBundleBid(
+        (bidder_nfts, asker_nfts, DURATION, PRICE),
+        {'from': accounts[3]}
+    )).return_value
+    gas(exchange.stakeBundle(trade_id, bidder_nfts, {'from': accounts[3]}))
+    gas(exchange.stakeBundle(trade_id, asker_nfts, {'from': accounts[4]}))
+    gas(exchange.payBundle(trade_id, {'from': accounts[3], 'value': PRICE}))
+    gas(exchange.settleBundle(trade_id, bidder_nfts, asker_nfts, {'from': accounts[5]}))
+
+SCENARIOS: Dict[str, Callable[..., None]] = {
+    name[len("scenario_"):]: scenario
+    for name, scenario in list(globals().items())
+    if name.startswith("scenario_")
+}
+
+def run_scenarios() -> Dict[str, Dict[str, List[int]]]:
+    """ scenario -> function name -> gas used by each call, in call order. """
+    results: Dict[str, Dict[str, List[int]]] = {}
+    for name, scenario in SCENARIOS.items():
+        recorded: Dict[str, List[int]] = defaultdict(list)
+
+        def gas(tx: TransactionReceipt) -> TransactionReceipt:
+            recorded[tx.fn_name].append(tx.gas_used)
+            return tx
+
+        # Every scenario starts from the same chain.
+        chain.snapshot()
+        try:
+            exchange = deploy_exchange()
+            scenario(exchange, deploy_tokens(exchange), gas)
+        finally:
+            chain.revert()
+        results[name] = dict(recorded)
+
+    return results
+
+def load_baseline() -> dict:
+    with open(BASELINE_PATH) as baseline_file:
+        return json.load(baseline_file)
+
+def save_baseline(baseline: dict) -> None:
+    with open(BASELINE_PATH, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+def find_regressions(
+    baseline: Dict[str, Dict[str, List[int]]],
+    results: Dict[str, Dict[str, List[int]]],
+    threshold: float
+) -> List[str]:
+    """ Calls whose gas exceeds the baseline value by more than the
+    threshold, and calls without a baseline value. """
+    regressions = []
+    for scenario, functions in results.items():
+        if not baseline.get(scenario):
+            regressions.append(f"{scenario}: no baseline, run `npm run gas-baseline`")
+            continue
+        for fn_name, gas_used in functions.items():
+            expected = baseline[scenario].get(fn_name, [])
+            for call, used in enumerate(gas_used):
+                if call >= len(expected):
+                    regressions.append(f"{scenario}.{fn_name}[{call}]: {used}, no baseline")
+                elif used > expected[call] * (1 + threshold):
+                    limit = expected[call]
+                    regressions.append(
+                        f"{scenario}.{fn_name}[{call}]: {used} > {limit} (+{used / limit - 1:.2%})"
+                    )
+
+    return regressions
+
+def test_gas_against_baseline() -> None:
+    baseline = load_baseline()
+    results = run_scenarios()
+    if os.environ.get('GAS_BASELINE_UPDATE'):
+        baseline['scenarios'] = results
+        save_baseline(baseline)
+        return
+
+    assert baseline['scenarios'], (
+        "gas_baseline.json has no recorded scenarios: run `npm run gas-baseline` "
+        "and commit gas_baseline.json"
+    )
+    threshold = float(os.environ.get('GAS_THRESHOLD', baseline['threshold']))
+    regressions = find_regressions(baseline['scenarios'], results, threshold)
+
+    assert not regressions, "Gas regressions:\n" + "\n".join(regressions)
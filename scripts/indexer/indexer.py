@@ -0,0 +1,348 @@
+"""
+    Event indexer of NFTToNFTExchange trades.
+
+    brownie run scripts/indexer/indexer.py main <exchange address> [db path] [poll seconds] --network <network>
+
+    Trade events are read with one `eth_getLogs` call per block range and
+    stored in SQLite: the decoded logs in `events` and the state they add up
+    to in `trades`. The last indexed block is kept in `cursor`, so a restart
+    continues where the previous run stopped. Hashes of indexed blocks are
+    kept in `blocks`; when the chain no longer has one of them, the events
+    above the last matching block are deleted and the affected trades are
+    rebuilt from the events that are left.
+"""
+import json
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+from eth_utils import event_abi_to_log_topic
+from brownie import web3
+
+TRADE_EVENTS = (
+    'BidCreated',
+    'AskCreated',
+    'NftStaked',
+    'NftUnstaked',
+    'AmountPaid',
+    'WeiUnstaked',
+    'NftWithdrawed',
+    'WeiWithdrawed',
+    'TradeClosed',
+    'TradesMatched'
+)
+# TradeStatus of the contract.
+OPEN, PARTIALLY_FUNDED, FUNDED, SETTLED, CANCELLED = range(5)
+
+DEFAULT_BLOCK_RANGE = 2000
+# Block hashes kept for reorg detection.
+REORG_DEPTH = 128
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursor (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block_number INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    trade_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_trade_id ON events (trade_id);
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id INTEGER PRIMARY KEY,
+    is_bid INTEGER NOT NULL,
+    creator TEXT NOT NULL,
+    bidder TEXT,
+    asker TEXT,
+    bidder_nft_address TEXT NOT NULL,
+    asker_nft_address TEXT NOT NULL,
+    bidder_nft_id TEXT NOT NULL,
+    asker_nft_id TEXT NOT NULL,
+    price TEXT NOT NULL,
+    expires_at INTEGER NOT NULL,
+    bidder_nft_staked INTEGER NOT NULL,
+    asker_nft_staked INTEGER NOT NULL,
+    wei_paid INTEGER NOT NULL,
+    bidder_received_nft INTEGER NOT NULL,
+    asker_received_nft INTEGER NOT NULL,
+    asker_received_wei INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    created_block INTEGER NOT NULL,
+    updated_block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_bidder ON trades (bidder);
+CREATE INDEX IF NOT EXISTS trades_asker ON trades (asker);
+"""
+TRADE_COLUMNS = (
+    'trade_id', 'is_bid', 'creator', 'bidder', 'asker',
+    'bidder_nft_address', 'asker_nft_address', 'bidder_nft_id', 'asker_nft_id',
+    'price', 'expires_at', 'bidder_nft_staked', 'asker_nft_staked', 'wei_paid',
+    'bidder_received_nft', 'asker_received_nft', 'asker_received_wei',
+    'status', 'created_block', 'updated_block'
+)
+
+def normalize(value):
+    """ uint256 values do not fit SQLite integers, they are kept as strings. """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, bytes):
+        return web3.toHex(value)
+    return value
+
+def funding_status(trade: dict) -> int:
+    staked = trade['bidder_nft_staked'] + trade['asker_nft_staked'] + trade['wei_paid']
+    if staked == 3:
+        return FUNDED
+    return PARTIALLY_FUNDED if staked else OPEN
+
+def apply_event(trades: Dict[int, dict], event: dict) -> None:
+    """ Updates the state of the event's trade the way the contract did. """
+    name, args = event['name'], event['args']
+    trade_id = event['trade_id']
+    if name in ('BidCreated', 'AskCreated'):
+        is_bid = name == 'BidCreated'
+        trades[trade_id] = {
+            'trade_id': trade_id,
+            'is_bid': int(is_bid),
+            'creator': args['creator'],
+            'bidder': args['bidderAddress'] if is_bid else None,
+            'asker': None if is_bid else args['askerAddress'],
+            'bidder_nft_address': args['bidderNFTAddress'],
+            'asker_nft_address': args['askerNFTAddress'],
+            'bidder_nft_id': args['bidderNFTId'],
+            'asker_nft_id': args['askerNFTId'],
+            'price': args['price'],
+            'expires_at': int(args['expirestAt']),
+            'bidder_nft_staked': 0,
+            'asker_nft_staked': 0,
+            # Free trades are paid from the start.
+            'wei_paid': int(args['price'] == "0"),
+            'bidder_received_nft': 0,
+            'asker_received_nft': 0,
+            'asker_received_wei': 0,
+            'status': OPEN,
+            'created_block': event['block_number'],
+            'updated_block': event['block_number']
+        }
+        return
+
+    trade = trades.get(trade_id)
+    if trade is None:
+        # Created before the indexed block range.
+        return
+    if name == 'NftStaked':
+        if (args['nftAddress'] == trade['bidder_nft_address'] and
+                args['nftId'] == trade['bidder_nft_id'] and not trade['bidder_nft_staked']):
+            trade['bidder_nft_staked'], trade['bidder'] = 1, args['staker']
+        else:
+            trade['asker_nft_staked'], trade['asker'] = 1, args['staker']
+    elif name == 'NftUnstaked':
+        if args['to'] == trade['bidder'] and trade['bidder_nft_staked']:
+            trade['bidder_nft_staked'] = 0
+        else:
+            trade['asker_nft_staked'] = 0
+    elif name == 'AmountPaid':
+        trade['wei_paid'] = 1
+    elif name == 'WeiUnstaked':
+        trade['wei_paid'] = 0
+    elif name == 'NftWithdrawed':
+        if trade['status'] == CANCELLED:
+            # Refund of a swept trade.
+            side = 'bidder' if args['nftId'] == trade['bidder_nft_id'] else 'asker'
+            trade[f'{side}_nft_staked'] = 0
+        elif args['to'] == trade['asker'] and args['nftId'] == trade['bidder_nft_id']:
+            trade['asker_received_nft'] = 1
+        else:
+            trade['bidder_received_nft'] = 1
+    elif name == 'WeiWithdrawed':
+        if trade['status'] == CANCELLED:
+            trade['wei_paid'] = 0
+        else:
+            trade['asker_received_wei'] = 1
+    elif name == 'TradeClosed':
+        trade['status'] = int(args['status'])
+    elif name == 'TradesMatched':
+        # The asker's NFT moved over from the matched ask.
+        trade['asker'], trade['asker_nft_staked'], trade['price'] = args['asker'], 1, args['price']
+    if trade['status'] not in (SETTLED, CANCELLED):
+        trade['status'] = funding_status(trade)
+    trade['updated_block'] = event['block_number']
+
+class TradeIndexer:
+    """ Indexes the trade events of one exchange into one SQLite database. """
+
+    def __init__(
+        self,
+        exchange,
+        db_path: str,
+        start_block: int = 0,
+        block_range: int = DEFAULT_BLOCK_RANGE
+    ) -> None:
+        self.address = exchange.address
+        self.contract = web3.eth.contract(address=exchange.address, abi=exchange.abi)
+        self.start_block = start_block
+        self.block_range = block_range
+        self.topics = {
+            web3.toHex(event_abi_to_log_topic(abi)): abi['name']
+            for abi in exchange.abi
+            if abi['type'] == 'event' and abi['name'] in TRADE_EVENTS
+        }
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+
+    @property
+    def cursor(self) -> int:
+        row = self.db.execute("SELECT block_number FROM cursor WHERE id = 0").fetchone()
+        return row[0] if row else self.start_block - 1
+
+    def sync(self, to_block: Optional[int] = None) -> int:
+        """ Indexes every block up to `to_block` (the head by default). """
+        self.rollback_reorg()
+        head = web3.eth.block_number if to_block is None else to_block
+        from_block = self.cursor + 1
+        while from_block <= head:
+            range_end = min(from_block + self.block_range - 1, head)
+            self.index_range(from_block, range_end)
+            from_block = range_end + 1
+
+        return self.cursor
+
+    def fetch_events(self, from_block: int, to_block: int) -> List[dict]:
+        logs = web3.eth.get_logs({
+            'address': self.address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': [list(self.topics)]
+        })
+        events = []
+        for log in logs:
+            name = self.topics[web3.toHex(log['topics'][0])]
+            decoded = getattr(self.contract.events, name)().processLog(log)
+            args = {key: normalize(value) for key, value in decoded['args'].items()}
+            events.append({
+                'block_number': log['blockNumber'],
+                'log_index': log['logIndex'],
+                'tx_hash': web3.toHex(log['transactionHash']),
+                'trade_id': int(args.get('tradeId', args.get('TradeId'))),
+                'name': name,
+                'args': args
+            })
+
+        return sorted(events, key=lambda event: (event['block_number'], event['log_index']))
+
+    def load_trades(self, trade_ids: Iterable[int]) -> Dict[int, dict]:
+        trade_ids = list(set(trade_ids))
+        trades = {}
+        for offset in range(0, len(trade_ids), 500):
+            chunk = trade_ids[offset:offset + 500]
+            rows = self.db.execute(
+                f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades "
+                f"WHERE trade_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for row in rows:
+                trades[row[0]] = dict(zip(TRADE_COLUMNS, row))
+
+        return trades
+
+    def save_trades(self, trades: Dict[int, dict]) -> None:
+        self.db.executemany(
+            f"INSERT OR REPLACE INTO trades ({', '.join(TRADE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(TRADE_COLUMNS))})",
+            [tuple(trade[column] for column in TRADE_COLUMNS) for trade in trades.values()]
+        )
+
+    def save_cursor(self, block_number: int) -> None:
+        block_hash = web3.toHex(web3.eth.get_block(block_number)['hash'])
+        self.db.execute(
+            "INSERT OR REPLACE INTO cursor (id, block_number) VALUES (0, ?)", (block_number,))
+        self.db.execute(
+            "INSERT OR REPLACE INTO blocks (block_number, block_hash) VALUES (?, ?)",
+            (block_number, block_hash)
+        )
+        self.db.execute(
+            "DELETE FROM blocks WHERE block_number <= ?", (block_number - REORG_DEPTH,))
+
+    def index_range(self, from_block: int, to_block: int) -> None:
+        events = self.fetch_events(from_block, to_block)
+        trades = self.load_trades(event['trade_id'] for event in events)
+        for event in events:
+            apply_event(trades, event)
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO events "
+                "(block_number, log_index, tx_hash, trade_id, name, args) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (e['block_number'], e['log_index'], e['tx_hash'], e['trade_id'], e['name'], json.dumps(e['args']))
+                    for e in events
+                ]
+            )
+            self.save_trades(trades)
+            self.save_cursor(to_block)
+
+    def rollback_reorg(self) -> None:
+        """ Drops what was indexed from blocks that are no longer in the chain. """
+        stored = self.db.execute(
+            "SELECT block_number, block_hash FROM blocks ORDER BY block_number DESC").fetchall()
+        head = web3.eth.block_number
+        for block_number, block_hash in stored:
+            if block_number <= head and web3.toHex(web3.eth.get_block(block_number)['hash']) == block_hash:
+                if block_number != stored[0][0]:
+                    self.rollback(block_number)
+                return
+        if stored:
+            # Deeper than REORG_DEPTH, everything is indexed again.
+            self.rollback(self.start_block - 1)
+
+    def rollback(self, block_number: int) -> None:
+        """ Deletes the events above `block_number` and rebuilds their trades. """
+        with self.db:
+            trade_ids = [row[0] for row in self.db.execute(
+                "SELECT DISTINCT trade_id FROM events WHERE block_number > ?", (block_number,))]
+            self.db.execute("DELETE FROM events WHERE block_number > ?", (block_number,))
+            self.db.execute("DELETE FROM blocks WHERE block_number > ?", (block_number,))
+            self.db.executemany("DELETE FROM trades WHERE trade_id = ?", [(i,) for i in trade_ids])
+            trades = {}
+            for offset in range(0, len(trade_ids), 500):
+                chunk = trade_ids[offset:offset + 500]
+                rows = self.db.execute(
+                    "SELECT block_number, log_index, trade_id, name, args FROM events "
+                    f"WHERE trade_id IN ({', '.join('?' * len(chunk))}) "
+                    "ORDER BY block_number, log_index",
+                    chunk
+                )
+                for block, log_index, trade_id, name, args in rows:
+                    apply_event(trades, {
+                        'block_number': block,
+                        'log_index': log_index,
+                        'trade_id': trade_id,
+                        'name': name,
+                        'args': json.loads(args)
+                    })
+            self.save_trades(trades)
+            self.db.execute(
+                "INSERT OR REPLACE INTO cursor (id, block_number) VALUES (0, ?)", (block_number,))
+
+    def get_trade(self, trade_id: int) -> Optional[dict]:
+        return self.load_trades([trade_id]).get(trade_id)
+
+def main(exchange_address: str, db_path: str = "trades.db", poll_seconds: int = 0) -> None:
+    from brownie import NFTToNFTExchange
+
+    indexer = TradeIndexer(NFTToNFTExchange.at(exchange_address), db_path)
+    while True:
+        started = time.time()
+        block_number = indexer.sync()
+        print(f"Indexed up to block {block_number} in {time.time() - started:.2f}s")
+        if not int(poll_seconds):
+            break
+        time.sleep(int(poll_seconds))
@@ -0,0 +1,171 @@
+"""
+    Load test of the NFTToNFTExchange trade lifecycle.
+
+    brownie run scripts/load/load_test.py main [trades] [bid share] [expiry share] [concurrency]
+
+    Drives `trades` trades through create -> stake -> pay -> withdraw on the
+    development network. Workers run concurrently, each with its own pair of
+    accounts (bidder and asker) out of the 20 ganache accounts. `bid share`
+    of the trades are created with createBid, the others with createAsk.
+    `expiry share` of the trades are abandoned after the bidder's stake and
+    swept with sweepExpired once they expire. Every transaction must
+    succeed and every completed trade must swap its NFTs, otherwise the run
+    stops, so the figures never include reverted transactions.
+
+    Reports transactions per second, gas per block, latency percentiles per
+    function and the storage used by the exchange before and after.
+"""
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from brownie import NFTToNFTExchange, FakeERC721A, accounts, chain, web3
+
+DURATION = 700
+PRICE = 3000
+# Slots of a Trade struct.
+TRADE_SLOTS = 6
+SWEEP_BATCH_SIZE = 50
+
+class Recorder:
+    """ Latency of every transaction, by function name. """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def send(self, fn, *args):
+        started = time.perf_counter()
+        tx = fn(*args)
+        assert tx.status == 1, f"{fn.abi['name']} reverted: {tx.revert_msg}"
+        self.latencies[fn.abi['name']].append(time.perf_counter() - started)
+        return tx
+
+    @property
+    def tx_count(self) -> int:
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def storage_slots(exchange) -> int:
+    """ Estimated storage slots used by open trades and their indexes. """
+    open_trades = sum(
+        trade['expirestAt'] != 0
+        for offset in range(0, exchange.tradeCount(), 500)
+        for trade in exchange.getTrades(offset, 500)
+    )
+    # Every index entry is an array element plus its position, a trade has
+    # one entry in the index of NFTs.
+    account_entries = sum(len(exchange.tradesOfAccount(account, 0, 2**32)) for account in accounts)
+    return open_trades * TRADE_SLOTS + (account_entries + open_trades) * 2
+
+def run_trade(exchange, tokens, recorder, bidder, asker, nft_ids, is_bid, expires) -> int:
+    """ One trade, returns its id. """
+    bidder_token, asker_token = tokens
+    bidder_nft_id, asker_nft_id = nft_ids
+    create = exchange.createBid if is_bid else exchange.createAsk
+    trade_id = recorder.send(
+        create,
+        bidder_nft_id,
+        asker_nft_id,
+        bidder_token.address,
+        asker_token.address,
+        DURATION,
+        PRICE,
+        {'from': bidder if is_bid else asker}
+    ).return_value
+    bidder_token.approve(exchange.address, bidder_nft_id, {'from': bidder})
+    recorder.send(exchange.stakeNft, trade_id, bidder_nft_id, {'from': bidder})
+    if expires:
+        return trade_id
+    asker_token.approve(exchange.address, asker_nft_id, {'from': asker})
+    recorder.send(exchange.stakeNft, trade_id, asker_nft_id, {'from': asker})
+    recorder.send(exchange.pay, trade_id, {'from': bidder, 'value': PRICE})
+    recorder.send(exchange.withdrawNft, trade_id, {'from': asker})
+    recorder.send(exchange.withdrawNft, trade_id, {'from': bidder})
+    recorder.send(exchange.withdrawWei, trade_id, {'from': asker})
+    assert bidder_token.ownerOf(bidder_nft_id) == asker and asker_token.ownerOf(asker_nft_id) == bidder
+    return trade_id
+
+def worker_accounts(worker: int) -> tuple:
+    return accounts[1 + 2 * worker], accounts[2 + 2 * worker]
+
+def run_worker(exchange, tokens, recorder, worker, plan) -> List[int]:
+    """ Trades of one worker, returns the ids of the abandoned ones. """
+    bidder, asker = worker_accounts(worker)
+    expired = []
+    for nft_ids, is_bid, expires in plan:
+        trade_id = run_trade(exchange, tokens, recorder, bidder, asker, nft_ids, is_bid, expires)
+        if expires:
+            expired.append(trade_id)
+    return expired
+
+def main(
+    trades: int = 1000,
+    bid_share: float = 0.5,
+    expiry_share: float = 0.1,
+    concurrency: int = 4
+) -> None:
+    trades, bid_share, expiry_share = int(trades), float(bid_share), float(expiry_share)
+    # accounts[0] deploys, every worker takes two of the other accounts.
+    concurrency = max(1, min(int(concurrency), (len(accounts) - 1) // 2))
+    exchange = NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+    tokens = (FakeERC721A.deploy({'from': accounts[0]}), FakeERC721A.deploy({'from': accounts[0]}))
+    # Both collections start at id 0 and `stakeNft` tells the sides apart by
+    # id, so the asker's ids start after every bidder's id.
+    tokens[1].mint(trades, accounts[0], {'from': accounts[0]})
+    plans = []
+    for worker in range(concurrency):
+        # The NFTs of a worker are minted in one batch per side.
+        count = len(range(worker, trades, concurrency))
+        if not count:
+            break
+        bidder, asker = worker_accounts(worker)
+        first_bidder_id = tokens[0].mint(count, bidder, {'from': bidder}).return_value
+        first_asker_id = tokens[1].mint(count, asker, {'from': asker}).return_value
+        plans.append([
+            ((first_bidder_id + i, first_asker_id + i), random.random() < bid_share, random.random() < expiry_share)
+            for i in range(count)
+        ])
+    concurrency = len(plans)
+
+    slots_before = storage_slots(exchange)
+    recorder = Recorder()
+    first_block = chain.height + 1
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        expired = [
+            trade_id
+            for worker_expired in executor.map(
+                lambda worker: run_worker(exchange, tokens, recorder, worker, plans[worker]),
+                range(concurrency)
+            )
+            for trade_id in worker_expired
+        ]
+    elapsed = time.perf_counter() - started
+    last_block = chain.height
+    slots_after_run = storage_slots(exchange)
+
+    chain.sleep(DURATION + 1)
+    for offset in range(0, len(expired), SWEEP_BATCH_SIZE):
+        recorder.send(exchange.sweepExpired, expired[offset:offset + SWEEP_BATCH_SIZE], {'from': accounts[0]})
+
+    block_gas = [web3.eth.get_block(number)['gasUsed'] for number in range(first_block, last_block + 1)]
+    print(f"Trades: {trades}, concurrency: {concurrency}, abandoned: {len(expired)}")
+    print(f"Lifecycle transactions per second: {(recorder.tx_count - len(recorder.latencies.get('sweepExpired', []))) / elapsed:.1f}")
+    print(f"Gas per block: mean {sum(block_gas) / max(len(block_gas), 1):.0f}, max {max(block_gas, default=0)}")
+    print(f"{'function':<16}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name, latencies in sorted(recorder.latencies.items()):
+        print(
+            f"{name:<16}{len(latencies):>8}"
+            f"{percentile(latencies, 0.5) * 1000:>10.1f}"
+            f"{percentile(latencies, 0.9) * 1000:>10.1f}"
+            f"{percentile(latencies, 0.99) * 1000:>10.1f}"
+        )
+    print(
+        f"Storage slots (estimate): {slots_before} before, {slots_after_run} after the run, "
+        f"{storage_slots(exchange)} after the sweep"
+    )
@@ -0,0 +1,71 @@
+"""
+    Benchmark of the bid/ask matcher.
+
+    brownie run scripts/matcher/bench_matcher.py main [pairs] [batch size]
+
+    Lists `pairs` bids and `pairs` asks on the same NFTs on the development
+    network: every bid is staked and paid by its bidder, every ask staked by
+    its asker, half of the asks at the bid price and half above it so that
+    only half of the pairs cross. Checks that every trade reached that
+    state, then runs one poll of the matcher and prints the time spent
+    reading the book and the matches per second.
+"""
+import time
+
+from brownie import NFTToNFTExchange, FakeERC721A, accounts
+from scripts.matcher.matcher import Matcher
+
+DURATION = 7000
+PRICE = 3000
+DEFAULT_PAIRS = 500
+DEFAULT_BATCH_SIZE = 50
+# Trade flags of the exchange.
+BIDDER_NFT_STAKED = 2
+ASKER_NFT_STAKED = 4
+WEI_PAID = 8
+
+def main(pairs: int = DEFAULT_PAIRS, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+    pairs, batch_size = int(pairs), int(batch_size)
+    bidder, asker = accounts[1], accounts[2]
+    exchange = NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+    bidder_token = FakeERC721A.deploy({'from': accounts[0]})
+    asker_token = FakeERC721A.deploy({'from': accounts[0]})
+    # Both collections start at id 0 and `stakeNft` tells the sides apart by
+    # id, so the asker's ids start after every bidder's id.
+    asker_token.mint(pairs, accounts[0], {'from': accounts[0]})
+    first_bidder_id = bidder_token.mint(pairs, bidder, {'from': bidder}).return_value
+    first_asker_id = asker_token.mint(pairs, asker, {'from': asker}).return_value
+    bidder_token.setApprovalForAll(exchange.address, True, {'from': bidder})
+    asker_token.setApprovalForAll(exchange.address, True, {'from': asker})
+    matcher = Matcher(exchange, accounts[0], exchange.tx.block_number)
+
+    bid_ids, ask_ids = [], []
+    for offset in range(0, pairs, batch_size):
+        nft_ids = [
+            (first_bidder_id + i, first_asker_id + i)
+            for i in range(offset, min(offset + batch_size, pairs))
+        ]
+        batch_bid_ids = exchange.createBids([
+            (bidder_nft_id, asker_nft_id, bidder_token.address, asker_token.address, DURATION, PRICE)
+            for bidder_nft_id, asker_nft_id in nft_ids
+        ], {'from': bidder}).return_value
+        batch_ask_ids = exchange.createAsks([
+            (bidder_nft_id, asker_nft_id, bidder_token.address, asker_token.address, DURATION, PRICE + i % 2)
+            for i, (bidder_nft_id, asker_nft_id) in enumerate(nft_ids, offset)
+        ], {'from': asker}).return_value
+        exchange.stakeNfts(batch_bid_ids, [bidder_nft_id for bidder_nft_id, _ in nft_ids], {'from': bidder})
+        exchange.payMany(batch_bid_ids, {'from': bidder, 'value': PRICE * len(batch_bid_ids)})
+        exchange.stakeNfts(batch_ask_ids, [asker_nft_id for _, asker_nft_id in nft_ids], {'from': asker})
+        bid_ids += batch_bid_ids
+        ask_ids += batch_ask_ids
+
+    ready_bid = BIDDER_NFT_STAKED | WEI_PAID
+    assert all(trade['flags'] & ready_bid == ready_bid for trade in exchange.getTradesByIds(bid_ids))
+    assert all(trade['flags'] & ASKER_NFT_STAKED for trade in exchange.getTradesByIds(ask_ids))
+
+    started = time.perf_counter()
+    matches = matcher.poll()
+    elapsed = time.perf_counter() - started
+    print(f"Pairs: {pairs}, matched: {len(matches)}, expected: {(pairs + 1) // 2}")
+    print(f"Book size: {len(matcher.book.trades)} trades, {len(matcher.book.pairs)} NFT pairs")
+    print(f"Poll: {elapsed:.2f} s, {len(matches) / elapsed:.1f} matches per second")
@@ -0,0 +1,218 @@
+"""
+    Matcher of NFTToNFTExchange bids and asks.
+
+    brownie run scripts/matcher/matcher.py main <exchange address> [poll seconds] --network <network>
+
+    Follows the exchange logs and keeps an in-memory book of the open
+    trades, keyed by the NFT pair (bidder collection and id, asker
+    collection and id). A bid is ready once its bidder has staked and paid,
+    an ask once its asker has staked. Every event only touches the book
+    entry of its pair, so a crossing bid and ask (bid price >= ask price)
+    is found with one dictionary lookup and submitted with `matchTrades`.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from eth_utils import event_abi_to_log_topic
+from brownie import NFTToNFTExchange, accounts, network, web3
+from brownie.exceptions import VirtualMachineError
+
+NftPair = Tuple[str, int, str, int]
+
+@dataclass
+class BookTrade:
+    trade_id: int
+    is_bid: bool
+    pair: NftPair
+    price: int
+    expires_at: int
+    creator: str
+    bidder_nft_staked: bool = False
+    asker_nft_staked: bool = False
+    wei_paid: bool = False
+    bidder_staker: Optional[str] = None
+
+    def is_bidder_nft(self, name: str, args: dict) -> bool:
+        """ Whether a staking event is about the bidder's NFT. """
+        _, bidder_id, _, asker_id = self.pair
+        if name == 'NftStaked':
+            return (args['nftAddress'], args['nftId']) == self.pair[:2]
+        # NftUnstaked only has the id, the exchange returns the bidder's
+        # NFT first when its staker unstakes.
+        if bidder_id != asker_id:
+            return args['nftId'] == bidder_id
+        return self.bidder_nft_staked and args['to'] == self.bidder_staker
+
+    @property
+    def ready(self) -> bool:
+        """ The state `matchTrades` accepts. """
+        if self.is_bid:
+            return self.bidder_nft_staked and self.wei_paid and not self.asker_nft_staked
+        return self.asker_nft_staked and not self.bidder_nft_staked and (not self.wei_paid or self.price == 0)
+
+@dataclass
+class PairBook:
+    # Ids of the ready trades of the pair.
+    bids: Set[int]
+    asks: Set[int]
+
+class OrderBook:
+    """ Open trades by NFT pair. """
+
+    def __init__(self) -> None:
+        self.trades: Dict[int, BookTrade] = {}
+        self.pairs: Dict[NftPair, PairBook] = {}
+
+    def add(self, trade: BookTrade) -> None:
+        self.trades[trade.trade_id] = trade
+        self.pairs.setdefault(trade.pair, PairBook(set(), set()))
+
+    def remove(self, trade_id: int) -> None:
+        trade = self.trades.pop(trade_id, None)
+        if trade is not None:
+            book = self.pairs[trade.pair]
+            book.bids.discard(trade_id)
+            book.asks.discard(trade_id)
+
+    def update(self, trade_id: int) -> Optional[NftPair]:
+        """ Files the trade under ready or not ready, returns its pair. """
+        trade = self.trades.get(trade_id)
+        if trade is None:
+            return None
+        book = self.pairs[trade.pair]
+        side = book.bids if trade.is_bid else book.asks
+        if trade.ready:
+            side.add(trade_id)
+        else:
+            side.discard(trade_id)
+        return trade.pair
+
+    def crossing(self, pair: NftPair, now: int) -> Optional[Tuple[int, int]]:
+        """ The highest ready bid and the lowest ready ask of the pair that
+        have not expired at `now`, if they cross. """
+        book = self.pairs.get(pair)
+        if book is None:
+            return None
+        bids = [self.trades[trade_id] for trade_id in book.bids if self.trades[trade_id].expires_at > now]
+        asks = [self.trades[trade_id] for trade_id in book.asks if self.trades[trade_id].expires_at > now]
+        if not bids or not asks:
+            return None
+        bid = max(bids, key=lambda trade: trade.price)
+        ask = min(asks, key=lambda trade: trade.price)
+        if bid.price < ask.price:
+            return None
+        return bid.trade_id, ask.trade_id
+
+    def apply(self, name: str, args: dict) -> Optional[NftPair]:
+        """ Updates the book with one exchange event, returns the touched pair. """
+        trade_id = args.get('tradeId', args.get('TradeId'))
+        if name in ('BidCreated', 'AskCreated'):
+            self.add(BookTrade(
+                trade_id,
+                name == 'BidCreated',
+                (args['bidderNFTAddress'], args['bidderNFTId'], args['askerNFTAddress'], args['askerNFTId']),
+                args['price'],
+                args['expirestAt'],
+                args['creator'],
+                wei_paid=args['price'] == 0
+            ))
+        trade = self.trades.get(trade_id)
+        if trade is None:
+            return None
+        if name in ('NftStaked', 'NftUnstaked'):
+            if trade.is_bidder_nft(name, args):
+                trade.bidder_nft_staked = name == 'NftStaked'
+                if name == 'NftStaked':
+                    trade.bidder_staker = args['staker']
+            else:
+                trade.asker_nft_staked = name == 'NftStaked'
+        elif name == 'AmountPaid':
+            trade.wei_paid = True
+        elif name == 'WeiUnstaked':
+            trade.wei_paid = False
+        elif name in ('TradeClosed', 'TradesMatched'):
+            # A matched bid is Funded, it cannot be matched again.
+            self.remove(trade_id)
+            return None
+        return self.update(trade_id)
+
+    def take(self, bid: int, ask: int) -> None:
+        """ Takes a submitted match out of the book. """
+        self.remove(bid)
+        self.remove(ask)
+
+BOOK_EVENTS = (
+    'BidCreated',
+    'AskCreated',
+    'NftStaked',
+    'NftUnstaked',
+    'AmountPaid',
+    'WeiUnstaked',
+    'TradeClosed',
+    'TradesMatched'
+)
+
+class Matcher:
+    """ Follows the logs of one exchange and submits crossing trades. """
+
+    def __init__(self, exchange, sender, from_block: int = 0) -> None:
+        self.exchange = exchange
+        self.sender = sender
+        self.book = OrderBook()
+        self.next_block = from_block
+        self.contract = web3.eth.contract(address=exchange.address, abi=exchange.abi)
+        self.topics = {
+            web3.toHex(event_abi_to_log_topic(abi)): abi['name']
+            for abi in exchange.abi
+            if abi['type'] == 'event' and abi['name'] in BOOK_EVENTS
+        }
+
+    def poll(self) -> List[Tuple[int, int]]:
+        """ Applies the new logs and submits the matches they create. """
+        head = web3.eth.block_number
+        if head < self.next_block:
+            return []
+        logs = web3.eth.get_logs({
+            'address': self.exchange.address,
+            'fromBlock': self.next_block,
+            'toBlock': head,
+            'topics': [list(self.topics)]
+        })
+        self.next_block = head + 1
+        touched = set()
+        for log in logs:
+            name = self.topics[web3.toHex(log['topics'][0])]
+            args = getattr(self.contract.events, name)().processLog(log)['args']
+            pair = self.book.apply(name, dict(args))
+            if pair is not None:
+                touched.add(pair)
+
+        # Leaves a block of margin for the expiry of the submitted trades.
+        now = web3.eth.get_block(head)['timestamp'] + 1
+        matches = []
+        for pair in touched:
+            match = self.book.crossing(pair, now)
+            while match is not None:
+                # Taken out before sending, a failed match is not retried.
+                self.book.take(*match)
+                try:
+                    self.exchange.matchTrades(*match, {'from': self.sender})
+                except VirtualMachineError as error:
+                    print(f"Match of bid {match[0]} with ask {match[1]} failed: {error.revert_msg}")
+                else:
+                    matches.append(match)
+                match = self.book.crossing(pair, now)
+        return matches
+
+def main(exchange_address: str, poll_seconds: int = 2) -> None:
+    if network.show_active() == 'development':
+        sender = accounts[0]
+    else:
+        sender = accounts.load(os.environ['MATCHER_ACCOUNT'])
+    matcher = Matcher(NFTToNFTExchange.at(exchange_address), sender)
+    while True:
+        for bid, ask in matcher.poll():
+            print(f"Matched bid {bid} with ask {ask}")
+        time.sleep(int(poll_seconds))
@@ -0,0 +1,31 @@
+"""
+    Signing of NFTToNFTExchange orders (EIP-712).
+"""
+from eth_abi import encode_abi
+from eth_keys import keys
+from web3 import Web3
+
+from brownie.network.account import LocalAccount
+from brownie.network.contract import ProjectContract
+
+ORDER_TYPEHASH = Web3.keccak(text=(
+    "Order(address maker,bool isBid,address bidderNFTAddress,address askerNFTAddress,"
+    "uint256 bidderNFTId,uint256 askerNFTId,uint256 price,uint256 expirestAt,uint256 nonce)"
+))
+ORDER_TYPES = [
+    'bytes32', 'address', 'bool', 'address', 'address',
+    'uint256', 'uint256', 'uint256', 'uint256', 'uint256'
+]
+
+def order_digest(exchange: ProjectContract, order: tuple) -> bytes:
+    """ EIP-712 digest of the order, `order` has the fields of `Order`. """
+    struct_hash = Web3.keccak(encode_abi(ORDER_TYPES, [ORDER_TYPEHASH, *order]))
+
+    return Web3.keccak(b'\x19\x01' + bytes(exchange.domainSeparator()) + struct_hash)
+
+def sign_order(exchange: ProjectContract, signer: LocalAccount, order: tuple) -> str:
+    """ Signature of the order by the signer, as expected by `fillOrder`. """
+    private_key = keys.PrivateKey(bytes.fromhex(signer.private_key[2:]))
+    signature = private_key.sign_msg_hash(order_digest(exchange, order))
+
+    return "0x" + (signature.to_bytes()[:64] + bytes([signature.v + 27])).hex()
@@ -0,0 +1,267 @@
+"""
+    Opcode-level gas profile of the NFTToNFTExchange trade lifecycle.
+
+    brownie run scripts/profiler/profile_trades.py main [output directory]
+
+    Runs the lifecycle transactions on the development network and reads
+    their opcode traces (`debug_traceTransaction`, replayed by the node).
+    The gas of every opcode is attributed to its source line, to the
+    modifier it runs in (`isTradeExist`, `isTradePaid`, ...) and to a
+    category: sload, sstore, call, log or compute. Calls are counted
+    without the gas of the frame they open, which is attributed to the
+    callee's own opcodes.
+
+    Writes to the output directory (build/profile by default):
+        <function>.folded   folded stacks of every transaction of the
+                            function, for flamegraph.pl or speedscope;
+        summary.txt         gas by category, modifier, internal function
+                            and source line for every function, sorted by
+                            name so that two runs can be diffed.
+"""
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from brownie import NFTToNFTExchange, FakeERC721, accounts, chain
+from brownie.network.transaction import TransactionReceipt
+
+BIDDER_NFT_ID = 13424
+ASKER_NFT_ID = 25252
+DURATION = 700
+PRICE = 3000
+DEFAULT_OUTPUT = "build/profile"
+
+CALL_OPS = {'CALL', 'CALLCODE', 'DELEGATECALL', 'STATICCALL', 'CREATE', 'CREATE2'}
+MODIFIER = re.compile(r"\bmodifier\s+(\w+)")
+
+def category(op: str) -> str:
+    if op in ('SLOAD', 'SSTORE'):
+        return op.lower()
+    if op in CALL_OPS:
+        return 'call'
+    if op.startswith('LOG'):
+        return 'log'
+    return 'compute'
+
+def step_costs(trace: List[dict]) -> List[int]:
+    """ Gas of every step. A step that opens a call frame is charged the gas
+    it consumed minus the gas of the steps run inside the frame. """
+    costs = [0] * len(trace)
+    calls = []
+    for index, step in enumerate(trace):
+        next_step = trace[index + 1] if index + 1 < len(trace) else None
+        if next_step is None or next_step['depth'] < step['depth']:
+            # The last step of a frame.
+            costs[index] = step['gasCost']
+        elif next_step['depth'] > step['depth']:
+            calls.append(index)
+        else:
+            costs[index] = step['gas'] - next_step['gas']
+    # Inner calls first, so that their cost is known to the outer ones.
+    for index in reversed(calls):
+        depth = trace[index]['depth']
+        end = next(
+            (later for later in range(index + 1, len(trace)) if trace[later]['depth'] <= depth),
+            None
+        )
+        if end is None:
+            costs[index] = trace[index]['gasCost']
+        else:
+            costs[index] = trace[index]['gas'] - trace[end]['gas'] - sum(costs[index + 1:end])
+
+    return costs
+
+class SourceMap:
+    """ Line numbers and modifier ranges of the traced sources. """
+
+    def __init__(self) -> None:
+        self.sources: Dict[str, Optional[str]] = {}
+        self.line_starts: Dict[str, List[int]] = {}
+        self.modifiers: Dict[str, List[Tuple[int, int, str]]] = {}
+
+    def load(self, filename: str) -> Optional[str]:
+        if filename not in self.sources:
+            path = Path(filename)
+            source = path.read_text() if path.is_file() else None
+            self.sources[filename] = source
+            if source is not None:
+                self.line_starts[filename] = [0] + [
+                    match.end() for match in re.finditer("\n", source)
+                ]
+                self.modifiers[filename] = list(modifier_ranges(source))
+        return self.sources[filename]
+
+    def line(self, filename: str, offset: int) -> Optional[int]:
+        if self.load(filename) is None:
+            return None
+        starts = self.line_starts[filename]
+        low, high = 0, len(starts)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if starts[middle] <= offset:
+                low = middle
+            else:
+                high = middle
+        return low + 1
+
+    def modifier(self, filename: str, offset: int) -> Optional[str]:
+        if self.load(filename) is None:
+            return None
+        for start, end, name in self.modifiers[filename]:
+            if start <= offset < end:
+                return name
+        return None
+
+def modifier_ranges(source: str):
+    """ (start, end, name) of every modifier body of a source. """
+    for match in MODIFIER.finditer(source):
+        start = source.index("{", match.end())
+        depth = 0
+        for end in range(start, len(source)):
+            if source[end] == "{":
+                depth += 1
+            elif source[end] == "}":
+                depth -= 1
+                if depth == 0:
+                    yield match.start(), end + 1, match.group(1)
+                    break
+
+@dataclass
+class Profile:
+    """ Gas of the transactions of one exchange function. """
+    transactions: int = 0
+    gas_used: int = 0
+    categories: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    modifiers: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    functions: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    lines: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    stacks: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    @property
+    def traced_gas(self) -> int:
+        return sum(self.categories.values())
+
+    def add(self, tx: TransactionReceipt, sources: SourceMap) -> None:
+        self.transactions += 1
+        self.gas_used += tx.gas_used
+        trace = tx.trace
+        for step, cost in zip(trace, step_costs(trace)):
+            source = step.get('source')
+            location, modifier = "<compiler>", None
+            if source:
+                filename, offset = source['filename'], source['offset'][0]
+                line = sources.line(filename, offset)
+                location = f"{filename}:{line}" if line else filename
+                modifier = sources.modifier(filename, offset)
+            fn = step.get('fn') or step.get('contractName') or "<unknown>"
+            op_category = category(step['op'])
+
+            self.categories[op_category] += cost
+            self.functions[fn] += cost
+            self.lines[location] += cost
+            if modifier:
+                self.modifiers[modifier] += cost
+            frames = [tx.fn_name, fn] + ([modifier] if modifier else []) + [location, step['op']]
+            self.stacks[";".join(frames)] += cost
+
+def run_lifecycle(exchange, tokens) -> List[TransactionReceipt]:
+    """ One trade of every lifecycle path. """
+    bidder, asker = accounts[3], accounts[4]
+    bidder_token, asker_token = tokens
+    txs = []
+
+    def create(create_fn, sender, nft_offset: int) -> int:
+        bidder_token.mint(BIDDER_NFT_ID + nft_offset, bidder)
+        asker_token.mint(ASKER_NFT_ID + nft_offset, asker)
+        bidder_token.approve(exchange.address, BIDDER_NFT_ID + nft_offset, {'from': bidder})
+        asker_token.approve(exchange.address, ASKER_NFT_ID + nft_offset, {'from': asker})
+        txs.append(create_fn(
+            BIDDER_NFT_ID + nft_offset,
+            ASKER_NFT_ID + nft_offset,
+            bidder_token.address,
+            asker_token.address,
+            DURATION,
+            PRICE,
+            {'from': sender}
+        ))
+        return txs[-1].return_value
+
+    def fund(trade_id: int, nft_offset: int) -> None:
+        txs.append(exchange.stakeNft(trade_id, BIDDER_NFT_ID + nft_offset, {'from': bidder}))
+        txs.append(exchange.stakeNft(trade_id, ASKER_NFT_ID + nft_offset, {'from': asker}))
+        txs.append(exchange.pay(trade_id, {'from': bidder, 'value': PRICE}))
+
+    # Bid withdrawn by both parties.
+    trade_id = create(exchange.createBid, bidder, 0)
+    fund(trade_id, 0)
+    txs.append(exchange.withdrawNft(trade_id, {'from': asker}))
+    txs.append(exchange.withdrawNft(trade_id, {'from': bidder}))
+    txs.append(exchange.withdrawWei(trade_id, {'from': asker}))
+    # Ask settled by a third party.
+    trade_id = create(exchange.createAsk, asker, 1)
+    fund(trade_id, 1)
+    txs.append(exchange.settle(trade_id, {'from': accounts[5]}))
+    txs.append(exchange.withdrawAll({'from': asker}))
+    # Bid unstaked by both parties.
+    trade_id = create(exchange.createBid, bidder, 2)
+    fund(trade_id, 2)
+    txs.append(exchange.unstakeWei(trade_id, {'from': bidder}))
+    txs.append(exchange.unstakeNft(trade_id, {'from': asker}))
+    txs.append(exchange.unstakeNft(trade_id, {'from': bidder}))
+    # Bid swept after its expiry.
+    trade_id = create(exchange.createBid, bidder, 3)
+    chain.sleep(DURATION + 1)
+    txs.append(exchange.sweepExpired([trade_id], {'from': accounts[5]}))
+
+    return txs
+
+def profile_transactions(txs: List[TransactionReceipt]) -> Dict[str, Profile]:
+    sources = SourceMap()
+    profiles: Dict[str, Profile] = defaultdict(Profile)
+    for tx in txs:
+        profiles[tx.fn_name].add(tx, sources)
+    return profiles
+
+def format_summary(profiles: Dict[str, Profile]) -> str:
+    lines = []
+    for name, profile in sorted(profiles.items()):
+        lines.append(
+            f"{name}: {profile.transactions} tx, gas used {profile.gas_used}, "
+            f"traced {profile.traced_gas}"
+        )
+        for title, values in (
+            ("category", profile.categories),
+            ("modifier", profile.modifiers),
+            ("function", profile.functions),
+            ("line", profile.lines)
+        ):
+            for key, gas in sorted(values.items()):
+                lines.append(f"  {title:<10}{key:<64}{gas:>10}")
+        lines.append("")
+    return "\n".join(lines)
+
+def write_reports(profiles: Dict[str, Profile], output: Path) -> None:
+    output.mkdir(parents=True, exist_ok=True)
+    for name, profile in profiles.items():
+        (output / f"{name}.folded").write_text(
+            "".join(f"{stack} {gas}\n" for stack, gas in sorted(profile.stacks.items()) if gas > 0)
+        )
+    (output / "summary.txt").write_text(format_summary(profiles))
+
+def main(output: str = DEFAULT_OUTPUT) -> None:
+    exchange = NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+    tokens = (FakeERC721.deploy({'from': accounts[1]}), FakeERC721.deploy({'from': accounts[2]}))
+    profiles = profile_transactions(run_lifecycle(exchange, tokens))
+    write_reports(profiles, Path(output))
+
+    print(f"{'function':<20}{'tx':>4}{'gas used':>10}{'sload':>10}{'sstore':>10}{'call':>10}{'log':>10}{'modifiers':>11}")
+    for name, profile in sorted(profiles.items()):
+        print(
+            f"{name:<20}{profile.transactions:>4}{profile.gas_used:>10}"
+            f"{profile.categories['sload']:>10}{profile.categories['sstore']:>10}"
+            f"{profile.categories['call']:>10}{profile.categories['log']:>10}"
+            f"{sum(profile.modifiers.values()):>11}"
+        )
+    print(f"Reports written to {output}")
@@ -0,0 +1,95 @@
+"""
+    Keeper that sweeps expired trades of NFTToNFTExchange.
+
+    brownie run scripts/sweep_expired.py main <exchange address> [batch gas limit] --network <network>
+
+    Expired trades that are not funded are found with `getTrades` and sent
+    to `sweepExpired` in batches whose estimated gas stays below the limit.
+    Expired bundle trades are found from their `BundleCreated` events,
+    which hold the NFT lists, and sent to `sweepExpiredBundles` the same way.
+    The keeper account is `accounts[0]` on development networks and the
+    account named by the KEEPER_ACCOUNT environment variable otherwise.
+"""
+import os
+from typing import Callable, Iterator, List, Sequence, Tuple
+
+from brownie import NFTToNFTExchange, accounts, chain, network
+from brownie.exceptions import VirtualMachineError
+from brownie.network.account import Account
+from brownie.network.contract import ProjectContract
+
+FUNDED = 2
+PAGE_SIZE = 500
+DEFAULT_BATCH_GAS_LIMIT = 5_000_000
+
+def find_expired_trades(exchange: ProjectContract, now: int) -> Iterator[int]:
+    """ Ids of expired trades that `sweepExpired` would cancel. """
+    trade_count = exchange.tradeCount()
+    for offset in range(0, trade_count, PAGE_SIZE):
+        trades = exchange.getTrades(offset, PAGE_SIZE)
+        for trade_id, trade in enumerate(trades, start=offset + 1):
+            if trade['expirestAt'] != 0 and trade['expirestAt'] <= now and trade['status'] != FUNDED:
+                yield trade_id
+
+def find_expired_bundles(exchange: ProjectContract, now: int) -> Iterator[Tuple[int, list, list]]:
+    """ Id and NFT lists of expired bundle trades that `sweepExpiredBundles`
+    would cancel. """
+    for event in exchange.events.get_sequence(from_block=0, event_type='BundleCreated'):
+        if event.args.expirestAt > now:
+            continue
+        try:
+            trade = exchange.getBundleTradeById(event.args.tradeId)
+        except VirtualMachineError:
+            # Settled or swept.
+            continue
+        if trade['status'] != FUNDED:
+            yield event.args.tradeId, event.args.bidderNfts, event.args.askerNfts
+
+def split_into_batches(
+    items: Sequence,
+    estimate_gas: Callable[[list], int],
+    batch_gas_limit: int
+) -> List[list]:
+    """ Groups items so that the estimated gas of a batch fits the limit. """
+    base_gas = estimate_gas([])
+    batches, batch, batch_gas = [], [], base_gas
+    for item in items:
+        item_gas = estimate_gas([item]) - base_gas
+        if batch and batch_gas + item_gas > batch_gas_limit:
+            batches.append(batch)
+            batch, batch_gas = [], base_gas
+        batch.append(item)
+        batch_gas += item_gas
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+def bundle_arguments(bundles: List[Tuple[int, list, list]]) -> tuple:
+    """ Arguments of `sweepExpiredBundles` for (id, bidder NFTs, asker NFTs) items. """
+    return tuple(list(column) for column in zip(*bundles)) if bundles else ([], [], [])
+
+def get_keeper() -> Account:
+    if network.show_active() == 'development':
+        return accounts[0]
+    return accounts.load(os.environ['KEEPER_ACCOUNT'])
+
+def main(exchange_address: str, batch_gas_limit: int = DEFAULT_BATCH_GAS_LIMIT) -> None:
+    exchange = NFTToNFTExchange.at(exchange_address)
+    keeper = get_keeper()
+
+    trade_ids = list(find_expired_trades(exchange, chain[-1].timestamp))
+    print(f"Expired trades: {len(trade_ids)}")
+    estimate_trades = lambda ids: exchange.sweepExpired.estimate_gas(ids, {'from': keeper})
+    for batch in split_into_batches(trade_ids, estimate_trades, int(batch_gas_limit)):
+        tx = exchange.sweepExpired(batch, {'from': keeper})
+        print(f"Swept {tx.return_value} of {len(batch)} trades, gas used: {tx.gas_used}")
+
+    bundles = list(find_expired_bundles(exchange, chain[-1].timestamp))
+    print(f"Expired bundle trades: {len(bundles)}")
+    estimate_bundles = lambda items: exchange.sweepExpiredBundles.estimate_gas(
+        *bundle_arguments(items), {'from': keeper}
+    )
+    for batch in split_into_batches(bundles, estimate_bundles, int(batch_gas_limit)):
+        tx = exchange.sweepExpiredBundles(*bundle_arguments(batch), {'from': keeper})
+        print(f"Swept {tx.return_value} of {len(batch)} bundle trades, gas used: {tx.gas_used}")
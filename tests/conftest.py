@@ -0,0 +1,96 @@
+"""
+    Shared fixtures of the NFT to NFT Exchange tests.
+
+    Contracts are deployed once per module and every test runs inside a
+    chain snapshot (`fn_isolation`) that is reverted when the test ends, so
+    tests still see a freshly deployed exchange and unminted tokens.
+
+    `npm run test:parallel` runs the suite on pytest-xdist workers. Brownie
+    launches a separate ganache for every worker on the configured port plus
+    the worker number (8545, 8546, ...), and the module-scoped fixtures
+    deploy once per worker, so workers share neither chain nor accounts.
+"""
+from typing import Callable, Dict, Sequence, Tuple
+import pytest
+
+from brownie.network.account import Account
+from brownie.network.contract import ProjectContract
+from brownie import NFTToNFTExchange, FakeERC721, FakeERC721A, accounts
+
+BIDDER_NFT_ID = 13424
+ASKER_NFT_ID = 25252
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation) -> None:
+    """ Reverting the chain after every test. """
+    pass
+
+@pytest.fixture(scope="module")
+def exchange() -> ProjectContract:
+    """ Creating instance of NFTToNFTExchange. """
+    return NFTToNFTExchange.deploy(600, {'from': accounts[0]})
+
+@pytest.fixture(scope="module")
+def create_tokens() -> Tuple[ProjectContract, ProjectContract]:
+    """ Creating instances of FakerERC721.  """
+    fake_erc721_1 = FakeERC721.deploy({'from': accounts[1]})
+    fake_erc721_2 = FakeERC721.deploy({'from': accounts[2]})
+
+    return (fake_erc721_1, fake_erc721_2)
+
+@pytest.fixture
+def mint_tokens(create_tokens) -> Tuple[str, str]:
+    """ Distribution of tokens. """
+    fake_erc721_1, fake_erc721_2 = create_tokens
+    fake_erc721_1.mint(BIDDER_NFT_ID, accounts[3])
+    fake_erc721_2.mint(ASKER_NFT_ID, accounts[4])
+
+    return (fake_erc721_1.address, fake_erc721_2.address)
+
+@pytest.fixture
+def created_bid(exchange, mint_tokens) -> int:
+    """ Id of a bid of accounts[3] for the NFT of accounts[4]. """
+    first_addr, second_addr = mint_tokens
+    return exchange.createBid(
+        BIDDER_NFT_ID,
+        ASKER_NFT_ID,
+        first_addr,
+        second_addr,
+        700,
+        3000,
+        {'from': accounts[3]}
+    ).return_value
+
+@pytest.fixture
+def staked_trade(exchange, create_tokens, created_bid) -> int:
+    """ Id of the bid with both NFTs staked and no payment. """
+    first_fake_token, second_fake_token = create_tokens
+    first_fake_token.approve(exchange.address, BIDDER_NFT_ID, {'from': accounts[3]})
+    exchange.stakeNft(created_bid, BIDDER_NFT_ID, {'from': accounts[3]})
+    second_fake_token.approve(exchange.address, ASKER_NFT_ID, {'from': accounts[4]})
+    exchange.stakeNft(created_bid, ASKER_NFT_ID, {'from': accounts[4]})
+
+    return created_bid
+
+@pytest.fixture
+def paid_trade(exchange, staked_trade) -> int:
+    """ Id of the staked bid paid by the bidder. """
+    exchange.pay(staked_trade, {'from': accounts[3], 'value': 3000})
+
+    return staked_trade
+
+@pytest.fixture
+def seed_nfts() -> Callable[[int, Sequence[Account]], Tuple[ProjectContract, Dict[Account, range]]]:
+    """ Deploys a FakeERC721A and mints `count` NFTs split between the
+    holders, one transaction per holder. Returns the token and the ids of
+    every holder. """
+    def seed(count: int, holders: Sequence[Account]) -> Tuple[ProjectContract, Dict[Account, range]]:
+        token = FakeERC721A.deploy({'from': accounts[0]})
+        ids = {}
+        for index, holder in enumerate(holders):
+            share = count // len(holders) + (index < count % len(holders))
+            first_id = token.mint(share, holder, {'from': holder}).return_value
+            ids[holder] = range(first_id, first_id + share)
+        return token, ids
+
+    return seed
@@ -0,0 +1,60 @@
+"""
+    Testing the bulk minting mocks.
+"""
+from brownie import accounts, reverts
+
+def test_mint_batch_and_transfer(seed_nfts) -> None:
+    """ Owners of a batch survive transfers of tokens in its middle. """
+    token, ids = seed_nfts(10000, accounts[3:5])
+
+    assert ids[accounts[3]] == range(0, 5000)
+    assert ids[accounts[4]] == range(5000, 10000)
+    assert token.balanceOf(accounts[3]) == 5000
+    assert token.ownerOf(4999) == accounts[3]
+    assert token.ownerOf(9999) == accounts[4]
+    token.transferFrom(accounts[3], accounts[5], 2500, {'from': accounts[3]})
+
+    assert token.ownerOf(2499) == accounts[3]
+    assert token.ownerOf(2500) == accounts[5]
+    assert token.ownerOf(2501) == accounts[3]
+    assert token.balanceOf(accounts[3]) == 4999
+    with reverts("ERC721: owner query for nonexistent token"):
+        token.ownerOf(10000)
+    with reverts("ERC721: transfer caller is not owner nor approved"):
+        token.transferFrom(accounts[3], accounts[5], 10, {'from': accounts[5]})
+
+def test_trade_nfts_minted_in_batches(exchange, seed_nfts) -> None:
+    """ Batch minted NFTs are staked and swapped like any other NFT. """
+    bidder_token, bidder_ids = seed_nfts(100, [accounts[3]])
+    asker_token, asker_ids = seed_nfts(100, [accounts[4]])
+    trade_id = exchange.createBid(
+        bidder_ids[accounts[3]][50],
+        asker_ids[accounts[4]][7],
+        bidder_token.address,
+        asker_token.address,
+        700,
+        3000,
+        {'from': accounts[3]}
+    ).return_value
+    bidder_token.approve(exchange.address, 50, {'from': accounts[3]})
+    exchange.stakeNft(trade_id, 50, {'from': accounts[3]})
+    asker_token.safeTransferFrom['address,address,uint256,bytes'](
+        accounts[4],
+        exchange.address,
+        7,
+        f"0x{trade_id:064x}",
+        {'from': accounts[4]}
+    )
+    exchange.pay(trade_id, {'from': accounts[3], 'value': 3000})
+    exchange.settle(trade_id, {'from': accounts[5]})
+
+    assert bidder_token.ownerOf(50) == accounts[4]
+    assert bidder_token.ownerOf(51) == accounts[3]
+    assert asker_token.ownerOf(7) == accounts[3]
+
+def test_mint_range(create_tokens) -> None:
+    first_fake_token, _ = create_tokens
+    first_fake_token.mintRange(100, 50, accounts[3], {'from': accounts[3]})
+
+    assert first_fake_token.balanceOf(accounts[3]) == 50
+    assert first_fake_token.ownerOf(149) == accounts[3]
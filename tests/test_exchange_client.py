@@ -0,0 +1,68 @@
+"""
+    Testing the async client of NFT to NFT Exchange.
+"""
+import asyncio
+
+from brownie import accounts, chain, web3
+from scripts.client.exchange_client import ExchangeClient, TradeStatus
+from scripts.client.trade_cache import TradeCache
+
+def test_get_trades_in_batches(exchange, create_tokens, paid_trade) -> None:
+    """ Trades and owners are read through JSON-RPC batches. """
+    first_fake_token, second_fake_token = create_tokens
+
+    async def read():
+        async with ExchangeClient(
+            web3.provider.endpoint_uri,
+            exchange.address,
+            batch_size=2,
+            multicall_size=1
+        ) as client:
+            return (
+                await client.trade_count(),
+                await client.get_trades([paid_trade, paid_trade + 1]),
+                await client.owners_of(second_fake_token.address, [25252])
+            )
+
+    trade_count, (trade, missing_trade), owners = asyncio.run(read())
+
+    assert trade_count == 1
+    assert trade.trade_id == paid_trade
+    assert trade.status == TradeStatus.FUNDED
+    assert trade.bidder == accounts[3] and trade.asker == accounts[4]
+    assert trade.creator == accounts[3]
+    assert trade.price == 3000 and trade.bidder_nft_id == 13424 and trade.asker_nft_id == 25252
+    assert trade.bidder_nft_address == first_fake_token.address
+    assert not missing_trade.exists
+    assert owners == [exchange.address]
+
+def test_trade_cache(exchange, mint_tokens, created_bid) -> None:
+    """ Hits until a log of the trade arrives, LRU eviction and expiration. """
+    first_addr, second_addr = mint_tokens
+    second_bid = exchange.createBid(
+        13425, 25253, first_addr, second_addr, 700, 3000, {'from': accounts[3]}
+    ).return_value
+    now = [chain.time()]
+
+    async def scenario():
+        async with ExchangeClient(web3.provider.endpoint_uri, exchange.address) as client:
+            cache = TradeCache(client, max_size=1, clock=lambda: now[0])
+            await cache.refresh()
+            await cache.get(created_bid)
+            await cache.get(created_bid)
+            exchange.pay(created_bid, {'from': accounts[3], 'value': 3000})
+            await cache.refresh()
+            assert len(cache) == 0
+            trade = await cache.get(created_bid)
+            # Evicts the first trade.
+            await cache.get(second_bid)
+            # Expires the second trade.
+            now[0] += 701
+            await cache.get(second_bid)
+            return trade, cache.stats
+
+    trade, stats = asyncio.run(scenario())
+
+    assert trade.status == TradeStatus.PARTIALLY_FUNDED
+    assert (stats.hits, stats.misses, stats.invalidations) == (1, 4, 1)
+    assert (stats.evictions, stats.expirations) == (1, 1)
@@ -0,0 +1,86 @@
+"""
+    Testing the clone factory of NFT to NFT Exchange.
+"""
+import pytest
+
+from brownie.network.contract import ProjectContract
+from brownie import NFTToNFTExchange, NFTToNFTExchangeFactory, accounts, reverts, chain
+from scripts.orders import sign_order
+
+@pytest.fixture(scope="module")
+def factory(exchange) -> ProjectContract:
+    """ Factory cloning the module's exchange. """
+    return NFTToNFTExchangeFactory.deploy(exchange.address, {'from': accounts[0]})
+
+@pytest.fixture
+def clone(factory) -> ProjectContract:
+    """ Market owned by accounts[6] with a minimum duration of 1000. """
+    tx = factory.createExchange(1000, accounts[6], {'from': accounts[6]})
+    return NFTToNFTExchange.at(tx.events['ExchangeCreated']['exchange'])
+
+def test_create_exchange(exchange, factory, clone, mint_tokens) -> None:
+    """ A clone has its own owner, settings and storage. """
+    first_addr, second_addr = mint_tokens
+
+    assert clone.owner() == accounts[6]
+    assert exchange.owner() == accounts[0]
+    assert clone.domainSeparator() != exchange.domainSeparator()
+    with reverts("The duration value cannot be less than the minimum duration value!"):
+        clone.createBid(13424, 25252, first_addr, second_addr, 700, 3000, {'from': accounts[3]})
+    clone.createBid(13424, 25252, first_addr, second_addr, 1000, 3000, {'from': accounts[3]})
+
+    assert clone.tradeCount() == 1
+    assert exchange.tradeCount() == 0
+
+def test_initialize_only_once(exchange, clone) -> None:
+    with reverts("Initializable: contract is already initialized"):
+        clone.initialize(0, accounts[5], {'from': accounts[5]})
+    # The implementation is initialized by its constructor.
+    with reverts("Initializable: contract is already initialized"):
+        exchange.initialize(0, accounts[5], {'from': accounts[5]})
+
+def test_clone_trade_lifecycle(clone, create_tokens, mint_tokens) -> None:
+    """ Staking, payment, settlement and signed orders work on a clone. """
+    first_fake_token, second_fake_token = create_tokens
+    first_addr, second_addr = mint_tokens
+    trade_id = clone.createBid(13424, 25252, first_addr, second_addr, 1000, 3000, {'from': accounts[3]}).return_value
+    first_fake_token.approve(clone.address, 13424, {'from': accounts[3]})
+    clone.stakeNft(trade_id, 13424, {'from': accounts[3]})
+    second_fake_token.approve(clone.address, 25252, {'from': accounts[4]})
+    clone.stakeNft(trade_id, 25252, {'from': accounts[4]})
+    clone.pay(trade_id, {'from': accounts[3], 'value': 3000})
+    clone.settle(trade_id, {'from': accounts[5]})
+
+    assert first_fake_token.ownerOf(13424) == accounts[4]
+    assert second_fake_token.ownerOf(25252) == accounts[3]
+    assert clone.getBalance(accounts[4]) == 3000
+    maker = accounts.add()
+    accounts[0].transfer(maker, "1 ether")
+    first_fake_token.mint(1, maker)
+    first_fake_token.approve(clone.address, 1, {'from': maker})
+    second_fake_token.approve(clone.address, 25252, {'from': accounts[3]})
+    order = (maker.address, False, second_addr, first_addr, 25252, 1, 2000, chain.time() + 1000, 1)
+
+    clone.fillOrder(order, sign_order(clone, maker, order), {'from': accounts[3], 'value': 2000})
+
+    assert first_fake_token.ownerOf(1) == accounts[3]
+    assert second_fake_token.ownerOf(25252) == maker
+
+def test_orders_are_not_replayed_across_clones(factory, clone, create_tokens, mint_tokens) -> None:
+    """ An order signed for one clone is rejected by another clone. """
+    first_fake_token, second_fake_token = create_tokens
+    first_addr, second_addr = mint_tokens
+    other_clone = NFTToNFTExchange.at(
+        factory.createExchange(1000, accounts[7], {'from': accounts[7]}).events['ExchangeCreated']['exchange']
+    )
+    maker = accounts.add()
+    accounts[0].transfer(maker, "1 ether")
+    first_fake_token.mint(1, maker)
+    first_fake_token.approve(other_clone.address, 1, {'from': maker})
+    second_fake_token.approve(other_clone.address, 25252, {'from': accounts[4]})
+    order = (maker.address, False, second_addr, first_addr, 25252, 1, 2000, chain.time() + 1000, 1)
+    signature = sign_order(clone, maker, order)
+
+    assert other_clone.domainSeparator() != clone.domainSeparator()
+    with reverts("Invalid order signature!"):
+        other_clone.fillOrder(order, signature, {'from': accounts[4], 'value': 2000})
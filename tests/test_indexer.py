@@ -0,0 +1,62 @@
+"""
+    Testing the event indexer of NFT to NFT Exchange.
+"""
+from brownie import accounts, chain
+from scripts.indexer.indexer import TradeIndexer
+
+def test_index_trade_lifecycle(exchange, create_tokens, paid_trade, tmp_path) -> None:
+    """ The indexed state follows staking, unstaking and settlement. """
+    indexer = TradeIndexer(exchange, str(tmp_path / "trades.db"))
+    indexer.sync()
+    trade = indexer.get_trade(paid_trade)
+
+    assert trade['bidder'] == accounts[3]
+    assert trade['asker'] == accounts[4]
+    assert trade['status'] == 2
+    exchange.unstakeWei(paid_trade, {'from': accounts[3]})
+    exchange.unstakeNft(paid_trade, {'from': accounts[4]})
+    indexer.sync()
+    trade = indexer.get_trade(paid_trade)
+
+    assert trade['wei_paid'] == 0
+    assert trade['asker_nft_staked'] == 0
+    assert trade['status'] == 1
+    second_fake_token = create_tokens[1]
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    exchange.stakeNft(paid_trade, 25252, {'from': accounts[4]})
+    exchange.pay(paid_trade, {'from': accounts[3], 'value': 3000})
+    exchange.settle(paid_trade, {'from': accounts[5]})
+    indexer.sync()
+    trade = indexer.get_trade(paid_trade)
+
+    assert trade['status'] == 3
+    assert trade['bidder_received_nft'] == trade['asker_received_nft'] == trade['asker_received_wei'] == 1
+
+def test_index_continues_from_cursor(exchange, created_bid, tmp_path) -> None:
+    """ A new indexer on the same database starts after the stored cursor. """
+    db_path = str(tmp_path / "trades.db")
+    block_number = TradeIndexer(exchange, db_path).sync()
+    exchange.pay(created_bid, {'from': accounts[3], 'value': 3000})
+    indexer = TradeIndexer(exchange, db_path)
+
+    assert indexer.cursor == block_number
+    indexer.sync()
+
+    assert indexer.cursor == chain.height
+    assert indexer.get_trade(created_bid)['wei_paid'] == 1
+
+def test_index_rollback_on_reorg(exchange, created_bid, tmp_path) -> None:
+    """ Events of blocks replaced by a reorg are removed from the index. """
+    indexer = TradeIndexer(exchange, str(tmp_path / "trades.db"))
+    indexer.sync()
+    exchange.pay(created_bid, {'from': accounts[3], 'value': 3000})
+    indexer.sync()
+
+    assert indexer.get_trade(created_bid)['wei_paid'] == 1
+    # Replace the payment block with another block at the same height.
+    chain.undo()
+    accounts[0].transfer(accounts[1], 1)
+    indexer.sync()
+
+    assert indexer.get_trade(created_bid)['wei_paid'] == 0
+    assert indexer.get_trade(created_bid)['status'] == 0
@@ -0,0 +1,73 @@
+"""
+    Testing the bid/ask matcher of NFT to NFT Exchange.
+"""
+from brownie import accounts
+from scripts.matcher.matcher import Matcher, OrderBook
+
+def test_matcher_matches_crossing_trades(exchange, create_tokens, mint_tokens) -> None:
+    """ A ready bid is matched with the cheapest ready ask on its NFTs. """
+    first_fake_token, second_fake_token = create_tokens
+    first_addr, second_addr = mint_tokens
+    matcher = Matcher(exchange, accounts[5], exchange.tx.block_number)
+    bid_id = exchange.createBid(13424, 25252, first_addr, second_addr, 700, 3000, {'from': accounts[3]}).return_value
+    ask_id = exchange.createAsk(13424, 25252, first_addr, second_addr, 700, 2500, {'from': accounts[4]}).return_value
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    exchange.stakeNft(bid_id, 13424, {'from': accounts[3]})
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    exchange.stakeNft(ask_id, 25252, {'from': accounts[4]})
+
+    # The bid is not paid yet.
+    assert matcher.poll() == []
+    exchange.pay(bid_id, {'from': accounts[3], 'value': 3000})
+
+    assert matcher.poll() == [(bid_id, ask_id)]
+    assert exchange.getTradeById(bid_id)[4] == accounts[4]
+    assert exchange.getBalance(accounts[3]) == 500
+    assert matcher.poll() == []
+    assert matcher.book.trades == {}
+
+def test_order_book_sides_follow_the_staked_nft() -> None:
+    """ Stakes are filed by NFT, whoever the staker is. """
+    book = OrderBook()
+    book.apply('AskCreated', {
+        'tradeId': 1,
+        'bidderNFTAddress': "0xA",
+        'bidderNFTId': 7,
+        'askerNFTAddress': "0xB",
+        'askerNFTId': 7,
+        'price': 0,
+        'expirestAt': 2 ** 40,
+        'creator': "0xC"
+    })
+    trade = book.trades[1]
+    # A third party stakes the bidder's NFT of an ask, then the creator its own.
+    book.apply('NftStaked', {'tradeId': 1, 'staker': "0xD", 'nftAddress': "0xA", 'nftId': 7})
+    assert trade.bidder_nft_staked and not trade.asker_nft_staked
+    book.apply('NftStaked', {'tradeId': 1, 'staker': "0xC", 'nftAddress': "0xB", 'nftId': 7})
+    assert trade.asker_nft_staked
+    # Both NFTs have the same id, the recipient tells the side.
+    book.apply('NftUnstaked', {'tradeId': 1, 'to': "0xC", 'nftId': 7})
+    assert trade.bidder_nft_staked and not trade.asker_nft_staked
+    book.apply('NftUnstaked', {'tradeId': 1, 'to': "0xD", 'nftId': 7})
+    assert not trade.bidder_nft_staked
+
+def test_order_book_self_trade() -> None:
+    """ A creator staking both sides has each NFT filed on its own side. """
+    book = OrderBook()
+    book.apply('BidCreated', {
+        'tradeId': 1,
+        'bidderNFTAddress': "0xA",
+        'bidderNFTId': 7,
+        'askerNFTAddress': "0xB",
+        'askerNFTId': 8,
+        'price': 0,
+        'expirestAt': 2 ** 40,
+        'creator': "0xC"
+    })
+    trade = book.trades[1]
+    book.apply('NftStaked', {'tradeId': 1, 'staker': "0xC", 'nftAddress': "0xB", 'nftId': 8})
+    assert trade.asker_nft_staked and not trade.bidder_nft_staked
+    book.apply('NftStaked', {'tradeId': 1, 'staker': "0xC", 'nftAddress': "0xA", 'nftId': 7})
+    assert trade.bidder_nft_staked
+    book.apply('NftUnstaked', {'tradeId': 1, 'to': "0xC", 'nftId': 8})
+    assert trade.bidder_nft_staked and not trade.asker_nft_staked
@@ -3,34 +3,10 @@
 """
 from time import time
 from collections import OrderedDict
-from typing import Tuple
-import pytest
 
-from brownie.network.contract import ProjectContract
 from brownie.network.transaction import TransactionReceipt
-from brownie import NFTToNFTExchange, FakeERC721, accounts, reverts, chain
-
-@pytest.fixture
-def exchange() -> ProjectContract:
-    """ Creating instance of NFTToNFTExchange. """
-    return NFTToNFTExchange.deploy(600, {'from': accounts[0]})
-
-@pytest.fixture
-def create_tokens() -> Tuple[ProjectContract, ProjectContract]:
-    """ Creating instances of FakerERC721.  """
-    fake_erc721_1 = FakeERC721.deploy({'from': accounts[1]})
-    fake_erc721_2 = FakeERC721.deploy({'from': accounts[2]})
-
-    return (fake_erc721_1, fake_erc721_2)
-
-@pytest.fixture
-def mint_tokens(create_tokens) -> Tuple[str, str]:
-    """ Distribution of tokens. """
-    fake_erc721_1, fake_erc721_2 = create_tokens
-    fake_erc721_1.mint(13424, accounts[3])
-    fake_erc721_2.mint(25252, accounts[4])
-
-    return (fake_erc721_1.address, fake_erc721_2.address)
+from brownie import FakeWallet, accounts, reverts, chain, web3
+from scripts.orders import sign_order
 
 def test_create_bid_and_check(exchange, mint_tokens) -> None:
     """ Creating a bid and check the result. """
@@ -541,33 +517,12 @@ def test_unstake_asker_nft(exchange, create_tokens) -> None:
     exchange.unstakeNft(create_bid_tx.return_value, {'from': accounts[4]})
     assert second_fake_token.ownerOf(25252) == accounts[4]
 
-def test_unstake_bidder_nft_when_asker_receive_nft(exchange, create_tokens) -> None:
-    first_fake_token, second_fake_token = create_tokens
-    first_fake_token.mint(13424, accounts[3])
-    second_fake_token.mint(25252, accounts[4])
-    # Create bid.
-    create_bid_tx: TransactionReceipt = exchange.createBid(
-        13424,
-        25252,
-        first_fake_token.address,
-        second_fake_token.address,
-        700,
-        3000,
-        {'from': accounts[3]}
-    )
-    # Stake bidder NFT.
-    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
-    exchange.stakeNft(create_bid_tx.return_value, 13424, {'from': accounts[3]})
-    # Stake asker NFT.
-    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
-    exchange.stakeNft(create_bid_tx.return_value, 25252, {'from': accounts[4]})
-    # Payment.
-    exchange.pay(create_bid_tx.return_value, {'from': accounts[3], 'value': 3000})
+def test_unstake_bidder_nft_when_asker_receive_nft(exchange, paid_trade) -> None:
     # Asker withdraw NFT.
-    exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[4]})
+    exchange.withdrawNft(paid_trade, {'from': accounts[4]})
     # Bidder tries to unstake bidder NFT.
     with reverts("It is impossible to return NFT after part of the reward has been received!"):
-        exchange.unstakeNft(create_bid_tx.return_value, {'from': accounts[3]})
+        exchange.unstakeNft(paid_trade, {'from': accounts[3]})
 
 def test_unstake_wei(exchange, create_tokens) -> None:
     first_fake_token, second_fake_token = create_tokens
@@ -592,7 +547,14 @@ def test_unstake_wei(exchange, create_tokens) -> None:
     # Check payment.
     assert exchange.balance() == 0
 
-def test_unstake_wei_when_asker_receive_nft(exchange, create_tokens) -> None:
+def test_unstake_wei_when_asker_receive_nft(exchange, paid_trade) -> None:
+    # Asker withdraw NFT.
+    exchange.withdrawNft(paid_trade, {'from': accounts[4]})
+    # Bidder tries to unstake Wei.
+    with reverts("It is impossible to return Wei after part of the reward has been received!"):
+        exchange.unstakeWei(paid_trade, {'from': accounts[3]})
+
+def test_withdraw_nft_and_withdraw_wei(exchange, create_tokens) -> None:
     first_fake_token, second_fake_token = create_tokens
     first_fake_token.mint(13424, accounts[3])
     second_fake_token.mint(25252, accounts[4])
@@ -609,18 +571,121 @@ def test_unstake_wei_when_asker_receive_nft(exchange, create_tokens) -> None:
     # Stake bidder NFT.
     first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
     exchange.stakeNft(create_bid_tx.return_value, 13424, {'from': accounts[3]})
+    assert first_fake_token.ownerOf(13424) == exchange.address
     # Stake asker NFT.
     second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
     exchange.stakeNft(create_bid_tx.return_value, 25252, {'from': accounts[4]})
+    assert second_fake_token.ownerOf(25252) == exchange.address
     # Payment.
     exchange.pay(create_bid_tx.return_value, {'from': accounts[3], 'value': 3000})
-    # Asker withdraw NFT.
+    # Asker receive bidder NFT.
     exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[4]})
-    # Bidder tries to unstake Wei.
-    with reverts("It is impossible to return Wei after part of the reward has been received!"):
-        exchange.unstakeWei(create_bid_tx.return_value, {'from': accounts[3]})
+    assert first_fake_token.ownerOf(13424) == accounts[4]
+    # Bidder receive asker NFT.
+    exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[3]})
+    assert second_fake_token.ownerOf(25252) == accounts[3]
+    # Asker receive bidder Wei.
+    exchange.withdrawWei(create_bid_tx.return_value, {'from': accounts[4]})
+    assert exchange.getBalance(accounts[4]) == 3000
+    exchange.withdrawAll({'from': accounts[4]})
+    assert exchange.balance() == 0
 
-def test_withdraw_nft_and_withdraw_wei(exchange, create_tokens) -> None:
+def test_withdraw_already_withdrawn_bidder_nft(exchange, create_tokens, paid_trade) -> None:
+    first_fake_token, second_fake_token = create_tokens
+    assert first_fake_token.ownerOf(13424) == exchange.address
+    assert second_fake_token.ownerOf(25252) == exchange.address
+    # Asker withdraw bidder NFT.
+    exchange.withdrawNft(paid_trade, {'from': accounts[4]})
+    assert first_fake_token.ownerOf(13424) == accounts[4]
+    with reverts("NFT is already withdrawed!"):
+        exchange.withdrawNft(paid_trade, {'from': accounts[4]})
+
+def test_withdraw_already_withdrawn_asker_nft(exchange, create_tokens, paid_trade) -> None:
+    first_fake_token, second_fake_token = create_tokens
+    assert first_fake_token.ownerOf(13424) == exchange.address
+    assert second_fake_token.ownerOf(25252) == exchange.address
+    # Bidder withdraw asker NFT.
+    exchange.withdrawNft(paid_trade, {'from': accounts[3]})
+    assert second_fake_token.ownerOf(25252) == accounts[3]
+    with reverts("NFT is already withdrawed!"):
+        exchange.withdrawNft(paid_trade, {'from': accounts[3]})
+
+def test_create_bid_with_a_price_that_does_not_fit_into_trade(exchange, mint_tokens) -> None:
+    """ Create a bid with price > 2**96 - 1 and check revert. """
+    first_addr, second_addr = mint_tokens
+
+    with reverts("The price value is too large!"):
+        exchange.createBid(
+            13423,
+            25252,
+            first_addr,
+            second_addr,
+            700,
+            2**96,
+            {'from': accounts[3]}
+        )
+
+def test_create_bids_and_asks_in_one_transaction(exchange, mint_tokens) -> None:
+    """ Create several bids and asks with the batch variants. """
+    first_addr, second_addr = mint_tokens
+    trades = [
+        (13424, 25252, first_addr, second_addr, 700, 3000),
+        (13425, 25253, first_addr, second_addr, 800, 4000)
+    ]
+
+    bid_ids = exchange.createBids(trades, {'from': accounts[3]}).return_value
+    ask_ids = exchange.createAsks(trades, {'from': accounts[4]}).return_value
+
+    assert bid_ids == (1, 2)
+    assert ask_ids == (3, 4)
+    # Wei sent with a batch create would belong to no trade.
+    assert not exchange.createBids.payable
+    assert exchange.getTradeById(2)[5] == accounts[3]
+    assert exchange.getTradeById(2)[9] == 4000
+    assert exchange.getTradeById(4)[5] == accounts[4]
+
+def test_create_bids_with_the_equal_nft_id(exchange, mint_tokens) -> None:
+    """ The batch variant keeps the checks of createBid. """
+    first_addr, second_addr = mint_tokens
+    trades = [
+        (13424, 25252, first_addr, second_addr, 700, 3000),
+        (13423, 13423, first_addr, first_addr, 700, 3000)
+    ]
+
+    with reverts('NFT cannot be the same!'):
+        exchange.createBids(trades, {'from': accounts[3]})
+
+def test_stake_nfts_and_pay_many(exchange, create_tokens) -> None:
+    """ Fund two bids with stakeNfts and payMany. """
+    first_fake_token, second_fake_token = create_tokens
+    for nft_id in (13424, 13425):
+        first_fake_token.mint(nft_id, accounts[3])
+        first_fake_token.approve(exchange.address, nft_id, {'from': accounts[3]})
+    for nft_id in (25252, 25253):
+        second_fake_token.mint(nft_id, accounts[4])
+        second_fake_token.approve(exchange.address, nft_id, {'from': accounts[4]})
+    trades = [
+        (13424, 25252, first_fake_token.address, second_fake_token.address, 700, 3000),
+        (13425, 25253, first_fake_token.address, second_fake_token.address, 700, 4000)
+    ]
+    trade_ids = exchange.createBids(trades, {'from': accounts[3]}).return_value
+
+    exchange.stakeNfts(trade_ids, (13424, 13425), {'from': accounts[3]})
+    exchange.stakeNfts(trade_ids, (25252, 25253), {'from': accounts[4]})
+    with reverts("Amount of Wei must be equal to the sum of the prices!"):
+        exchange.payMany(trade_ids, {'from': accounts[3], 'value': 3000})
+    exchange.payMany(trade_ids, {'from': accounts[3], 'value': 7000})
+
+    assert exchange.balance() == 7000
+    assert exchange.getTradeById(trade_ids[0])[6] == True
+    assert exchange.getTradeById(trade_ids[1])[6] == True
+
+def test_stake_nfts_with_different_arrays_lengths(exchange) -> None:
+    with reverts("Arrays must have the same length!"):
+        exchange.stakeNfts((1, 2), (13424,), {'from': accounts[3]})
+
+def test_settle(exchange, create_tokens) -> None:
+    """ Anyone can settle a paid trade in one transaction. """
     first_fake_token, second_fake_token = create_tokens
     first_fake_token.mint(13424, accounts[3])
     second_fake_token.mint(25252, accounts[4])
@@ -634,27 +699,33 @@ def test_withdraw_nft_and_withdraw_wei(exchange, create_tokens) -> None:
         3000,
         {'from': accounts[3]}
     )
-    # Stake bidder NFT.
+    trade_id = create_bid_tx.return_value
+    # Settle before payment.
+    with reverts("Trade must be paid!!"):
+        exchange.settle(trade_id, {'from': accounts[5]})
+    # Stake NFTs and pay.
     first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
-    exchange.stakeNft(create_bid_tx.return_value, 13424, {'from': accounts[3]})
-    assert first_fake_token.ownerOf(13424) == exchange.address
-    # Stake asker NFT.
+    exchange.stakeNft(trade_id, 13424, {'from': accounts[3]})
     second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
-    exchange.stakeNft(create_bid_tx.return_value, 25252, {'from': accounts[4]})
-    assert second_fake_token.ownerOf(25252) == exchange.address
-    # Payment.
-    exchange.pay(create_bid_tx.return_value, {'from': accounts[3], 'value': 3000})
-    # Asker receive bidder NFT.
-    exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[4]})
+    exchange.stakeNft(trade_id, 25252, {'from': accounts[4]})
+    exchange.pay(trade_id, {'from': accounts[3], 'value': 3000})
+    asker_balance = accounts[4].balance()
+    # Settle from a third party.
+    tx = exchange.settle(trade_id, {'from': accounts[5]})
+
+    assert tx.events['TradeClosed']['status'] == 3
     assert first_fake_token.ownerOf(13424) == accounts[4]
-    # Bidder receive asker NFT.
-    exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[3]})
     assert second_fake_token.ownerOf(25252) == accounts[3]
-    # Asker receive bidder Wei.
-    exchange.withdrawWei(create_bid_tx.return_value, {'from': accounts[4]})
+    # The price is credited to the asker.
+    assert exchange.getBalance(accounts[4]) == 3000
+    exchange.withdrawAll({'from': accounts[4]})
+    assert accounts[4].balance() == asker_balance + 3000
     assert exchange.balance() == 0
+    with reverts("Trade does not exist!"):
+        exchange.getTradeById(trade_id)
 
-def test_withdraw_already_withdrawn_bidder_nft(exchange, create_tokens) -> None:
+def test_settle_after_partial_withdrawal(exchange, create_tokens) -> None:
+    """ Settle transfers only what has not been withdrawn yet. """
     first_fake_token, second_fake_token = create_tokens
     first_fake_token.mint(13424, accounts[3])
     second_fake_token.mint(25252, accounts[4])
@@ -668,23 +739,212 @@ def test_withdraw_already_withdrawn_bidder_nft(exchange, create_tokens) -> None:
         3000,
         {'from': accounts[3]}
     )
-    # Stake bidder NFT.
+    trade_id = create_bid_tx.return_value
+    # Stake NFTs and pay.
     first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
-    exchange.stakeNft(create_bid_tx.return_value, 13424, {'from': accounts[3]})
-    assert first_fake_token.ownerOf(13424) == exchange.address
-    # Stake asker NFT.
+    exchange.stakeNft(trade_id, 13424, {'from': accounts[3]})
     second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
-    exchange.stakeNft(create_bid_tx.return_value, 25252, {'from': accounts[4]})
-    assert second_fake_token.ownerOf(25252) == exchange.address
-    # Payment.
-    exchange.pay(create_bid_tx.return_value, {'from': accounts[3], 'value': 3000})
+    exchange.stakeNft(trade_id, 25252, {'from': accounts[4]})
+    exchange.pay(trade_id, {'from': accounts[3], 'value': 3000})
     # Asker withdraw bidder NFT.
-    exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[4]})
+    exchange.withdrawNft(trade_id, {'from': accounts[4]})
+    # Settle the rest.
+    tx = exchange.settle(trade_id, {'from': accounts[3]})
+
+    assert len(tx.events['NftWithdrawed']) == 1
+    assert second_fake_token.ownerOf(25252) == accounts[3]
+    assert exchange.getBalance(accounts[4]) == 3000
+
+def test_stake_asker_nft_with_safe_transfer(exchange, create_tokens) -> None:
+    """ Stake NFT without approval by sending it with the trade id. """
+    first_fake_token, second_fake_token = create_tokens
+    second_fake_token.mint(25252, accounts[4])
+    # Create bid.
+    create_bid_tx: TransactionReceipt = exchange.createBid(
+        13424,
+        25252,
+        first_fake_token.address,
+        second_fake_token.address,
+        700,
+        3000,
+        {'from': accounts[3]}
+    )
+    trade_id = create_bid_tx.return_value
+    # Send asker NFT to the exchange.
+    second_fake_token.safeTransferFrom['address,address,uint256,bytes'](
+        accounts[4],
+        exchange.address,
+        25252,
+        f"0x{trade_id:064x}",
+        {'from': accounts[4]}
+    )
+    bid: OrderedDict = exchange.getTradeById(trade_id)
+
+    assert exchange.address == second_fake_token.ownerOf(25252)
+    assert bid[4] == accounts[4]
+    # Unstake works as for stakeNft.
+    exchange.unstakeNft(trade_id, {'from': accounts[4]})
+    assert second_fake_token.ownerOf(25252) == accounts[4]
+
+def test_stake_nft_from_another_collection_with_safe_transfer(exchange, create_tokens) -> None:
+    """ NFT with the right id but from another contract is rejected. """
+    first_fake_token, second_fake_token = create_tokens
+    first_fake_token.mint(25252, accounts[4])
+    # Create bid.
+    create_bid_tx: TransactionReceipt = exchange.createBid(
+        13424,
+        25252,
+        first_fake_token.address,
+        second_fake_token.address,
+        700,
+        3000,
+        {'from': accounts[3]}
+    )
+    with reverts("The NFT is not the seller's NFT or the buyer's NFT!"):
+        first_fake_token.safeTransferFrom['address,address,uint256,bytes'](
+            accounts[4],
+            exchange.address,
+            25252,
+            f"0x{create_bid_tx.return_value:064x}",
+            {'from': accounts[4]}
+        )
+
+def test_get_trades_and_trades_by_ids(exchange, mint_tokens) -> None:
+    """ Read several trades with one call. """
+    first_addr, second_addr = mint_tokens
+    trades = [
+        (13424, 25252, first_addr, second_addr, 700, 1000),
+        (13425, 25253, first_addr, second_addr, 700, 2000),
+        (13426, 25254, first_addr, second_addr, 700, 3000)
+    ]
+    exchange.createBids(trades, {'from': accounts[3]})
+
+    assert exchange.tradeCount() == 3
+    page = exchange.getTrades(1, 5)
+    assert len(page) == 2
+    assert page[0]['bidderNFTId'] == 13425
+    assert page[1]['price'] == 3000
+    # Created by bidder.
+    assert page[1]['flags'] & 1 == 1
+    assert len(exchange.getTrades(3, 5)) == 0
+    by_ids = exchange.getTradesByIds((3, 1, 7))
+    assert by_ids[0]['askerNFTId'] == 25254
+    assert by_ids[1]['bidder'] == accounts[3]
+    assert by_ids[1]['expirestAt'] != 0
+    # Trade 7 does not exist.
+    assert by_ids[2]['expirestAt'] == 0
+
+def test_trades_of_account_and_nft(exchange, create_tokens) -> None:
+    """ Indexes are updated on create, stake and settle. """
+    first_fake_token, second_fake_token = create_tokens
+    first_fake_token.mint(13424, accounts[3])
+    second_fake_token.mint(25252, accounts[4])
+    trades = [
+        (13424, 25252, first_fake_token.address, second_fake_token.address, 700, 3000),
+        (13424, 11111, first_fake_token.address, second_fake_token.address, 700, 3000),
+        (13425, 25252, first_fake_token.address, second_fake_token.address, 700, 3000)
+    ]
+    exchange.createBids(trades, {'from': accounts[3]})
+
+    assert exchange.tradesOfAccount(accounts[3], 0, 10) == (1, 2, 3)
+    assert exchange.tradesOfAccount(accounts[3], 1, 1) == (2,)
+    assert exchange.tradesOfAccount(accounts[4], 0, 10) == ()
+    # Bids are indexed by the asker's NFT only.
+    assert exchange.tradesOfNft(first_fake_token.address, 13424, 0, 10) == ()
+    assert exchange.tradesOfNft(second_fake_token.address, 25252, 0, 10) == (1, 3)
+    # Stake and pay trade 1.
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    exchange.stakeNft(1, 13424, {'from': accounts[3]})
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    exchange.stakeNft(1, 25252, {'from': accounts[4]})
+    exchange.pay(1, {'from': accounts[3], 'value': 3000})
+    assert exchange.tradesOfAccount(accounts[4], 0, 10) == (1,)
+    # Settled trade leaves the indexes, the last one takes its place.
+    exchange.settle(1, {'from': accounts[3]})
+    assert exchange.tradesOfAccount(accounts[3], 0, 10) == (3, 2)
+    assert exchange.tradesOfAccount(accounts[4], 0, 10) == ()
+    assert exchange.tradesOfNft(second_fake_token.address, 25252, 0, 10) == (3,)
+    # Asks are indexed by the bidder's NFT only.
+    exchange.createAsks(trades[:1], {'from': accounts[4]})
+    assert exchange.tradesOfNft(first_fake_token.address, 13424, 0, 10) == (4,)
+    assert exchange.tradesOfNft(second_fake_token.address, 25252, 0, 10) == (3,)
+
+def test_fill_signed_bid_order(exchange, create_tokens) -> None:
+    """ The bid is signed off-chain and filled by the asker. """
+    first_fake_token, second_fake_token = create_tokens
+    maker = accounts.add()
+    accounts[0].transfer(maker, "1 ether")
+    first_fake_token.mint(13424, maker)
+    second_fake_token.mint(25252, accounts[4])
+    first_fake_token.approve(exchange.address, 13424, {'from': maker})
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    exchange.deposit({'from': maker, 'value': 3000})
+    order = (
+        maker.address,
+        True,
+        first_fake_token.address,
+        second_fake_token.address,
+        13424,
+        25252,
+        3000,
+        chain.time() + 700,
+        1
+    )
+    signature = sign_order(exchange, maker, order)
+    # Only the maker's signature is accepted.
+    with reverts("Invalid order signature!"):
+        exchange.fillOrder(order, sign_order(exchange, accounts.add(), order), {'from': accounts[4]})
+
+    tx = exchange.fillOrder(order, signature, {'from': accounts[4]})
+
+    assert 'OrderFilled' in tx.events
     assert first_fake_token.ownerOf(13424) == accounts[4]
-    with reverts("NFT is already withdrawed!"):
-        exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[4]})
+    assert second_fake_token.ownerOf(25252) == maker
+    assert exchange.getBalance(maker) == 0
+    assert exchange.getBalance(accounts[4]) == 3000
+    assert exchange.isOrderNonceUsed(maker, 1) == True
+    with reverts("Order is already filled or cancelled!"):
+        exchange.fillOrder(order, signature, {'from': accounts[4]})
+    # Asker withdraws the price.
+    exchange.withdrawBalance(3000, {'from': accounts[4]})
+    assert exchange.balance() == 0
 
-def test_withdraw_already_withdrawn_asker_nft(exchange, create_tokens) -> None:
+def test_fill_signed_ask_order_and_cancel(exchange, create_tokens) -> None:
+    """ The ask is paid by the filler, a cancelled order cannot be filled. """
+    first_fake_token, second_fake_token = create_tokens
+    maker = accounts.add()
+    accounts[0].transfer(maker, "1 ether")
+    first_fake_token.mint(13424, accounts[3])
+    second_fake_token.mint(25252, maker)
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    second_fake_token.approve(exchange.address, 25252, {'from': maker})
+    order = [
+        maker.address,
+        False,
+        first_fake_token.address,
+        second_fake_token.address,
+        13424,
+        25252,
+        4000,
+        chain.time() + 700,
+        1
+    ]
+    with reverts("Amount of Wei must be equal to the price!"):
+        exchange.fillOrder(order, sign_order(exchange, maker, order), {'from': accounts[3], 'value': 3999})
+    exchange.fillOrder(order, sign_order(exchange, maker, order), {'from': accounts[3], 'value': 4000})
+
+    assert first_fake_token.ownerOf(13424) == maker
+    assert second_fake_token.ownerOf(25252) == accounts[3]
+    assert exchange.getBalance(maker) == 4000
+    # Cancelled order.
+    order[8] = 2
+    exchange.cancelOrder(2, {'from': maker})
+    with reverts("Order is already filled or cancelled!"):
+        exchange.fillOrder(order, sign_order(exchange, maker, order), {'from': accounts[3], 'value': 4000})
+
+
+def test_trade_status_transitions(exchange, create_tokens) -> None:
+    """ Open -> PartiallyFunded -> Funded -> Settled. """
     first_fake_token, second_fake_token = create_tokens
     first_fake_token.mint(13424, accounts[3])
     second_fake_token.mint(25252, accounts[4])
@@ -698,18 +958,336 @@ def test_withdraw_already_withdrawn_asker_nft(exchange, create_tokens) -> None:
         3000,
         {'from': accounts[3]}
     )
+    trade_id = create_bid_tx.return_value
+    status = lambda: exchange.getTradesByIds((trade_id,))[0]['status']
+    assert status() == 0
     # Stake bidder NFT.
     first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
-    exchange.stakeNft(create_bid_tx.return_value, 13424, {'from': accounts[3]})
-    assert first_fake_token.ownerOf(13424) == exchange.address
+    exchange.stakeNft(trade_id, 13424, {'from': accounts[3]})
+    assert status() == 1
     # Stake asker NFT.
     second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
-    exchange.stakeNft(create_bid_tx.return_value, 25252, {'from': accounts[4]})
-    assert second_fake_token.ownerOf(25252) == exchange.address
+    exchange.stakeNft(trade_id, 25252, {'from': accounts[4]})
+    assert status() == 1
     # Payment.
+    exchange.pay(trade_id, {'from': accounts[3], 'value': 3000})
+    assert status() == 2
+    # Unstaking goes back to PartiallyFunded.
+    exchange.unstakeNft(trade_id, {'from': accounts[4]})
+    assert status() == 1
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    exchange.stakeNft(trade_id, 25252, {'from': accounts[4]})
+    assert status() == 2
+    # The last withdrawal settles the trade.
+    exchange.withdrawNft(trade_id, {'from': accounts[4]})
+    exchange.withdrawNft(trade_id, {'from': accounts[3]})
+    tx = exchange.withdrawWei(trade_id, {'from': accounts[4]})
+    assert tx.events['TradeClosed']['status'] == 3
+    with reverts("Trade does not exist!"):
+        exchange.getTradeById(trade_id)
+
+def test_unstake_wei_returns_wei_to_bidder(exchange, create_tokens) -> None:
+    first_fake_token, second_fake_token = create_tokens
+    # Create bid.
+    create_bid_tx: TransactionReceipt = exchange.createBid(
+        13424,
+        25252,
+        first_fake_token.address,
+        second_fake_token.address,
+        700,
+        3000,
+        {'from': accounts[3]}
+    )
     exchange.pay(create_bid_tx.return_value, {'from': accounts[3], 'value': 3000})
-    # Asker withdraw bidder NFT.
-    exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[3]})
+    bidder_balance = accounts[3].balance()
+    # Unstake Wei.
+    exchange.unstakeWei(create_bid_tx.return_value, {'from': accounts[3]})
+
+    assert accounts[3].balance() == bidder_balance + 3000
+    # The bid can be paid again.
+    exchange.pay(create_bid_tx.return_value, {'from': accounts[3], 'value': 3000})
+
+def test_sweep_expired(exchange, create_tokens) -> None:
+    """ Expired trades are cancelled and refunded, others are skipped. """
+    first_fake_token, second_fake_token = create_tokens
+    first_fake_token.mint(13424, accounts[3])
+    second_fake_token.mint(25252, accounts[4])
+    trades = [
+        (13424, 25252, first_fake_token.address, second_fake_token.address, 700, 3000),
+        (13424, 25252, first_fake_token.address, second_fake_token.address, 700, 3000),
+        (13424, 25252, first_fake_token.address, second_fake_token.address, 2000, 3000)
+    ]
+    exchange.createBids(trades, {'from': accounts[3]})
+    # Trade 1 is partially funded.
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    exchange.stakeNft(1, 13424, {'from': accounts[3]})
+    exchange.pay(1, {'from': accounts[3], 'value': 3000})
+    bidder_balance = accounts[3].balance()
+    # Time travel, trade 3 is not expired yet.
+    chain.sleep(800)
+    tx = exchange.sweepExpired((1, 2, 3, 4), {'from': accounts[5]})
+
+    assert tx.return_value == 2
+    assert [event['status'] for event in tx.events['TradeClosed']] == [4, 4]
+    assert first_fake_token.ownerOf(13424) == accounts[3]
+    assert exchange.getBalance(accounts[3]) == 3000
+    exchange.withdrawAll({'from': accounts[3]})
+    assert accounts[3].balance() == bidder_balance + 3000
+    assert exchange.balance() == 0
+    assert exchange.tradesOfAccount(accounts[3], 0, 10) == (3,)
+    with reverts("Trade does not exist!"):
+        exchange.getTradeById(1)
+    assert exchange.getTradeById(3)[0] == 3
+
+def test_withdraw_all_after_several_trades(exchange, create_tokens) -> None:
+    """ Proceeds of several settled trades are withdrawn at once. """
+    first_fake_token, second_fake_token = create_tokens
+    for nft_id in (13424, 13425):
+        first_fake_token.mint(nft_id, accounts[3])
+        first_fake_token.approve(exchange.address, nft_id, {'from': accounts[3]})
+    for nft_id in (25252, 25253):
+        second_fake_token.mint(nft_id, accounts[4])
+        second_fake_token.approve(exchange.address, nft_id, {'from': accounts[4]})
+    trades = [
+        (13424, 25252, first_fake_token.address, second_fake_token.address, 700, 3000),
+        (13425, 25253, first_fake_token.address, second_fake_token.address, 700, 4000)
+    ]
+    trade_ids = exchange.createBids(trades, {'from': accounts[3]}).return_value
+    exchange.stakeNfts(trade_ids, (13424, 13425), {'from': accounts[3]})
+    exchange.stakeNfts(trade_ids, (25252, 25253), {'from': accounts[4]})
+    exchange.payMany(trade_ids, {'from': accounts[3], 'value': 7000})
+    for trade_id in trade_ids:
+        exchange.settle(trade_id, {'from': accounts[3]})
+    asker_balance = accounts[4].balance()
+
+    exchange.withdrawAll({'from': accounts[4]})
+
+    assert accounts[4].balance() == asker_balance + 7000
+    assert exchange.getBalance(accounts[4]) == 0
+    with reverts("Balance is empty!"):
+        exchange.withdrawAll({'from': accounts[4]})
+
+def test_contract_wallet_withdraws_wei(exchange, create_tokens) -> None:
+    """ A wallet whose receive needs more than 2300 gas is paid. """
+    first_fake_token, second_fake_token = create_tokens
+    wallet = FakeWallet.deploy({'from': accounts[4]})
+    first_fake_token.mint(13424, accounts[3])
+    second_fake_token.mint(25252, wallet)
+    trade_id = exchange.createBid(
+        13424, 25252, first_fake_token.address, second_fake_token.address, 700, 3000, {'from': accounts[3]}
+    ).return_value
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    exchange.stakeNft(trade_id, 13424, {'from': accounts[3]})
+    wallet.execute(
+        second_fake_token.address,
+        second_fake_token.approve.encode_input(exchange.address, 25252),
+        {'from': accounts[4]}
+    )
+    wallet.execute(exchange.address, exchange.stakeNft.encode_input(trade_id, 25252), {'from': accounts[4]})
+    exchange.pay(trade_id, {'from': accounts[3], 'value': 3000})
+
+    wallet.execute(exchange.address, exchange.withdrawWei.encode_input(trade_id), {'from': accounts[4]})
+    wallet.execute(exchange.address, exchange.withdrawAll.encode_input(), {'from': accounts[4]})
+
+    assert wallet.received() == 3000
+    assert exchange.getBalance(wallet) == 0
+
+def test_bundle_trade(exchange, create_tokens) -> None:
+    """ Two NFTs of the bidder are swapped for one NFT of the asker. """
+    first_fake_token, second_fake_token = create_tokens
+    for nft_id in (13424, 13425):
+        first_fake_token.mint(nft_id, accounts[3])
+        first_fake_token.approve(exchange.address, nft_id, {'from': accounts[3]})
+    second_fake_token.mint(25252, accounts[4])
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    bidder_nfts = [(first_fake_token.address, 13424), (first_fake_token.address, 13425)]
+    asker_nfts = [(second_fake_token.address, 25252)]
+    # Create bundle bid.
+    create_tx = exchange.createBundleBid(
+        (bidder_nfts, asker_nfts, 700, 3000),
+        {'from': accounts[3]}
+    )
+    trade_id = create_tx.return_value
+
+    assert create_tx.events['BundleCreated']['tradeId'] == trade_id
+    assert create_tx.events['BundleCreated']['isBid'] == True
+    # Only the listed NFTs can be staked.
+    with reverts("The NFTs are not the seller's NFTs or the buyer's NFTs!"):
+        exchange.stakeBundle(trade_id, bidder_nfts[:1], {'from': accounts[3]})
+    exchange.stakeBundle(trade_id, bidder_nfts, {'from': accounts[3]})
+    exchange.stakeBundle(trade_id, asker_nfts, {'from': accounts[4]})
+    with reverts("Trade must be paid!!"):
+        exchange.settleBundle(trade_id, bidder_nfts, asker_nfts, {'from': accounts[5]})
+    exchange.payBundle(trade_id, {'from': accounts[3], 'value': 3000})
+
+    assert exchange.getBundleTradeById(trade_id)['status'] == 2
+    tx = exchange.settleBundle(trade_id, bidder_nfts, asker_nfts, {'from': accounts[5]})
+
+    assert tx.events['BundleClosed']['status'] == 3
+    assert 'TradeClosed' not in tx.events
+    assert exchange.bundlesOfAccount(accounts[3], 0, 10) == []
+    assert exchange.bundlesOfNft(first_fake_token.address, 13424, 0, 10) == []
+    assert first_fake_token.ownerOf(13424) == accounts[4]
+    assert first_fake_token.ownerOf(13425) == accounts[4]
     assert second_fake_token.ownerOf(25252) == accounts[3]
-    with reverts("NFT is already withdrawed!"):
-        exchange.withdrawNft(create_bid_tx.return_value, {'from': accounts[3]})
\ No newline at end of file
+    assert exchange.getBalance(accounts[4]) == 3000
+    with reverts("Trade does not exist!"):
+        exchange.getBundleTradeById(trade_id)
+
+def test_unstake_bundle(exchange, create_tokens) -> None:
+    """ A staked bundle and its payment can be taken back before settlement. """
+    first_fake_token, second_fake_token = create_tokens
+    first_fake_token.mint(13424, accounts[3])
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    second_fake_token.mint(25252, accounts[4])
+    bidder_nfts = [(first_fake_token.address, 13424)]
+    asker_nfts = [(second_fake_token.address, 25252), (second_fake_token.address, 25253)]
+    trade_id = exchange.createBundleAsk(
+        (bidder_nfts, asker_nfts, 700, 3000),
+        {'from': accounts[4]}
+    ).return_value
+    exchange.stakeBundle(trade_id, bidder_nfts, {'from': accounts[3]})
+    exchange.payBundle(trade_id, {'from': accounts[3], 'value': 3000})
+    bidder_balance = accounts[3].balance()
+    # The asker has not staked anything.
+    with reverts("The NFTs are not staked by the sender!"):
+        exchange.unstakeBundle(trade_id, asker_nfts, {'from': accounts[4]})
+    exchange.unstakeBundle(trade_id, bidder_nfts, {'from': accounts[3]})
+    exchange.unstakeBundleWei(trade_id, {'from': accounts[3]})
+
+    assert first_fake_token.ownerOf(13424) == accounts[3]
+    assert accounts[3].balance() == bidder_balance + 3000
+    assert exchange.getBundleTradeById(trade_id)['status'] == 0
+
+def test_bundle_ids_are_apart_from_trade_ids(exchange, mint_tokens) -> None:
+    """ Bundle trades have their own ids and are not returned as trades. """
+    first_addr, second_addr = mint_tokens
+    trade_id = exchange.createBid(13424, 25252, first_addr, second_addr, 700, 3000, {'from': accounts[3]}).return_value
+    tx = exchange.createBundleBid(
+        ([(first_addr, 13424)], [(second_addr, 25252)], 700, 3000),
+        {'from': accounts[3]}
+    )
+    bundle_id = tx.return_value
+
+    assert trade_id == 1
+    assert bundle_id == 1
+    assert exchange.tradeCount() == 1
+    assert exchange.bundleTradeCount() == 1
+    assert len(exchange.getTrades(0, 10)) == 1
+    assert [event['nftId'] for event in tx.events['BundleNftListed']] == [13424, 25252]
+    assert 'TradeNftListed' not in tx.events
+    assert exchange.tradesOfAccount(accounts[3], 0, 10) == [trade_id]
+    assert exchange.bundlesOfAccount(accounts[3], 0, 10) == [bundle_id]
+    assert exchange.bundlesOfNft(second_addr, 25252, 0, 10) == [bundle_id]
+
+def test_bundle_nfts_must_be_distinct(exchange, create_tokens) -> None:
+    """ An NFT is listed at most once in a bundle trade. """
+    first_fake_token, second_fake_token = create_tokens
+    first, second = (first_fake_token.address, 13424), (second_fake_token.address, 25252)
+    with reverts('NFT cannot be the same!'):
+        exchange.createBundleBid(([first, second], [second], 700, 3000), {'from': accounts[3]})
+    with reverts('NFT cannot be listed twice!'):
+        exchange.createBundleBid(([first, first], [second], 700, 3000), {'from': accounts[3]})
+    with reverts('NFT cannot be listed twice!'):
+        exchange.createBundleAsk(([first], [second, second], 700, 3000), {'from': accounts[4]})
+
+def test_sweep_expired_bundles(exchange, create_tokens) -> None:
+    """ Staked bundles and the payment of an expired bundle trade are returned. """
+    first_fake_token, second_fake_token = create_tokens
+    first_fake_token.mint(13424, accounts[3])
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    bidder_nfts = [(first_fake_token.address, 13424)]
+    asker_nfts = [(second_fake_token.address, 25252)]
+    trade_id = exchange.createBundleBid(
+        (bidder_nfts, asker_nfts, 700, 3000),
+        {'from': accounts[3]}
+    ).return_value
+    exchange.stakeBundle(trade_id, bidder_nfts, {'from': accounts[3]})
+    exchange.payBundle(trade_id, {'from': accounts[3], 'value': 3000})
+    with reverts('Every trade must have its NFT lists!'):
+        exchange.sweepExpiredBundles([trade_id], [bidder_nfts], [], {'from': accounts[5]})
+    # Not expired yet.
+    tx = exchange.sweepExpiredBundles([trade_id], [bidder_nfts], [asker_nfts], {'from': accounts[5]})
+    assert tx.return_value == 0
+    chain.sleep(701)
+    # Lists that are not the trade's are skipped.
+    tx = exchange.sweepExpiredBundles([trade_id], [asker_nfts], [bidder_nfts], {'from': accounts[5]})
+    assert tx.return_value == 0
+    tx = exchange.sweepExpiredBundles([trade_id], [bidder_nfts], [asker_nfts], {'from': accounts[5]})
+
+    assert tx.return_value == 1
+    assert tx.events['BundleClosed']['status'] == 4
+    assert first_fake_token.ownerOf(13424) == accounts[3]
+    assert exchange.getBalance(accounts[3]) == 3000
+    assert exchange.bundlesOfAccount(accounts[3], 0, 10) == []
+    with reverts("Trade does not exist!"):
+        exchange.getBundleTradeById(trade_id)
+
+def test_trade_logs_filtered_by_creator_and_collection(exchange, mint_tokens) -> None:
+    """ Creators and collections are topics, the node filters them. """
+    first_addr, second_addr = mint_tokens
+    trades = [
+        (13424, 25252, first_addr, second_addr, 700, 3000),
+        (13425, 25253, first_addr, second_addr, 700, 3000)
+    ]
+    tx = exchange.createBids(trades, {'from': accounts[3]})
+    exchange.createAsks(trades[:1], {'from': accounts[4]})
+    contract = web3.eth.contract(address=exchange.address, abi=exchange.abi)
+    bids_of_creator = contract.events.BidCreated.getLogs(
+        fromBlock=tx.block_number,
+        argument_filters={'creator': accounts[3].address}
+    )
+    listings_of_nft = contract.events.TradeNftListed.getLogs(
+        fromBlock=tx.block_number,
+        argument_filters={'nftAddress': second_addr, 'nftId': 25252}
+    )
+
+    assert [log['args']['TradeId'] for log in bids_of_creator] == [1, 2]
+    assert [log['args']['tradeId'] for log in listings_of_nft] == [1, 3]
+    assert all(not log['args']['isBidderNft'] for log in listings_of_nft)
+
+def test_match_trades(exchange, create_tokens, mint_tokens) -> None:
+    """ A staked and paid bid is merged with a staked ask on the same NFTs. """
+    first_fake_token, second_fake_token = create_tokens
+    first_addr, second_addr = mint_tokens
+    bid_id = exchange.createBid(13424, 25252, first_addr, second_addr, 700, 3000, {'from': accounts[3]}).return_value
+    ask_id = exchange.createAsk(13424, 25252, first_addr, second_addr, 700, 2000, {'from': accounts[4]}).return_value
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    exchange.stakeNft(bid_id, 13424, {'from': accounts[3]})
+    # The bid is not paid yet.
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    exchange.stakeNft(ask_id, 25252, {'from': accounts[4]})
+    with reverts("The bid must be staked and paid by the bidder only!"):
+        exchange.matchTrades(bid_id, ask_id, {'from': accounts[5]})
+    exchange.pay(bid_id, {'from': accounts[3], 'value': 3000})
+
+    tx = exchange.matchTrades(bid_id, ask_id, {'from': accounts[5]})
+
+    assert tx.events['TradesMatched']['price'] == 2000
+    assert tx.events['TradeClosed']['tradeId'] == ask_id
+    trade = exchange.getTradeById(bid_id)
+    assert trade[4] == accounts[4]
+    assert trade[6] == True
+    assert trade[9] == 2000
+    assert exchange.getBalance(accounts[3]) == 1000
+    with reverts("Trade does not exist!"):
+        exchange.getTradeById(ask_id)
+    exchange.settle(bid_id, {'from': accounts[5]})
+
+    assert first_fake_token.ownerOf(13424) == accounts[4]
+    assert second_fake_token.ownerOf(25252) == accounts[3]
+    assert exchange.getBalance(accounts[4]) == 2000
+
+def test_match_trades_with_a_higher_ask_price(exchange, create_tokens, mint_tokens) -> None:
+    first_fake_token, second_fake_token = create_tokens
+    first_addr, second_addr = mint_tokens
+    bid_id = exchange.createBid(13424, 25252, first_addr, second_addr, 700, 3000, {'from': accounts[3]}).return_value
+    ask_id = exchange.createAsk(13424, 25252, first_addr, second_addr, 700, 4000, {'from': accounts[4]}).return_value
+    first_fake_token.approve(exchange.address, 13424, {'from': accounts[3]})
+    exchange.stakeNft(bid_id, 13424, {'from': accounts[3]})
+    exchange.pay(bid_id, {'from': accounts[3], 'value': 3000})
+    second_fake_token.approve(exchange.address, 25252, {'from': accounts[4]})
+    exchange.stakeNft(ask_id, 25252, {'from': accounts[4]})
+
+    with reverts("The bid price is lower than the ask price!"):
+        exchange.matchTrades(bid_id, ask_id, {'from': accounts[5]})
@@ -0,0 +1,19 @@
+"""
+    Testing the opcode profiler of NFT to NFT Exchange.
+"""
+from brownie import accounts
+from scripts.profiler.profile_trades import format_summary, profile_transactions
+
+def test_profile_attributes_gas_to_modifiers(exchange, staked_trade) -> None:
+    """ The gas of `pay` is split by category, modifier and source line. """
+    tx = exchange.pay(staked_trade, {'from': accounts[3], 'value': 3000})
+
+    profile = profile_transactions([tx])['pay']
+
+    assert profile.transactions == 1
+    assert 0 < profile.traced_gas < tx.gas_used
+    assert profile.categories['sload'] > 0
+    assert profile.categories['sstore'] > 0
+    assert profile.modifiers['isTradeExist'] > 0
+    assert any(line.startswith("contracts/NFTToNFTExchange.sol:") for line in profile.lines)
+    assert format_summary({'pay': profile}).startswith("pay: 1 tx, gas used")